@@ -1,5 +1,6 @@
 # app/config.py
 
+import json
 import os
 from dotenv import load_dotenv
 
@@ -10,4 +11,66 @@ load_dotenv()
 GATEWAY_API_URL = os.getenv("GATEWAY_API_URL")
 DEVICE_API_URL = os.getenv("DEVICE_API_URL")
 GATEWAY_STATUS_API_URL = os.getenv("GATEWAY_STATUS_API_URL")
-DEVICE_STATUS_API_URL = os.getenv("DEVICE_STATUS_API_URL")
\ No newline at end of file
+DEVICE_STATUS_API_URL = os.getenv("DEVICE_STATUS_API_URL")
+
+# Gateway/device lists are cached for this many seconds, then revalidated (ETag/Last-Modified)
+REGISTRY_CACHE_TTL = float(os.getenv("REGISTRY_CACHE_TTL", "30"))
+
+# Upstream HTTP client (keep-alive pools, one per endpoint)
+UPSTREAM_POOL_CONNECTIONS = int(os.getenv("UPSTREAM_POOL_CONNECTIONS", "4"))
+UPSTREAM_POOL_MAXSIZE = int(os.getenv("UPSTREAM_POOL_MAXSIZE", "64"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "10"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "10"))
+
+# Adaptive (AIMD) limit on in-flight POST/PUTs per endpoint (0 disables): starts at INITIAL,
+# grows while latency stays within TOLERANCE × the observed baseline, halves on 5xx/429 above
+# ERROR_RATE of a window or on timeouts; never leaves [MIN, MAX]
+UPSTREAM_ADAPTIVE_LIMIT = os.getenv("UPSTREAM_ADAPTIVE_LIMIT", "1") != "0"
+UPSTREAM_LIMIT_INITIAL = int(os.getenv("UPSTREAM_LIMIT_INITIAL", "8"))
+UPSTREAM_LIMIT_MIN = int(os.getenv("UPSTREAM_LIMIT_MIN", "1"))
+UPSTREAM_LIMIT_MAX = int(os.getenv("UPSTREAM_LIMIT_MAX", str(UPSTREAM_POOL_MAXSIZE)))
+UPSTREAM_LATENCY_TOLERANCE = float(os.getenv("UPSTREAM_LATENCY_TOLERANCE", "2.0"))
+UPSTREAM_LIMIT_ERROR_RATE = float(os.getenv("UPSTREAM_LIMIT_ERROR_RATE", "0.05"))
+
+# Retries of idempotent requests (GET/PUT) on timeouts, network errors, 5xx and 429: exponential
+# backoff with jitter, starting at BACKOFF seconds and capped at BACKOFF_MAX
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.2"))
+UPSTREAM_RETRY_BACKOFF_MAX = float(os.getenv("UPSTREAM_RETRY_BACKOFF_MAX", "2"))
+
+# Circuit breaker per endpoint: this many consecutive failures open it (0 disables); requests then
+# fail fast for UPSTREAM_BREAKER_RESET seconds, after which one probe request tests the endpoint
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_RESET = float(os.getenv("UPSTREAM_BREAKER_RESET", "5"))
+
+# Spool em disco dos status que não puderam ser enviados (endpoint fora, 5xx, circuito aberto):
+# arquivos de segmento em STATUS_SPOOL_DIR (vazio desliga), reenviados em ordem a REPLAY_RATE
+# status/s quando o endpoint volta; acima de MAX_BYTES os segmentos mais antigos são descartados.
+# FSYNC: "always" (a cada status), "interval" (a cada FSYNC_INTERVAL segundos) ou "never"
+STATUS_SPOOL_DIR = os.getenv("STATUS_SPOOL_DIR", "")
+STATUS_SPOOL_SEGMENT_BYTES = int(os.getenv("STATUS_SPOOL_SEGMENT_BYTES", str(4 * 1024 * 1024)))
+STATUS_SPOOL_MAX_BYTES = int(os.getenv("STATUS_SPOOL_MAX_BYTES", str(256 * 1024 * 1024)))
+STATUS_SPOOL_FSYNC = os.getenv("STATUS_SPOOL_FSYNC", "interval")
+STATUS_SPOOL_FSYNC_INTERVAL = float(os.getenv("STATUS_SPOOL_FSYNC_INTERVAL", "1"))
+STATUS_SPOOL_REPLAY_RATE = float(os.getenv("STATUS_SPOOL_REPLAY_RATE", "200"))
+
+# Bulk creation (gateways/devices): threads POSTing in parallel
+BULK_SEND_WORKERS = int(os.getenv("BULK_SEND_WORKERS", "16"))
+
+# Gateway outage cascades (device PUTs) run on their own pool, off the status tick
+CASCADE_WORKERS = int(os.getenv("CASCADE_WORKERS", "16"))
+
+# Write-behind PUT queues (gateway/device registry): latest state per key wins
+PUT_QUEUE_WORKERS = int(os.getenv("PUT_QUEUE_WORKERS", "8"))
+
+# Status loops with batch_size > 1: threads sending the batched status POSTs
+STATUS_BATCH_WORKERS = int(os.getenv("STATUS_BATCH_WORKERS", "4"))
+
+# Per-entity status intervals in seconds (mode=per_entity), JSON objects overriding the
+# defaults by device type / gateway solution, e.g. '{"camera (CCTV)": 1, "rain gauge sensor": 600}'
+DEVICE_STATUS_INTERVALS = json.loads(os.getenv("DEVICE_STATUS_INTERVALS", "{}"))
+GATEWAY_STATUS_INTERVALS = json.loads(os.getenv("GATEWAY_STATUS_INTERVALS", "{}"))
+
+# Device ON/OFF transition probabilities per category, overriding the loop's prob_down/prob_up,
+# e.g. '{"actuator": {"prob_down": 0.05, "prob_up": 0.5}}'
+DEVICE_POWER_TRANSITIONS = json.loads(os.getenv("DEVICE_POWER_TRANSITIONS", "{}"))
@@ -1,10 +1,32 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.routers import gateway, device, gateway_status, status_device
+from app.services import upstream, status_spool
+from app.services.gateway_status_service import cascade_executor, gateway_put_queue
+from app.services.status_device_service import device_put_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pools keep-alive para a API FoT: abertos no startup, fechados no shutdown
+    upstream.open_sessions()
+    # Status não enviados numa execução anterior voltam a ser reenviados
+    status_spool.open_spools()
+    yield
+    gateway_put_queue.shutdown()
+    device_put_queue.shutdown()
+    cascade_executor.shutdown()
+    status_spool.close_spools()
+    upstream.close_sessions()
+    await upstream.close_async_clients()
+
 
 app = FastAPI(
     title="IoT Smart Simulation API",
     description="API for simulating IoT Gateways and Devices for Smart Cities",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.include_router(gateway.router, prefix="/gateway", tags=["Gateway"])
@@ -15,4 +37,3 @@ app.include_router(status_device.router, prefix="/status-device", tags=["Device
 @app.get("/")
 def read_root():
     return {"message": "IoT Simulator API is running"}
-
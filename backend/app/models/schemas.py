@@ -32,6 +32,15 @@ class GatewayResponseSchema(BaseModel):
     message: str
 
 
+class BulkGenerateResponseSchema(BaseModel):
+    message: str
+    total: int
+    success_count: int
+    failure_count: int
+    failed_ids: List[str]
+    elapsed_seconds: float
+
+
 class GatewayMacListResponse(BaseModel):
     mac_addresses: list[str]
     message: str
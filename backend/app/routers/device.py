@@ -1,29 +1,32 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, HTTPException
 from app.services import device_service
-from app.models.schemas import DeviceResponseSchema, DeviceIdListResponse
+from app.models.schemas import BulkGenerateResponseSchema, DeviceIdListResponse
+from app.config import BULK_SEND_WORKERS
 from pydantic import BaseModel
 
 router = APIRouter()
 
 
-@router.post("/generate", response_model=DeviceResponseSchema)
+@router.post("/generate", response_model=BulkGenerateResponseSchema)
 def generate_devices(
     total: int = Query(1, description="Number of devices to generate"),
     radius_km: float = Query(1.0, description="Radius around the gateway in km"),
+    workers: int = Query(BULK_SEND_WORKERS, ge=1, description="Number of parallel senders"),
 ):
     """
     Generate and send simulated devices to the API.
     """
-    success_count = device_service.generate_simulated_devices(total, radius_km)
+    result = device_service.generate_simulated_devices(total, radius_km, workers=workers)
+    success_count = result["success_count"]
 
     if success_count == total:
-        return {"message": f"✅ {success_count} devices generated successfully."}
+        message = f"✅ {success_count} devices generated successfully."
     elif success_count == 0:
-        return {"message": "❌ Failed to generate any devices. Check the API or network connection."}
+        message = "❌ Failed to generate any devices. Check the API or network connection."
     else:
-        return {
-            "message": f"⚠️ Only {success_count} out of {total} devices were generated successfully."
-        }
+        message = f"⚠️ Only {success_count} out of {total} devices were generated successfully."
+
+    return {"message": message, **result}
 
 
 @router.get("/devices", response_model=DeviceIdListResponse)
@@ -90,12 +93,7 @@ def update_device(device: DeviceUpdate):
     """
     Atualiza completamente um dispositivo IoT no serviço remoto.
     """
-    try:
-        response = requests.put(
-            DEVICE_API_URL,
-            json=device.dict()
-        )
-        response.raise_for_status()
-        return {"message": f"✅ Dispositivo {device.id} atualizado com sucesso!"}
-    except requests.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao atualizar dispositivo: {e}")
\ No newline at end of file
+    success, detail = device_service.update_device(device.dict())
+    if not success:
+        raise HTTPException(status_code=500, detail=f"Erro ao atualizar dispositivo: {detail}")
+    return {"message": f"✅ Dispositivo {device.id} atualizado com sucesso!"}
\ No newline at end of file
@@ -1,25 +1,28 @@
 from fastapi import APIRouter, Query
 from typing import Optional
 from app.services import gateway_service
-from app.models.schemas import GatewayResponseSchema, GatewayMacListResponse
+from app.models.schemas import BulkGenerateResponseSchema, GatewayMacListResponse
+from app.config import BULK_SEND_WORKERS
 
 
 router = APIRouter()
 
 
-@router.post("/generate", response_model=GatewayResponseSchema)
+@router.post("/generate", response_model=BulkGenerateResponseSchema)
 def generate_gateways(
     total: int = Query(1, description="Number of gateways to generate"),
     center_lat: float = Query(-13.005, description="Latitude for center point"),
     center_lon: float = Query(-38.516, description="Longitude for center point"),
     radius_km: float = Query(1.0, description="Radius in kilometers"),
+    workers: int = Query(BULK_SEND_WORKERS, ge=1, description="Number of parallel senders"),
 ):
     """
     Generate and send simulated gateways to the API.
     """
-    success_count = gateway_service.generate_simulated_gateways(
-        total, center_lat, center_lon, radius_km
+    result = gateway_service.generate_simulated_gateways(
+        total, center_lat, center_lon, radius_km, workers=workers
     )
+    success_count = result["success_count"]
 
     if success_count == total:
         message = f"✅ {success_count} gateways generated successfully."
@@ -30,7 +33,7 @@ def generate_gateways(
             f"⚠️ Only {success_count} out of {total} gateways were generated successfully."
         )
 
-    return {"message": message}
+    return {"message": message, **result}
 
 
 @router.get("/gateways", response_model=GatewayMacListResponse)
@@ -1,7 +1,11 @@
+from typing import Optional
+
 from fastapi import APIRouter, Query, BackgroundTasks
 from fastapi.responses import JSONResponse
 
-from app.services import gateway_status_service
+from app.services import gateway_status_service, gateway_status_async_service, upstream, rate_limiter, status_spool
+from app.services.device_index import device_index
+from app.services.registry_cache import registry_cache
 
 router = APIRouter()
 
@@ -9,16 +13,69 @@ router = APIRouter()
 @router.post("/loop")
 def start_status_loop(
     background_tasks: BackgroundTasks,
-    interval: int = Query(5, description="Interval in seconds between each status sending")
+    interval: int = Query(5, description="Interval in seconds between each status sending (per_entity: fallback for unknown solutions)"),
+    mode: str = Query(
+        "sync", pattern="^(sync|async|per_entity)$",
+        description="Loop engine: 'sync' (serial), 'async' (concurrent) or 'per_entity' (own interval per solution)"
+    ),
+    concurrency: int = Query(
+        gateway_status_async_service.DEFAULT_CONCURRENCY, ge=1,
+        description="Maximum in-flight requests per tick (async and per_entity modes)"
+    ),
+    spread: bool = Query(False, description="Spread each gateway's send evenly across the interval"),
+    batch_size: int = Query(
+        1, ge=1, description="Status records per bulk POST (1 = one POST per record; single POSTs if the upstream rejects arrays)"
+    ),
+    linger: float = Query(0.5, gt=0, description="Max seconds a status waits for its batch to fill (batch_size > 1)"),
+    rate: Optional[float] = Query(
+        None, gt=0, description="Emit exactly this many status events per second, rounds back-to-back (sync and async modes)"
+    ),
+    burst: Optional[int] = Query(None, ge=1, description="Token bucket size for `rate` (default: 50 ms worth of events)"),
 ):
     """
     Start continuous loop sending status from gateways to the API.
     """
+    if rate and mode == "per_entity":
+        return JSONResponse(
+            status_code=400,
+            content={"message": "❌ rate is only supported in the sync and async modes (per_entity has its own intervals)."}
+        )
     try:
-        background_tasks.add_task(gateway_status_service.start_gateway_status_loop, interval_seconds=interval)
+        if mode == "per_entity":
+            background_tasks.add_task(
+                gateway_status_async_service.start_gateway_status_wheel_loop,
+                default_interval=interval,
+                concurrency=concurrency,
+                batch_size=batch_size,
+                linger_seconds=linger,
+            )
+            detail = f" (per_entity, concurrency={concurrency})"
+        elif mode == "async":
+            background_tasks.add_task(
+                gateway_status_async_service.start_gateway_status_loop_async,
+                interval_seconds=interval,
+                concurrency=concurrency,
+                spread=spread,
+                batch_size=batch_size,
+                linger_seconds=linger,
+                rate=rate,
+                burst=burst,
+            )
+            detail = f" (async, concurrency={concurrency})"
+        else:
+            background_tasks.add_task(
+                gateway_status_service.start_gateway_status_loop,
+                interval_seconds=interval, spread=spread, batch_size=batch_size, linger_seconds=linger,
+                rate=rate, burst=burst,
+            )
+            detail = ""
+        if batch_size > 1:
+            detail += f" (batches of {batch_size}, linger {linger}s)"
+        if rate:
+            detail += f" (rate {rate:g} events/s)"
         return JSONResponse(
             status_code=200,
-            content={"message": f"Gateway status simulation started in background with {interval}s interval."}
+            content={"message": f"Gateway status simulation started in background with {interval}s interval{detail}."}
         )
     except Exception as e:
         return JSONResponse(
@@ -43,6 +100,41 @@ def stop_status_loop():
             status_code=500,
             content={"message": f"❌ Error stopping status loop: {str(e)}"})
 
+@router.get("/loop/stats")
+def gateway_status_loop_stats():
+    """
+    Metrics of the gateway status loop and the components it uses.
+
+    - `scheduler`: tick period, ticks, overruns of the running loop
+    - `device_index`: gateway→devices index
+    - `cascade`: cascade executor (queued, coalesced, applied device PUTs)
+    - `put_queue`: gateway PUT write-behind queue (depth, superseded)
+    - `registry_cache`: cached gateway/device lists
+    - `batcher`: status batcher when batch_size > 1 (records, bulk/single POSTs, bulk support)
+    - `upstream_limits`: adaptive in-flight limit of each upstream endpoint
+    - `upstream_breakers`: circuit breaker of each upstream endpoint (state, fast-failed requests, retries)
+    - `rate_limits`: achieved vs requested events/s of loops started with `rate`
+    - `spool`: disk spool of unsent statuses when STATUS_SPOOL_DIR is set (pending, replayed, evicted)
+    """
+    scheduler = gateway_status_service.loop_scheduler
+    batcher = gateway_status_service.status_batcher
+    return JSONResponse(
+        status_code=200,
+        content={
+            "scheduler": scheduler.stats() if scheduler else None,
+            "device_index": device_index.stats(),
+            "cascade": gateway_status_service.cascade_executor.stats(),
+            "put_queue": gateway_status_service.gateway_put_queue.stats(),
+            "registry_cache": registry_cache.stats(),
+            "batcher": batcher.stats() if batcher else None,
+            "upstream_limits": upstream.limit_stats(),
+            "upstream_breakers": upstream.breaker_stats(),
+            "rate_limits": rate_limiter.stats(),
+            "spool": status_spool.stats(),
+        }
+    )
+
+
 @router.get("/list")
 def list_gateway_statuses():
     """
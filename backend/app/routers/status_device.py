@@ -1,22 +1,83 @@
+from typing import Optional
+
 from fastapi import APIRouter, Query, BackgroundTasks
 from fastapi.responses import JSONResponse
-from app.services import status_device_service
+from app.services import status_device_service, status_device_async_service, upstream, rate_limiter, status_spool
+from app.services.registry_cache import registry_cache
+from app.services.device_power import device_power
 
 router = APIRouter()
 
 @router.post("/loop")
 def start_device_status_loop(
     background_tasks: BackgroundTasks,
-    interval: int = Query(5, description="Interval in seconds between status sends")
+    interval: int = Query(5, description="Interval in seconds between status sends (per_entity: fallback for unknown device types)"),
+    mode: str = Query(
+        "sync", pattern="^(sync|async|per_entity)$",
+        description="Loop engine: 'sync' (serial), 'async' (pipelined) or 'per_entity' (own interval per device type)"
+    ),
+    concurrency: int = Query(
+        status_device_async_service.DEFAULT_CONCURRENCY, ge=1,
+        description="Maximum in-flight requests per round (async and per_entity modes)"
+    ),
+    spread: bool = Query(False, description="Spread each device's send evenly across the interval"),
+    stream: bool = Query(
+        False, description="Parse the device list while it downloads, with bounded memory (sync and async modes)"
+    ),
+    batch_size: int = Query(
+        1, ge=1, description="Status records per bulk POST (1 = one POST per record; single POSTs if the upstream rejects arrays)"
+    ),
+    linger: float = Query(0.5, gt=0, description="Max seconds a status waits for its batch to fill (batch_size > 1)"),
+    rate: Optional[float] = Query(
+        None, gt=0, description="Emit exactly this many status events per second, rounds back-to-back (sync and async modes)"
+    ),
+    burst: Optional[int] = Query(None, ge=1, description="Token bucket size for `rate` (default: 50 ms worth of events)"),
 ):
     """
     Start continuous loop sending status from devices to the API.
     """
+    if rate and mode == "per_entity":
+        return JSONResponse(
+            status_code=400,
+            content={"message": "❌ rate is only supported in the sync and async modes (per_entity has its own intervals)."}
+        )
     try:
-        background_tasks.add_task(status_device_service.start_device_status_loop, interval_seconds=interval)
+        if mode == "per_entity":
+            background_tasks.add_task(
+                status_device_async_service.start_device_status_wheel_loop,
+                default_interval=interval,
+                concurrency=concurrency,
+                batch_size=batch_size,
+                linger_seconds=linger,
+            )
+            detail = f" (per_entity, concurrency={concurrency})"
+        elif mode == "async":
+            background_tasks.add_task(
+                status_device_async_service.start_device_status_loop_async,
+                interval_seconds=interval,
+                concurrency=concurrency,
+                spread=spread,
+                stream=stream,
+                batch_size=batch_size,
+                linger_seconds=linger,
+                rate=rate,
+                burst=burst,
+            )
+            detail = f" (async, concurrency={concurrency})"
+        else:
+            background_tasks.add_task(
+                status_device_service.start_device_status_loop,
+                interval_seconds=interval, spread=spread, stream=stream, batch_size=batch_size, linger_seconds=linger,
+                rate=rate, burst=burst,
+            )
+            detail = ""
+        if batch_size > 1:
+            detail += f" (batches of {batch_size}, linger {linger}s)"
+        if rate:
+            detail += f" (rate {rate:g} events/s)"
         return JSONResponse(
             status_code=200,
-            content={"message": f"Device status simulation started in background with interval of {interval} seconds."}
+            content={"message": f"Device status simulation started in background with interval of {interval} seconds{detail}."}
         )
     except Exception as e:
         return JSONResponse(
@@ -42,6 +103,40 @@ def stop_device_status_loop():
             content={"message": f"❌ Error stopping device status simulation: {str(e)}"}
         )
 
+@router.get("/loop/stats")
+def device_status_loop_stats():
+    """
+    Metrics of the device status loop and the components it uses.
+
+    - `ticks`, `last_tick_*`: per-tick completion metrics of the async loop
+    - `scheduler`: tick period, ticks, overruns of the running loop
+    - `put_queue`: device PUT write-behind queue of the sync and async loops (depth, superseded, failed)
+    - `registry_cache`: cached gateway/device lists
+    - `power_state`: ON/OFF state (devices, how many are on, transitions so far)
+    - `batcher`: status batcher when batch_size > 1 (records, bulk/single POSTs, bulk support)
+    - `upstream_limits`: adaptive in-flight limit of each upstream endpoint
+    - `upstream_breakers`: circuit breaker of each upstream endpoint (state, fast-failed requests, retries)
+    - `rate_limits`: achieved vs requested events/s of loops started with `rate`
+    - `spool`: disk spool of unsent statuses when STATUS_SPOOL_DIR is set (pending, replayed, evicted)
+    """
+    scheduler = status_device_service.loop_scheduler
+    batcher = status_device_service.status_batcher
+    return JSONResponse(
+        status_code=200,
+        content={
+            **status_device_async_service.device_status_loop_stats,
+            "scheduler": scheduler.stats() if scheduler else None,
+            "put_queue": status_device_service.device_put_queue.stats(),
+            "registry_cache": registry_cache.stats(),
+            "power_state": device_power.stats(),
+            "batcher": batcher.stats() if batcher else None,
+            "upstream_limits": upstream.limit_stats(),
+            "upstream_breakers": upstream.breaker_stats(),
+            "rate_limits": rate_limiter.stats(),
+            "spool": status_spool.stats(),
+        }
+    )
+
 @router.get("/list")
 def list_device_statuses():
     """
@@ -0,0 +1,201 @@
+# app/services/adaptive_limit.py
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Um passo do controle a cada N respostas (no mínimo), para a taxa de erro ter amostra
+WINDOW_MIN_SAMPLES = 10
+
+# A latência de referência (menor média de janela) só sobe devagar: 1% da diferença por janela
+BASELINE_DRIFT = 0.01
+
+# Folga absoluta sobre a referência: com latências de ~1 ms, 2× seria só ruído
+MIN_LATENCY_SLACK = 0.005
+
+
+def _overloaded(status_code: Optional[int]) -> bool:
+    return status_code is not None and (status_code >= 500 or status_code == 429)
+
+
+class AdaptiveLimit:
+    """
+    AIMD limit on in-flight requests to one upstream endpoint, shared by threads
+    (`acquire`) and coroutines (`aacquire`); `release(latency, status_code)` frees the
+    slot and feeds the controller.
+
+    Every window of max(WINDOW_MIN_SAMPLES, limit) responses the limit grows by 1 (by
+    doubling until the first decrease, like TCP slow start) if the window really used
+    it; it is multiplied by `backoff` when the window's 5xx/429 rate exceeds
+    `error_rate`, or when its mean latency exceeds `tolerance` × the baseline (lowest
+    window mean seen). A timeout/network error (status_code None) decreases it at once.
+    Responses to requests already in flight at a decrease are not counted again.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        tolerance: float = 2.0,
+        error_rate: float = 0.05,
+        backoff: float = 0.5,
+    ):
+        self.label = label
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.tolerance = tolerance
+        self.error_rate = error_rate
+        self.backoff = backoff
+        self.baseline: Optional[float] = None
+        self.last_latency: Optional[float] = None
+        self._slow_start = True
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._waiters: Deque[Any] = deque()  # threading.Event ou (loop, future), em ordem
+        self._skip = 0
+        self._reset_window_locked()
+        self.counters = {"requests": 0, "overloaded": 0, "timeouts": 0, "waited": 0, "increases": 0, "decreases": 0}
+
+    # ---------------------------
+    #  Vagas
+    # ---------------------------
+
+    def _free_locked(self) -> bool:
+        if self._inflight < int(self.limit):
+            return True
+        self._saturated = True
+        return False
+
+    def acquire(self) -> None:
+        """Block the calling thread until a slot is free."""
+        with self._lock:
+            if not self._waiters and self._free_locked():
+                self._inflight += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+            self._saturated = True
+            self.counters["waited"] += 1
+        event.wait()  # quem libera já conta a vaga para nós
+
+    async def aacquire(self) -> None:
+        """Wait, without blocking the event loop, until a slot is free."""
+        with self._lock:
+            if not self._waiters and self._free_locked():
+                self._inflight += 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+            self._saturated = True
+            self.counters["waited"] += 1
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                handed = waiter not in self._waiters
+                if not handed:
+                    self._waiters.remove(waiter)
+            if handed:
+                self.release()  # a vaga chegou junto com o cancelamento
+            raise
+
+    def _wake_locked(self) -> None:
+        while self._waiters and self._inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            self._inflight += 1
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_resolve, future)
+
+    def release(self, latency: Optional[float] = None, status_code: Optional[int] = None) -> None:
+        """Free a slot; with `latency`, record the response (status_code None = timeout/network error)."""
+        with self._lock:
+            self._inflight -= 1
+            if latency is not None:
+                self._record_locked(latency, status_code)
+            self._wake_locked()
+
+    # ---------------------------
+    #  Controle AIMD
+    # ---------------------------
+
+    def _reset_window_locked(self) -> None:
+        self._samples = 0
+        self._overloads = 0
+        self._ok_samples = 0
+        self._latency_sum = 0.0
+        # com fila, o limite continua sendo o gargalo (a fila tira a vez de _free_locked)
+        self._saturated = bool(self._waiters) or self._inflight >= int(self.limit)
+
+    def _record_locked(self, latency: float, status_code: Optional[int]) -> None:
+        self.counters["requests"] += 1
+        if status_code is None:
+            self.counters["timeouts"] += 1
+        elif _overloaded(status_code):
+            self.counters["overloaded"] += 1
+        if self._skip:
+            self._skip -= 1  # enviada antes da última redução
+            return
+
+        if status_code is None:
+            self._decrease_locked()
+            return
+        self._samples += 1
+        if _overloaded(status_code):
+            self._overloads += 1
+        else:
+            self._ok_samples += 1
+            self._latency_sum += latency
+        if self._samples >= max(WINDOW_MIN_SAMPLES, int(self.limit)):
+            self._close_window_locked()
+
+    def _close_window_locked(self) -> None:
+        mean = self._latency_sum / self._ok_samples if self._ok_samples else None
+        if mean is not None:
+            self.last_latency = mean
+            if self.baseline is None or mean < self.baseline:
+                self.baseline = mean
+            else:
+                self.baseline += (mean - self.baseline) * BASELINE_DRIFT
+
+        if self._overloads / self._samples > self.error_rate:
+            self._decrease_locked()
+        elif mean is not None and mean > max(self.baseline * self.tolerance, self.baseline + MIN_LATENCY_SLACK):
+            self._decrease_locked()
+        else:
+            if self._saturated and self.limit < self.max_limit:
+                step = self.limit if self._slow_start else 1.0
+                self.limit = min(self.max_limit, self.limit + step)
+                self.counters["increases"] += 1
+            self._reset_window_locked()
+
+    def _decrease_locked(self) -> None:
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self._slow_start = False
+        self.counters["decreases"] += 1
+        self._skip = self._inflight
+        self._reset_window_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "limit": int(self.limit),
+                "in_flight": self._inflight,
+                "waiting": len(self._waiters),
+                "slow_start": self._slow_start,
+                "baseline_ms": round(self.baseline * 1000, 2) if self.baseline is not None else None,
+                "last_latency_ms": round(self.last_latency * 1000, 2) if self.last_latency is not None else None,
+            }
+
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
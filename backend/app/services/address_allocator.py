@@ -0,0 +1,91 @@
+# app/services/address_allocator.py
+
+import math
+import threading
+from typing import Iterable, Optional, Set
+
+import numpy as np
+
+
+class AddressAllocator:
+    """
+    Hands out unique integer codes from [0, space) without storing what it handed out.
+
+    Codes follow a random affine permutation of the index sequence
+    (code = (a * index + c) mod space, with gcd(a, space) == 1), so every index maps
+    to a distinct code. "Already allocated by us" is answered in O(1) by inverting
+    the permutation; codes that exist upstream are kept in a set and skipped.
+    Thread-safe: the shared allocators serve concurrent /gateway/generate requests.
+    """
+
+    def __init__(self, space: int, rng: Optional[np.random.Generator] = None):
+        rng = rng or np.random.default_rng()
+        self.space = space
+        self.multiplier = self._coprime_multiplier(space, rng)
+        self.increment = int(rng.integers(0, space))
+        self._inverse = pow(self.multiplier, -1, space)
+        self.next_index = 0
+        self.reserved: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _coprime_multiplier(space: int, rng: np.random.Generator) -> int:
+        while True:
+            a = int(rng.integers(space // 3, space))
+            if math.gcd(a, space) == 1:
+                return a
+
+    def _index_of(self, code: int) -> int:
+        return ((code - self.increment) * self._inverse) % self.space
+
+    def __contains__(self, code: int) -> bool:
+        """True if `code` was allocated by this allocator or reserved from upstream."""
+        with self._lock:
+            return code in self.reserved or self._index_of(code) < self.next_index
+
+    def reserve(self, codes: Iterable[int]) -> int:
+        """Mark codes already used upstream so they are never allocated. Returns how many were new."""
+        codes = list(codes)  # consome o iterável fora do lock
+        with self._lock:
+            before = len(self.reserved)
+            self.reserved.update(c for c in codes if 0 <= c < self.space and self._index_of(c) >= self.next_index)
+            return len(self.reserved) - before
+
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            return self._remaining_locked()
+
+    def _remaining_locked(self) -> int:
+        return self.space - self.next_index - len(self.reserved)
+
+    def allocate(self, total: int) -> np.ndarray:
+        """Return `total` fresh unique codes as a uint64 array."""
+        with self._lock:
+            return self._allocate_locked(total)
+
+    def _allocate_locked(self, total: int) -> np.ndarray:
+        if total > self._remaining_locked():
+            raise RuntimeError(f"address space exhausted ({self._remaining_locked()} codes left, {total} requested)")
+
+        chunks = []
+        missing = total
+        while missing > 0:
+            stop = self.next_index + missing
+            indices = np.arange(self.next_index, stop, dtype=np.uint64)
+            codes = (indices * np.uint64(self.multiplier) + np.uint64(self.increment)) % np.uint64(self.space)
+            self.next_index = stop
+
+            if self.reserved:
+                reserved = self.reserved
+                keep = np.fromiter((c not in reserved for c in codes.tolist()), dtype=bool, count=len(codes))
+                skipped = codes[~keep].tolist()
+                if skipped:
+                    # Índices já ultrapassados: não precisam mais ficar no conjunto
+                    reserved.difference_update(skipped)
+                    codes = codes[keep]
+
+            chunks.append(codes)
+            missing -= len(codes)
+
+        return np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
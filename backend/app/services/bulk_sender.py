@@ -0,0 +1,67 @@
+# app/services/bulk_sender.py
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+# Quantos identificadores de falha devolvemos para a rota (amostra)
+MAX_REPORTED_FAILURES = 100
+
+_SENTINEL = object()
+
+
+def send_bulk(
+    items: Iterable[Dict[str, Any]],
+    send: Callable[[Dict[str, Any]], Tuple[bool, str]],
+    workers: int,
+    key: str,
+    queue_size: int = 0,
+) -> Dict[str, Any]:
+    """
+    Producer/worker pipeline: one thread materializes `items` into a bounded queue while
+    `workers` threads POST them through `send`. Returns the success/failure accounting:
+    { total, success_count, failure_count, failed_ids, elapsed_seconds }.
+    """
+    workers = max(1, workers)
+    pending: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size or workers * 4)
+    lock = threading.Lock()
+    result: Dict[str, Any] = {"total": 0, "success_count": 0, "failure_count": 0, "failed_ids": []}
+    started = time.monotonic()
+
+    def _produce() -> None:
+        try:
+            for item in items:
+                pending.put(item)
+        finally:
+            for _ in range(workers):
+                pending.put(_SENTINEL)
+
+    def _consume() -> None:
+        while True:
+            item = pending.get()
+            if item is _SENTINEL:
+                return
+            try:
+                ok, _ = send(item)
+            except Exception as e:  # um item ruim não derruba o worker
+                print(f"❌ Unexpected error sending {item.get(key)}: {e}")
+                ok = False
+            with lock:
+                result["total"] += 1
+                if ok:
+                    result["success_count"] += 1
+                else:
+                    result["failure_count"] += 1
+                    if len(result["failed_ids"]) < MAX_REPORTED_FAILURES:
+                        result["failed_ids"].append(item.get(key))
+
+    threads = [threading.Thread(target=_produce, daemon=True)]
+    threads += [threading.Thread(target=_consume, daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    result["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    return result
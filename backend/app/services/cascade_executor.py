@@ -0,0 +1,114 @@
+# app/services/cascade_executor.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class CascadeExecutor:
+    """
+    Runs gateway cascades (device PUTs) off the status tick, on a bounded thread pool.
+
+    `submit(key, target)` only records the latest desired target per key and returns.
+    One runner per key at a time builds the payloads with `plan(key, target)` when it
+    starts (so they reflect what was already applied) and PUTs them concurrently on the
+    shared pool via `put(key, target, payload)`. Coalescing: a target submitted while
+    the key is queued replaces the previous one, and one submitted while it is running
+    makes the runner skip the PUTs it has not started yet; the next round then applies
+    only the net change (e.g. off→on before the cascade ran issues nothing).
+    """
+
+    def __init__(
+        self,
+        plan: Callable[[Hashable, Any], List[Dict[str, Any]]],
+        put: Callable[[Hashable, Any, Dict[str, Any]], bool],
+        workers: int,
+        on_done: Optional[Callable[[Hashable, Any, int], None]] = None,
+    ):
+        self._plan = plan
+        self._put = put
+        self._on_done = on_done
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending: Dict[Hashable, Any] = {}
+        self._active: set = set()
+        self._runners: Optional[ThreadPoolExecutor] = None
+        self._puts: Optional[ThreadPoolExecutor] = None
+        self.counters = {"submitted": 0, "coalesced": 0, "skipped_puts": 0, "applied_puts": 0, "failed_puts": 0}
+
+    def _pools(self):
+        if self._runners is None:
+            self._runners = ThreadPoolExecutor(self.workers, thread_name_prefix="cascade")
+            self._puts = ThreadPoolExecutor(self.workers, thread_name_prefix="cascade-put")
+        return self._runners, self._puts
+
+    def submit(self, key: Hashable, target: Any) -> None:
+        """Ask for `key`'s devices to converge to `target`; never blocks on I/O."""
+        with self._lock:
+            self.counters["submitted"] += 1
+            if key in self._pending:
+                self.counters["coalesced"] += 1
+            self._pending[key] = target
+            if key in self._active:
+                return  # o runner ativo pega o novo alvo ao terminar a rodada
+            self._active.add(key)
+            runners, _ = self._pools()
+        runners.submit(self._run, key)
+
+    def _superseded(self, key: Hashable, target: Any) -> bool:
+        with self._lock:
+            return key in self._pending and self._pending[key] != target
+
+    def _put_one(self, key: Hashable, target: Any, payload: Dict[str, Any]) -> Optional[bool]:
+        if self._superseded(key, target):
+            return None
+        return self._put(key, target, payload)
+
+    def _run(self, key: Hashable) -> None:
+        while True:
+            with self._lock:
+                if key not in self._pending:
+                    self._active.discard(key)
+                    if not self._active:
+                        self._idle.notify_all()
+                    return
+                target = self._pending.pop(key)
+                _, puts = self._pools()
+
+            try:
+                payloads = self._plan(key, target)
+                results = [f.result() for f in wait(
+                    [puts.submit(self._put_one, key, target, p) for p in payloads]
+                ).done]
+            except Exception as e:  # uma cascata ruim não derruba o runner
+                print(f"❌ Cascade for {key} failed: {e!r}")
+                continue
+
+            applied = sum(1 for ok in results if ok)
+            with self._lock:
+                self.counters["applied_puts"] += applied
+                self.counters["failed_puts"] += sum(1 for ok in results if ok is False)
+                self.counters["skipped_puts"] += sum(1 for ok in results if ok is None)
+            if self._on_done:
+                try:
+                    self._on_done(key, target, applied)
+                except Exception as e:  # nem um callback ruim (a chave ficaria ativa para sempre)
+                    print(f"❌ Cascade callback for {key} failed: {e!r}")
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no cascade is queued or running."""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._active, timeout)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            runners, puts = self._runners, self._puts
+            self._runners = self._puts = None
+        for pool in (runners, puts):
+            if pool:
+                pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "pending": len(self._pending), "active": len(self._active)}
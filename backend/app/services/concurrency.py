@@ -0,0 +1,36 @@
+# app/services/concurrency.py
+
+import asyncio
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, Union
+
+
+async def run_bounded(
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+    worker: Callable[[Any], Awaitable[None]],
+    limit: int,
+) -> None:
+    """
+    Run `worker(item)` for every item with at most `limit` coroutines alive at once.
+    Items are pulled lazily, so very large iterables never become a million pending tasks.
+    Async iterables (e.g. a list still streaming in) are pulled one item at a time.
+    """
+    if hasattr(items, "__aiter__"):
+        aiterator = items.__aiter__()
+        pull = asyncio.Lock()
+
+        async def _drain() -> None:
+            while True:
+                async with pull:  # um async generator não aceita __anext__ concorrente
+                    try:
+                        item = await aiterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                await worker(item)
+    else:
+        iterator = iter(items)
+
+        async def _drain() -> None:
+            for item in iterator:
+                await worker(item)
+
+    await asyncio.gather(*(_drain() for _ in range(max(1, limit))))
@@ -0,0 +1,76 @@
+# app/services/device_index.py
+
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class GatewayDeviceIndex:
+    """
+    In-memory view of the device registry grouped by gateway MAC.
+
+    Built once from a full GET of the devices (`load`) and then kept current by
+    every successful POST/PUT we make (`upsert`), so a gateway cascade reads only
+    that gateway's devices instead of refetching and scanning the whole list.
+    Records are the full device JSON (as the GET returns it), ready for a full PUT.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_gateway: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._gateway_of: Dict[str, str] = {}
+        self.loaded = False
+
+    @staticmethod
+    def _gateway_mac(device: Dict[str, Any]) -> Optional[str]:
+        return (device.get("gateway") or {}).get("mac")
+
+    def _upsert_locked(self, device: Dict[str, Any]) -> None:
+        dev_id = device.get("id")
+        if not dev_id:
+            return
+        mac = self._gateway_mac(device)
+        old_mac = self._gateway_of.get(dev_id)
+        if old_mac is not None and old_mac != mac:
+            self._by_gateway.get(old_mac, {}).pop(dev_id, None)
+        if mac is None:
+            self._gateway_of.pop(dev_id, None)
+            return
+        self._gateway_of[dev_id] = mac
+        self._by_gateway.setdefault(mac, {})[dev_id] = device
+
+    def load(self, devices: List[Dict[str, Any]]) -> None:
+        """(Re)build the index from a full device list."""
+        with self._lock:
+            self._by_gateway = {}
+            self._gateway_of = {}
+            for device in devices:
+                self._upsert_locked(device)
+            self.loaded = True
+
+    def upsert(self, device: Dict[str, Any]) -> None:
+        """
+        Record a device we just created or updated upstream (moves it if its gateway changed).
+        No-op until loaded: the first load reads the full list anyway.
+        """
+        with self._lock:
+            if self.loaded:
+                self._upsert_locked(device)
+
+    def devices_for(self, gateway_mac: str) -> List[Dict[str, Any]]:
+        """Snapshot of the devices attached to `gateway_mac`."""
+        with self._lock:
+            return list(self._by_gateway.get(gateway_mac, {}).values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_gateway = {}
+            self._gateway_of = {}
+            self.loaded = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"loaded": self.loaded, "gateways": len(self._by_gateway), "devices": len(self._gateway_of)}
+
+
+# Índice compartilhado pelos loops de status, pela cascata e pelas rotas de device
+device_index = GatewayDeviceIndex()
@@ -0,0 +1,153 @@
+# app/services/device_power.py
+
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import DEVICE_POWER_TRANSITIONS
+
+# Devices do streaming avançam em blocos deste tamanho (o 1º envio espera só um bloco)
+STREAM_STEP_CHUNK = 1024
+
+# (posição, device, mudou?, status ON/OFF após o passo)
+PowerStep = Tuple[int, Dict[str, Any], bool, bool]
+
+
+class DevicePowerState:
+    """
+    ON/OFF power state of every device in a NumPy bool array, indexed by device slot
+    (position in the list given to `load`).
+
+    `step` advances all devices (or the given slots) with one vectorized two-state
+    Markov draw: ON→OFF with prob_down, OFF→ON with prob_up. The probabilities can be
+    overridden per device `category` ("sensor", "actuator") through `transitions`,
+    e.g. {"actuator": {"prob_down": 0.05, "prob_up": 0.5}}.
+    """
+
+    def __init__(self, transitions: Optional[Dict[str, Dict[str, float]]] = None, rng: Optional[np.random.Generator] = None):
+        self.transitions = DEVICE_POWER_TRANSITIONS if transitions is None else transitions
+        self.rng = rng or np.random.default_rng()
+        self.devices: Sequence[Dict[str, Any]] = []
+        self.active = np.zeros(0, dtype=bool)
+        self._codes = np.zeros(0, dtype=np.int32)
+        self._categories: List[Any] = []
+        self._slots: Dict[Any, int] = {}
+        self.counters = {"loads": 0, "steps": 0, "transitions": 0}
+
+    def __len__(self) -> int:
+        return len(self.active)
+
+    def load(self, devices: Sequence[Dict[str, Any]]) -> None:
+        """(Re)build the arrays from the records' current `status` and `category`."""
+        n = len(devices)
+        categories: Dict[Any, int] = {}
+        self.devices = devices
+        self.active = np.fromiter((bool(d.get("status", True)) for d in devices), dtype=bool, count=n)
+        self._codes = np.fromiter(
+            (categories.setdefault(d.get("category"), len(categories)) for d in devices), dtype=np.int32, count=n
+        )
+        self._categories = list(categories)
+        self._slots = {d.get("id"): i for i, d in enumerate(devices)}
+        self.counters["loads"] += 1
+
+    def sync(self, devices: Sequence[Dict[str, Any]]) -> None:
+        """Reload only when `devices` is a different list (new fetch) or grew/shrank."""
+        if devices is not self.devices or len(devices) != len(self.active):
+            self.load(devices)
+
+    def _probabilities(self, prob_down: float, prob_up: float) -> Tuple[np.ndarray, np.ndarray]:
+        down = [self.transitions.get(c, {}).get("prob_down", prob_down) for c in self._categories]
+        up = [self.transitions.get(c, {}).get("prob_up", prob_up) for c in self._categories]
+        return np.array(down, dtype=float), np.array(up, dtype=float)
+
+    def step(self, prob_down: float, prob_up: float, slots: Optional[np.ndarray] = None) -> np.ndarray:
+        """One Markov step for `slots` (default: every device); returns the bool mask of flips."""
+        idx = slice(None) if slots is None else np.asarray(slots, dtype=np.int64)
+        down, up = self._probabilities(prob_down, prob_up)
+        active = self.active[idx]
+        codes = self._codes[idx]
+        flip = self.rng.random(len(active)) < np.where(active, down[codes], up[codes])
+        self.active[idx] = active ^ flip
+        self.counters["steps"] += 1
+        self.counters["transitions"] += int(flip.sum())
+        return flip
+
+    def clear(self) -> None:
+        """Forget the arrays; the next `sync` reloads them from the records."""
+        self.devices = []
+        self.active = np.zeros(0, dtype=bool)
+        self._codes = np.zeros(0, dtype=np.int32)
+        self._categories = []
+        self._slots = {}
+
+    def revert(self, device_id: Any, status: bool) -> None:
+        """
+        A PUT to `status` failed: if the device is still in the loaded list, go back to the
+        previous state. A no-op after `clear()` and for streamed rounds (power_steps keeps
+        their state in per-chunk arrays, rebuilt from the records on every round).
+        """
+        i = self._slots.get(device_id)
+        if i is None or i >= len(self.active) or self.devices[i].get("id") != device_id:
+            return
+        if self.active[i] == status:
+            self.active[i] = not status
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "devices": len(self.active), "on": int(self.active.sum())}
+
+
+def _chunk_steps(state: DevicePowerState, start: int, chunk: List[Dict[str, Any]], prob_down: float, prob_up: float) -> Iterator[PowerStep]:
+    state.load(chunk)
+    flips = state.step(prob_down, prob_up)
+    return zip(range(start, start + len(chunk)), chunk, flips.tolist(), state.active.tolist())
+
+
+def power_steps(
+    devices: Iterable[Dict[str, Any]], prob_down: float, prob_up: float, state: Optional[DevicePowerState] = None
+) -> Iterator[PowerStep]:
+    """
+    Step the power state of `devices` and yield (i, device, changed, status) in order.
+    A list keeps its state in `state` (default: device_power) between rounds; a stream
+    (iter_devices) is stepped in blocks, from the status each record arrives with.
+    """
+    if isinstance(devices, list):
+        state = device_power if state is None else state
+        state.sync(devices)
+        flips = state.step(prob_down, prob_up)
+        yield from zip(range(len(devices)), devices, flips.tolist(), state.active.tolist())
+        return
+
+    chunk_state = DevicePowerState(device_power.transitions, device_power.rng)
+    chunk: List[Dict[str, Any]] = []
+    start = 0
+    for device in devices:
+        chunk.append(device)
+        if len(chunk) == STREAM_STEP_CHUNK:
+            yield from _chunk_steps(chunk_state, start, chunk, prob_down, prob_up)
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield from _chunk_steps(chunk_state, start, chunk, prob_down, prob_up)
+
+
+async def apower_steps(
+    devices: AsyncIterable[Dict[str, Any]], prob_down: float, prob_up: float
+) -> AsyncIterator[PowerStep]:
+    """Async variant of power_steps for a streamed device list (aiter_devices)."""
+    chunk_state = DevicePowerState(device_power.transitions, device_power.rng)
+    chunk: List[Dict[str, Any]] = []
+    start = 0
+    async for device in devices:
+        chunk.append(device)
+        if len(chunk) == STREAM_STEP_CHUNK:
+            for item in _chunk_steps(chunk_state, start, chunk, prob_down, prob_up):
+                yield item
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        for item in _chunk_steps(chunk_state, start, chunk, prob_down, prob_up):
+            yield item
+
+
+# Estado ON/OFF compartilhado pelos loops de status de devices
+device_power = DevicePowerState()
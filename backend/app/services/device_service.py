@@ -3,51 +3,63 @@ import random
 import uuid
 import math
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterator, Optional
+
+import numpy as np
+
 from app.config import GATEWAY_API_URL
-from app.config import DEVICE_API_URL
+from app.config import DEVICE_API_URL, BULK_SEND_WORKERS, DEVICE_STATUS_INTERVALS
+from app.services import upstream
+from app.services.bulk_sender import send_bulk
+from app.services.device_index import device_index
+from app.services.registry_cache import registry_cache
+from app.services.json_stream import iter_json_array, STREAM_CHUNK_BYTES
+from app.services.payload_template import date_dict
 
 # Device Types
+# "interval": período típico (s) de reporte de status de cada tipo
 DEVICE_TYPES = [
-    {"name": "temperature sensor", "type": "sensor"},
-    {"name": "humidity sensor", "type": "sensor"},
-    {"name": "air quality sensor", "type": "sensor"},
-    {"name": "noise level sensor", "type": "sensor"},
-    {"name": "CO2 sensor", "type": "sensor"},
-    {"name": "traffic flow sensor", "type": "sensor"},
-    {"name": "parking occupancy sensor", "type": "sensor"},
-    {"name": "smart energy meter", "type": "sensor"},
-    {"name": "waste bin fill-level sensor", "type": "sensor"},
-    {"name": "flood detection sensor", "type": "sensor"},
-    {"name": "rain gauge sensor", "type": "sensor"},
-    {"name": "UV radiation sensor", "type": "sensor"},
-    {"name": "wind speed sensor", "type": "sensor"},
-    {"name": "motion detector (public spaces)", "type": "sensor"},
-    {"name": "camera (CCTV)", "type": "sensor"},
-
-    {"name": "smart traffic light controller", "type": "actuator"},
-    {"name": "smart streetlight", "type": "actuator"},
-    {"name": "public irrigation valve", "type": "actuator"},
-    {"name": "electric vehicle charging station", "type": "actuator"},
-    {"name": "automated waste compactor", "type": "actuator"},
-    {"name": "environmental alarm system", "type": "actuator"},
-    {"name": "automatic barrier gate", "type": "actuator"},
-    {"name": "dynamic road sign", "type": "actuator"},
-    {"name": "smart ventilation system", "type": "actuator"},
-    {"name": "drainage control valve", "type": "actuator"},
-    {"name": "emergency siren", "type": "actuator"},
-    {"name": "smart building HVAC control", "type": "actuator"},
-    {"name": "automated street cleaning system", "type": "actuator"},
-    {"name": "public display panel", "type": "actuator"},
-    {"name": "smart crosswalk signal", "type": "actuator"}
+    {"name": "temperature sensor", "type": "sensor", "interval": 60},
+    {"name": "humidity sensor", "type": "sensor", "interval": 60},
+    {"name": "air quality sensor", "type": "sensor", "interval": 30},
+    {"name": "noise level sensor", "type": "sensor", "interval": 10},
+    {"name": "CO2 sensor", "type": "sensor", "interval": 60},
+    {"name": "traffic flow sensor", "type": "sensor", "interval": 5},
+    {"name": "parking occupancy sensor", "type": "sensor", "interval": 30},
+    {"name": "smart energy meter", "type": "sensor", "interval": 300},
+    {"name": "waste bin fill-level sensor", "type": "sensor", "interval": 900},
+    {"name": "flood detection sensor", "type": "sensor", "interval": 30},
+    {"name": "rain gauge sensor", "type": "sensor", "interval": 600},
+    {"name": "UV radiation sensor", "type": "sensor", "interval": 300},
+    {"name": "wind speed sensor", "type": "sensor", "interval": 10},
+    {"name": "motion detector (public spaces)", "type": "sensor", "interval": 2},
+    {"name": "camera (CCTV)", "type": "sensor", "interval": 1},
+
+    {"name": "smart traffic light controller", "type": "actuator", "interval": 1},
+    {"name": "smart streetlight", "type": "actuator", "interval": 300},
+    {"name": "public irrigation valve", "type": "actuator", "interval": 600},
+    {"name": "electric vehicle charging station", "type": "actuator", "interval": 30},
+    {"name": "automated waste compactor", "type": "actuator", "interval": 600},
+    {"name": "environmental alarm system", "type": "actuator", "interval": 10},
+    {"name": "automatic barrier gate", "type": "actuator", "interval": 5},
+    {"name": "dynamic road sign", "type": "actuator", "interval": 60},
+    {"name": "smart ventilation system", "type": "actuator", "interval": 120},
+    {"name": "drainage control valve", "type": "actuator", "interval": 60},
+    {"name": "emergency siren", "type": "actuator", "interval": 10},
+    {"name": "smart building HVAC control", "type": "actuator", "interval": 120},
+    {"name": "automated street cleaning system", "type": "actuator", "interval": 300},
+    {"name": "public display panel", "type": "actuator", "interval": 60},
+    {"name": "smart crosswalk signal", "type": "actuator", "interval": 2}
 ]
 
+# Intervalo de status (s) por tipo no loop per_entity; DEVICE_STATUS_INTERVALS sobrescreve
+STATUS_INTERVAL_BY_TYPE: Dict[str, float] = {t["name"]: t["interval"] for t in DEVICE_TYPES}
+STATUS_INTERVAL_BY_TYPE.update(DEVICE_STATUS_INTERVALS)
+
 
 def fetch_gateways() -> List[Dict[str, Any]]:
     try:
-        response = requests.get(GATEWAY_API_URL)
-        response.raise_for_status()
-        return response.json()
+        return registry_cache.get(GATEWAY_API_URL)
     except requests.RequestException as e:
         print(f"❌ Error fetching gateways: {e}")
         return []
@@ -55,14 +67,25 @@ def fetch_gateways() -> List[Dict[str, Any]]:
 
 def fetch_devices() -> List[Dict[str, Any]]:
     try:
-        response = requests.get(DEVICE_API_URL)
-        response.raise_for_status()
-        return response.json()
+        return registry_cache.get(DEVICE_API_URL)
     except requests.RequestException as e:
         print(f"❌ Error fetching devices: {e}")
         return []
 
 
+def iter_devices() -> Iterator[Dict[str, Any]]:
+    """
+    Stream the device list: yields each record as soon as it is parsed from the body,
+    without materializing the list (and without the registry cache).
+    """
+    try:
+        with upstream.get(DEVICE_API_URL, stream=True) as response:
+            response.raise_for_status()
+            yield from iter_json_array(response.iter_content(STREAM_CHUNK_BYTES))
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Error streaming devices: {e}")
+
+
 def generate_random_coordinate(center_lat: float, center_lon: float, radius_km: float) -> Dict[str, float]:
     earth_radius_km = 6371.0
     delta_lat = (radius_km / earth_radius_km) * (180 / math.pi)
@@ -92,24 +115,146 @@ def generate_device(gateway: Dict[str, Any], radius_km: float) -> Dict[str, Any]
         "typeDevice": device_type["name"],
         "category": device_type["type"],
         "status": random.choice([True, False]),
-        "date": {
-            "year": now.year,
-            "month": now.month,
-            "dayOfMonth": now.day,
-            "hourOfDay": now.hour,
-            "minute": now.minute,
-            "second": now.second,
-        },
+        "date": date_dict(now),
         "gateway": {
             "mac": gateway["mac"]
         }
     }
 
 
+class DeviceBatch:
+    """
+    N devices stored column-wise in NumPy arrays, each pointing to a gateway slot.
+    Dicts (same shape as generate_device) are only built when iterated, at send time.
+    """
+
+    CHUNK = 4096
+
+    def __init__(
+        self,
+        gateway_macs: List[str],
+        gateway_idx: np.ndarray,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        type_idx: np.ndarray,
+        statuses: np.ndarray,
+        uuid_bytes: np.ndarray,
+        timestamp: datetime,
+    ):
+        self.gateway_macs = gateway_macs
+        self.gateway_idx = gateway_idx
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.type_idx = type_idx
+        self.statuses = statuses
+        self.uuid_bytes = uuid_bytes
+        self.timestamp = timestamp
+        self._date = date_dict(timestamp)
+
+    def __len__(self) -> int:
+        return len(self.gateway_idx)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Converte colunas em listas (e UUIDs em hex) por blocos; indexar arrays item a item é lento
+        for start in range(0, len(self), self.CHUNK):
+            stop = start + self.CHUNK
+            hex_ids = self.uuid_bytes[start:stop].tobytes().hex()
+            columns = zip(
+                range(0, len(hex_ids), 32),
+                self.gateway_idx[start:stop].tolist(),
+                self.latitudes[start:stop].tolist(),
+                self.longitudes[start:stop].tolist(),
+                self.type_idx[start:stop].tolist(),
+                self.statuses[start:stop].tolist(),
+            )
+            for offset, gw, lat, lon, type_i, status in columns:
+                yield self._build(_format_uuid(hex_ids, offset), gw, lat, lon, type_i, status)
+
+    def to_dict(self, i: int) -> Dict[str, Any]:
+        return self._build(
+            _format_uuid(self.uuid_bytes[i].tobytes().hex(), 0),
+            int(self.gateway_idx[i]),
+            float(self.latitudes[i]),
+            float(self.longitudes[i]),
+            int(self.type_idx[i]),
+            bool(self.statuses[i]),
+        )
+
+    def _build(self, device_id, gw, lat, lon, type_i, status) -> Dict[str, Any]:
+        device_type = DEVICE_TYPES[type_i]
+        return {
+            "id": device_id,
+            "coordinates": {"latitude": lat, "longitude": lon},
+            "description": "DTM",
+            "typeDevice": device_type["name"],
+            "category": device_type["type"],
+            "status": status,
+            "date": dict(self._date),
+            "gateway": {
+                "mac": self.gateway_macs[gw]
+            }
+        }
+
+
+def _format_uuid(hex_ids: str, offset: int) -> str:
+    h = hex_ids[offset:offset + 32]
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _uuid4_bytes(total: int, rng: np.random.Generator) -> np.ndarray:
+    """`total` version-4 UUIDs as a (total, 16) uint8 array, cut from a single random buffer."""
+    buf = np.frombuffer(rng.bytes(16 * total), dtype=np.uint8).reshape(total, 16).copy()
+    buf[:, 6] = (buf[:, 6] & 0x0F) | 0x40  # versão 4
+    buf[:, 8] = (buf[:, 8] & 0x3F) | 0x80  # variante RFC 4122
+    return buf
+
+
+def generate_device_batch(
+    total: int,
+    gateways: List[Dict[str, Any]],
+    radius_km: float,
+    rng: Optional[np.random.Generator] = None,
+) -> DeviceBatch:
+    """
+    Assign `total` devices to random gateways and place them around each gateway
+    in one vectorized pass. Gateways without coordinates never receive devices.
+    """
+    rng = rng or np.random.default_rng()
+
+    placeable = [gw for gw in gateways if gw.get("coordinates") and gw.get("mac")]
+    if len(placeable) < len(gateways):
+        print(f"⚠️ {len(gateways) - len(placeable)} gateway(s) without valid coordinates skipped.")
+    if not placeable:
+        raise ValueError("no gateway with valid coordinates")
+
+    gw_lat = np.array([gw["coordinates"]["latitude"] for gw in placeable], dtype=np.float64)
+    gw_lon = np.array([gw["coordinates"]["longitude"] for gw in placeable], dtype=np.float64)
+
+    gateway_idx = rng.integers(0, len(placeable), total, dtype=np.int64)
+    center_lat = gw_lat[gateway_idx]
+
+    earth_radius_km = 6371.0
+    delta_lat = (radius_km / earth_radius_km) * (180 / math.pi)
+    delta_lon = delta_lat / np.cos(center_lat * math.pi / 180)
+    offsets = rng.uniform(-1.0, 1.0, (2, total))
+
+    return DeviceBatch(
+        gateway_macs=[gw["mac"] for gw in placeable],
+        gateway_idx=gateway_idx,
+        latitudes=center_lat + offsets[0] * delta_lat,
+        longitudes=gw_lon[gateway_idx] + offsets[1] * delta_lon,
+        type_idx=rng.integers(0, len(DEVICE_TYPES), total, dtype=np.uint8),
+        statuses=rng.integers(0, 2, total, dtype=np.uint8).astype(bool),
+        uuid_bytes=_uuid4_bytes(total, rng),
+        timestamp=datetime.now(),
+    )
+
+
 def send_device_to_api(device: Dict[str, Any]) -> Tuple[bool, str]:
     try:
-        response = requests.post(DEVICE_API_URL, json=device)
+        response = upstream.post(DEVICE_API_URL, json=device)
         response.raise_for_status()
+        device_index.upsert(device)
         print(f"✅ Device sent: {device['id']}")
         return True, f"Device {device['id']} sent successfully"
     except requests.RequestException as e:
@@ -117,31 +262,31 @@ def send_device_to_api(device: Dict[str, Any]) -> Tuple[bool, str]:
         return False, str(e)
 
 
-def generate_simulated_devices(total_devices: int, radius_km: float) -> Tuple[int, int]:
+def generate_simulated_devices(total_devices: int, radius_km: float, workers: int = BULK_SEND_WORKERS) -> Dict[str, Any]:
+    """Generate and send simulated devices with `workers` parallel senders. Returns the send accounting."""
     print(f"\n🔧 Generating {total_devices} simulated devices...")
     gateways = fetch_gateways()
+    not_sent = {"total": total_devices, "success_count": 0, "failure_count": total_devices,
+                "failed_ids": [], "elapsed_seconds": 0.0}
 
     if not gateways:
         print("⚠️ No gateways found. Aborting device generation.")
-        return 0, total_devices
-
-    success_count = 0
-    failure_count = 0
-
-    for _ in range(total_devices):
-        gateway = random.choice(gateways)
-        device = generate_device(gateway, radius_km)
-        if device:
-            success, _ = send_device_to_api(device)
-            if success:
-                success_count += 1
-            else:
-                failure_count += 1
-        else:
-            failure_count += 1
-
-    print(f"✔️ Device insertion completed. Success: {success_count}, Failed: {failure_count}")
-    return success_count, failure_count
+        return not_sent
+
+    try:
+        devices = generate_device_batch(total_devices, gateways, radius_km)
+    except ValueError:
+        print("⚠️ No gateways with valid coordinates. Aborting device generation.")
+        return not_sent
+
+    result = send_bulk(devices, send_device_to_api, workers=workers, key="id")
+    registry_cache.invalidate(DEVICE_API_URL)
+
+    print(
+        f"✔️ Device insertion completed. Success: {result['success_count']}, "
+        f"Failed: {result['failure_count']} in {result['elapsed_seconds']}s"
+    )
+    return result
 
 def get_device_ids() -> List[str]:
     """Retrieve list of device IDs from the API."""
@@ -160,8 +305,10 @@ def update_device(device_payload: dict):
     """
     try:
         # A API de vocês recebe PUT no mesmo endpoint do POST
-        resp = requests.put(DEVICE_API_URL, json=device_payload, timeout=10)
+        resp = upstream.put(DEVICE_API_URL, json=device_payload)
         resp.raise_for_status()
+        device_index.upsert(device_payload)
+        registry_cache.put_record(DEVICE_API_URL, device_payload, "id")
         return True, "OK"
     except requests.RequestException as e:
         return False, str(e)
\ No newline at end of file
@@ -0,0 +1,108 @@
+# app/services/gateway_metrics.py
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Fragmentos JSON constantes do POST de status: as métricas são arredondadas a 2 casas
+# em [0, 1], então cada valor possível (k/100) é codificado uma única vez
+_METRIC_JSON = [json.dumps(round(k / 100, 2)).encode() for k in range(101)]
+_STATUS_JSON = (b"false", b"true")
+_BATTERY_FRAGMENTS = [b'},"baterryLevel":' + v for v in _METRIC_JSON]
+_MEMORY_FRAGMENTS = [b',"usedMemory":' + v for v in _METRIC_JSON]
+_CPU_FRAGMENTS = [b',"usedProcessor":' + v + b"}" for v in _METRIC_JSON]
+
+
+class GatewayMetricState:
+    """
+    Battery/memory/CPU and ON/OFF state of every gateway, column-wise in NumPy arrays
+    indexed by gateway slot (position in `macs`).
+
+    `step()` advances all gateways (or the given slots) in one vectorized draw (ON/OFF
+    50/50, battery down 0.001-0.005, memory/CPU ±0.05, all rounded to 2 places and kept
+    in [0, 1]); `iter_bodies()` then renders
+    the JSON of each status POST from pre-encoded fragments (`iter_statuses()` gives the
+    same payloads as dicts), in chunks.
+    """
+
+    CHUNK = 4096
+
+    def __init__(self, macs: Sequence[str], rng: Optional[np.random.Generator] = None):
+        self.macs: List[str] = list(macs)
+        self.rng = rng or np.random.default_rng()
+        n = len(self.macs)
+        self.battery = np.round(self.rng.uniform(0.7, 1.0, n), 2)
+        self.memory = np.round(self.rng.uniform(0.2, 0.5, n), 2)
+        self.cpu = np.round(self.rng.uniform(0.2, 0.5, n), 2)
+        self.active = np.ones(n, dtype=bool)
+        # ,"gateway":{"mac":"...","status":  — constante por gateway
+        self._heads = [b',"gateway":{"mac":' + json.dumps(mac).encode() + b',"status":' for mac in self.macs]
+
+    def __len__(self) -> int:
+        return len(self.macs)
+
+    def step(self, slots: Optional[np.ndarray] = None) -> None:
+        """One status draw for `slots` (default: every gateway)."""
+        idx = slice(None) if slots is None else np.asarray(slots, dtype=np.int64)
+        n = len(self.macs) if slots is None else len(idx)
+        rng = self.rng
+
+        self.active[idx] = rng.random(n) < 0.5  # True/False com 50% de probabilidade
+        self.battery[idx] = np.maximum(0.0, np.round(self.battery[idx] - rng.uniform(0.001, 0.005, n), 2))
+        # "+ 0.0" normaliza o -0.0 de np.round (o JSON deve trazer 0.0, não -0.0)
+        self.memory[idx] = np.clip(np.round(self.memory[idx] + rng.uniform(-0.05, 0.05, n), 2), 0.0, 1.0) + 0.0
+        self.cpu[idx] = np.clip(np.round(self.cpu[idx] + rng.uniform(-0.05, 0.05, n), 2), 0.0, 1.0) + 0.0
+
+    def iter_statuses(
+        self, date: Dict[str, int], slots: Optional[np.ndarray] = None
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (slot, status payload) for `slots` (default: every gateway, in slot order)."""
+        idx = np.arange(len(self.macs)) if slots is None else np.asarray(slots, dtype=np.int64)
+        macs = self.macs
+        for start in range(0, len(idx), self.CHUNK):
+            part = idx[start:start + self.CHUNK]
+            columns = zip(
+                part.tolist(),
+                self.active[part].tolist(),
+                self.battery[part].tolist(),
+                self.memory[part].tolist(),
+                self.cpu[part].tolist(),
+            )
+            for i, active, battery, memory, cpu in columns:
+                yield i, {
+                    "date": date,
+                    "gateway": {"mac": macs[i], "status": active},
+                    "baterryLevel": battery,
+                    "usedMemory": memory,
+                    "usedProcessor": cpu,
+                }
+
+    def iter_bodies(
+        self, date: bytes, slots: Optional[np.ndarray] = None
+    ) -> Iterator[Tuple[int, str, bool, bytes]]:
+        """
+        Yield (slot, mac, status, JSON body) for `slots`, same content as iter_statuses.
+        `date` is the encoded date fragment (payload_template.date_fragment), shared by the tick.
+        """
+        idx = np.arange(len(self.macs)) if slots is None else np.asarray(slots, dtype=np.int64)
+        macs, heads = self.macs, self._heads
+        prefix = b'{"date":' + date
+        for start in range(0, len(idx), self.CHUNK):
+            part = idx[start:start + self.CHUNK]
+            columns = zip(
+                part.tolist(),
+                self.active[part].tolist(),
+                np.rint(self.battery[part] * 100).astype(np.int64).tolist(),
+                np.rint(self.memory[part] * 100).astype(np.int64).tolist(),
+                np.rint(self.cpu[part] * 100).astype(np.int64).tolist(),
+            )
+            for i, active, battery, memory, cpu in columns:
+                yield i, macs[i], active, b"".join((
+                    prefix,
+                    heads[i],
+                    _STATUS_JSON[active],
+                    _BATTERY_FRAGMENTS[battery],
+                    _MEMORY_FRAGMENTS[memory],
+                    _CPU_FRAGMENTS[cpu],
+                ))
@@ -2,7 +2,16 @@ import requests
 import random
 import math
 from datetime import datetime
-from app.config import GATEWAY_API_URL
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import GATEWAY_API_URL, BULK_SEND_WORKERS, GATEWAY_STATUS_INTERVALS
+from app.services import upstream
+from app.services.address_allocator import AddressAllocator
+from app.services.bulk_sender import send_bulk
+from app.services.payload_template import date_dict
+from app.services.registry_cache import registry_cache
 
 # Manufacturers and Solutions
 GATEWAY_MANUFACTURERS = [
@@ -18,6 +27,14 @@ SMART_SOLUTIONS = [
     "water quality", "traffic congestion", "smart lighting", "air pollution", "forest fire detection"
 ]
 
+# Intervalo de status (s) por solution no loop per_entity; GATEWAY_STATUS_INTERVALS sobrescreve
+SOLUTION_STATUS_INTERVALS: Dict[str, float] = {
+    "smart traffic": 5, "smart parking": 30, "structural health": 60,
+    "water quality": 300, "traffic congestion": 10, "smart lighting": 120, "air pollution": 60,
+    "forest fire detection": 30,
+}
+SOLUTION_STATUS_INTERVALS.update(GATEWAY_STATUS_INTERVALS)
+
 
 def generate_random_coordinate(center_lat, center_lon, radius_km):
     """Generate random geographic coordinates within a radius."""
@@ -50,23 +67,183 @@ def generate_gateway(center_lat, center_lon, radius_km):
         "manufacturer": random.choice(GATEWAY_MANUFACTURERS),
         "hostName": f"GT{random.randint(0, 191)}",
         "status": True,
-        "date": {
-            "year": now.year,
-            "month": now.month,
-            "dayOfMonth": now.day,
-            "hourOfDay": now.hour,
-            "minute": now.minute,
-            "second": now.second
-        },
+        "date": date_dict(now),
         "solution": random.choice(SMART_SOLUTIONS),
         "coordinates": generate_random_coordinate(center_lat, center_lon, radius_km)
     }
 
 
+# Espaços de endereçamento usados pelo simulador (mesmo formato de generate_mac/generate_ip)
+MAC_OCTET_RANGE = 32     # seis valores em 0..31
+IP_OCTET_RANGE = 192     # quatro valores em 0..191
+HOST_ID_RANGE = 192      # GT0..GT191
+
+# Tabelas de pares de octetos pré-formatados ("a:b" / "a.b"), usadas na materialização
+_MAC_PAIRS = [f"{a}:{b}" for a in range(MAC_OCTET_RANGE) for b in range(MAC_OCTET_RANGE)]
+_IP_PAIRS = [f"{a}.{b}" for a in range(IP_OCTET_RANGE) for b in range(IP_OCTET_RANGE)]
+_IP_PAIR_RANGE = IP_OCTET_RANGE ** 2
+
+
+def mac_from_code(code: int) -> str:
+    """Decode a packed MAC code (six base-32 digits) into the simulator's MAC string."""
+    return f"{_MAC_PAIRS[code >> 20]}:{_MAC_PAIRS[(code >> 10) & 1023]}:{_MAC_PAIRS[code & 1023]}"
+
+
+def ip_from_code(code: int) -> str:
+    """Decode a packed IP code (four base-192 digits) into a dotted IP string."""
+    high, low = divmod(code, _IP_PAIR_RANGE)
+    return f"{_IP_PAIRS[high]}.{_IP_PAIRS[low]}"
+
+
+def _code_from_octets(text: str, sep: str, count: int, base: int) -> Optional[int]:
+    parts = text.split(sep)
+    if len(parts) != count:
+        return None
+    code = 0
+    for part in parts:
+        if not part.isdigit() or int(part) >= base:
+            return None
+        code = code * base + int(part)
+    return code
+
+
+def mac_to_code(mac: str) -> Optional[int]:
+    """Inverse of mac_from_code; None if the MAC is outside the simulator's address space."""
+    return _code_from_octets(mac, ":", 6, MAC_OCTET_RANGE)
+
+
+def ip_to_code(ip: str) -> Optional[int]:
+    """Inverse of ip_from_code; None if the IP is outside the simulator's address space."""
+    return _code_from_octets(ip, ".", 4, IP_OCTET_RANGE)
+
+
+# Alocadores compartilhados: MACs/IPs nunca se repetem durante a execução
+mac_allocator = AddressAllocator(MAC_OCTET_RANGE ** 6)
+ip_allocator = AddressAllocator(IP_OCTET_RANGE ** 4)
+
+
+def reserve_upstream_addresses(gateways: List[Dict[str, Any]]) -> None:
+    """Reserve the MACs/IPs already registered upstream so the allocators skip them."""
+    macs = (mac_to_code(gw.get("mac") or "") for gw in gateways)
+    ips = (ip_to_code(gw.get("ip") or "") for gw in gateways)
+    new_macs = mac_allocator.reserve(c for c in macs if c is not None)
+    new_ips = ip_allocator.reserve(c for c in ips if c is not None)
+    print(f"🔒 Reserved {new_macs} MAC(s) and {new_ips} IP(s) already registered upstream.")
+
+
+class GatewayBatch:
+    """
+    N gateways stored column-wise in NumPy arrays.
+    Nothing is turned into a dict until `to_dict` / iteration, i.e. at send time.
+    """
+
+    CHUNK = 4096
+
+    def __init__(
+        self,
+        mac_codes: np.ndarray,
+        ip_codes: np.ndarray,
+        manufacturer_idx: np.ndarray,
+        host_ids: np.ndarray,
+        solution_idx: np.ndarray,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        timestamp: datetime,
+    ):
+        self.mac_codes = mac_codes
+        self.ip_codes = ip_codes
+        self.manufacturer_idx = manufacturer_idx
+        self.host_ids = host_ids
+        self.solution_idx = solution_idx
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.timestamp = timestamp
+        self._date = date_dict(timestamp)
+
+    def __len__(self) -> int:
+        return len(self.mac_codes)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Converte as colunas em listas por blocos: indexar arrays NumPy item a item é lento
+        for start in range(0, len(self), self.CHUNK):
+            stop = start + self.CHUNK
+            columns = zip(
+                self.mac_codes[start:stop].tolist(),
+                self.ip_codes[start:stop].tolist(),
+                self.manufacturer_idx[start:stop].tolist(),
+                self.host_ids[start:stop].tolist(),
+                self.solution_idx[start:stop].tolist(),
+                self.latitudes[start:stop].tolist(),
+                self.longitudes[start:stop].tolist(),
+            )
+            for row in columns:
+                yield self._build(*row)
+
+    def mac(self, i: int) -> str:
+        return mac_from_code(int(self.mac_codes[i]))
+
+    def to_dict(self, i: int) -> Dict[str, Any]:
+        """Materialize gateway `i` with the same shape as generate_gateway."""
+        return self._build(
+            int(self.mac_codes[i]), int(self.ip_codes[i]), int(self.manufacturer_idx[i]),
+            int(self.host_ids[i]), int(self.solution_idx[i]),
+            float(self.latitudes[i]), float(self.longitudes[i]),
+        )
+
+    def _build(self, mac_code, ip_code, manufacturer, host_id, solution, lat, lon) -> Dict[str, Any]:
+        return {
+            "mac": mac_from_code(mac_code),
+            "ip": ip_from_code(ip_code),
+            "manufacturer": GATEWAY_MANUFACTURERS[manufacturer],
+            "hostName": f"GT{host_id}",
+            "status": True,
+            "date": dict(self._date),
+            "solution": SMART_SOLUTIONS[solution],
+            "coordinates": {"latitude": lat, "longitude": lon}
+        }
+
+
+def generate_gateway_batch(
+    total: int,
+    center_lat: float,
+    center_lon: float,
+    radius_km: float,
+    rng: Optional[np.random.Generator] = None,
+    unique_addresses: bool = True,
+) -> GatewayBatch:
+    """
+    Generate `total` gateways in one vectorized pass (same distributions as generate_gateway).
+    With `unique_addresses`, MACs/IPs come from the shared collision-free allocators.
+    """
+    rng = rng or np.random.default_rng()
+
+    if unique_addresses:
+        mac_codes = mac_allocator.allocate(total)
+        ip_codes = ip_allocator.allocate(total)
+    else:
+        mac_codes = rng.integers(0, MAC_OCTET_RANGE ** 6, total, dtype=np.uint32)
+        ip_codes = rng.integers(0, IP_OCTET_RANGE ** 4, total, dtype=np.uint32)
+
+    earth_radius_km = 6371.0
+    delta_lat = (radius_km / earth_radius_km) * (180 / math.pi)
+    delta_lon = delta_lat / math.cos(center_lat * math.pi / 180)
+
+    return GatewayBatch(
+        mac_codes=mac_codes,
+        ip_codes=ip_codes,
+        manufacturer_idx=rng.integers(0, len(GATEWAY_MANUFACTURERS), total, dtype=np.uint8),
+        host_ids=rng.integers(0, HOST_ID_RANGE, total, dtype=np.uint8),
+        solution_idx=rng.integers(0, len(SMART_SOLUTIONS), total, dtype=np.uint8),
+        latitudes=center_lat + rng.uniform(-delta_lat, delta_lat, total),
+        longitudes=center_lon + rng.uniform(-delta_lon, delta_lon, total),
+        timestamp=datetime.now(),
+    )
+
+
 def send_gateway_to_api(gateway: dict):
     """Send a generated gateway to the API."""
     try:
-        response = requests.post(GATEWAY_API_URL, json=gateway, timeout=10)
+        response = upstream.post(GATEWAY_API_URL, json=gateway)
         response.raise_for_status()
         print(f"✅ Gateway sent: {gateway['mac']}")
         return True
@@ -81,51 +258,55 @@ def send_gateway_to_api(gateway: dict):
     return False
 
 
-def generate_simulated_gateways(total_gateways: int, center_lat: float, center_lon: float, radius_km: float) -> int:
-    """Generate and send simulated gateways. Returns number of successful sends."""
-    print(f"\n🚀 Generating {total_gateways} simulated gateways...")
-    gateways = [generate_gateway(center_lat, center_lon, radius_km) for _ in range(total_gateways)]
+def _send_gateway_for_bulk(gateway: dict) -> Tuple[bool, str]:
+    return send_gateway_to_api(gateway), ""
 
-    success_count = 0
-    for gateway in gateways:
-        success = send_gateway_to_api(gateway)
-        if success:
-            success_count += 1
-        else:
-            print(f"❌ Failed to send gateway {gateway['mac']}")
 
-    print(f"✔️ Gateway generation process completed. {success_count}/{total_gateways} successful.")
-    return success_count
+def generate_simulated_gateways(
+    total_gateways: int,
+    center_lat: float,
+    center_lon: float,
+    radius_km: float,
+    workers: int = BULK_SEND_WORKERS,
+) -> Dict[str, Any]:
+    """Generate and send simulated gateways with `workers` parallel senders. Returns the send accounting."""
+    print(f"\n🚀 Generating {total_gateways} simulated gateways...")
+    reserve_upstream_addresses(get_gateway_records())
+    gateways = generate_gateway_batch(total_gateways, center_lat, center_lon, radius_km)
 
+    result = send_bulk(gateways, _send_gateway_for_bulk, workers=workers, key="mac")
+    registry_cache.invalidate(GATEWAY_API_URL)
 
-def get_macs():
-    """Retrieve MAC addresses from API."""
-    macs = []
+    print(
+        f"✔️ Gateway generation process completed. {result['success_count']}/{total_gateways} successful "
+        f"in {result['elapsed_seconds']}s."
+    )
+    return result
 
-    try:
-        response = requests.get(GATEWAY_API_URL, timeout=10)
-        response.raise_for_status()
 
-        devices = response.json()
+def get_gateway_records() -> List[Dict[str, Any]]:
+    """Retrieve the full gateway records from API."""
+    try:
+        gateways = registry_cache.get(GATEWAY_API_URL)
 
-        if not isinstance(devices, list):
-            print("⚠️ API response is not a list of devices.")
+        if not isinstance(gateways, list):
+            print("⚠️ API response is not a list of gateways.")
             return []
 
-        for device in devices:
-            mac = device.get("mac")
-            if mac:
-                macs.append(mac)
-
-        return macs
+        return gateways
 
     except requests.exceptions.Timeout:
-        print("⏳ Timeout error while fetching MAC addresses.")
+        print("⏳ Timeout error while fetching gateways.")
     except requests.exceptions.ConnectionError:
-        print("🔌 Connection error while fetching MAC addresses. Check API or network.")
+        print("🔌 Connection error while fetching gateways. Check API or network.")
     except requests.exceptions.HTTPError as http_err:
-        print(f"⚠️ HTTP error: {http_err} - Status code: {response.status_code}")
+        print(f"⚠️ HTTP error: {http_err} - Status code: {http_err.response.status_code}")
     except requests.exceptions.RequestException as e:
-        print(f"❌ Unexpected error fetching MAC addresses: {e}")
+        print(f"❌ Unexpected error fetching gateways: {e}")
 
     return []
+
+
+def get_macs():
+    """Retrieve MAC addresses from API."""
+    return [gateway["mac"] for gateway in get_gateway_records() if gateway.get("mac")]
@@ -0,0 +1,214 @@
+# app/services/gateway_status_async_service.py
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.services import upstream, status_spool
+from app.services import gateway_status_service as sync_service
+from app.services.concurrency import run_bounded
+from app.services.scheduler import TickScheduler
+from app.services.timer_wheel import TimerWheel
+from app.services.device_index import device_index
+from app.services.gateway_metrics import GatewayMetricState
+from app.services.payload_template import date_fragment, JSON_HEADERS
+from app.services.status_batcher import StatusBatcher, open_status_batcher
+from app.services.rate_limiter import TokenBucket, open_bucket, close_bucket
+from app.services.gateway_service import get_macs, SOLUTION_STATUS_INTERVALS
+from app.services.gateway_status_service import (
+    _fetch_gateways_by_mac,
+    _maybe_put_gateway_status,
+)
+from app.config import (
+    GATEWAY_STATUS_API_URL,
+)
+
+# Limite padrão de requisições simultâneas por tick
+DEFAULT_CONCURRENCY = 100
+
+
+async def send_status_to_api(body: bytes, mac: str, sem: asyncio.Semaphore) -> bool:
+    """Envia o status (JSON já serializado) para a API de histórico (assíncrono)."""
+    try:
+        async with sem:
+            response = await upstream.apost(GATEWAY_STATUS_API_URL, content=body, headers=JSON_HEADERS)
+        response.raise_for_status()
+        return True
+    except httpx.HTTPError as e:
+        print(f"❌ Error sending status {mac}: {e!r}")
+        await status_spool.acapture(GATEWAY_STATUS_API_URL, (body,), e)
+        return False
+
+
+async def _tick_gateway(
+    item: Tuple[int, str, bool, bytes],
+    gateways_by_mac: Dict[str, Dict[str, Any]],
+    sem: asyncio.Semaphore,
+    sent: List[int],
+    batcher: Optional[StatusBatcher] = None,
+) -> None:
+    _, mac, active, body = item
+
+    # 2) Envia o status (já sorteado em GatewayMetricState.step) para a API de histórico
+    if batcher:
+        await batcher.aadd(body)
+        sent[0] += 1
+    elif await send_status_to_api(body, mac, sem):
+        sent[0] += 1
+
+    # 3) PUT (fila write-behind) + cascata/restore se o status mudou
+    _maybe_put_gateway_status(mac, active, gateways_by_mac)
+
+
+async def run_gateway_status_tick_async(
+    metrics: GatewayMetricState,
+    gateways_by_mac: Dict[str, Dict[str, Any]],
+    now: datetime,
+    sem: asyncio.Semaphore,
+    concurrency: int,
+    pace: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    batcher: Optional[StatusBatcher] = None,
+    bucket: Optional[TokenBucket] = None,
+) -> int:
+    """
+    Executa uma rodada concorrente; retorna quantos status foram enviados (com
+    `batcher`, entregues ao lote).
+    `pace(i, n)`, se informado, segura o gateway i até o seu instante dentro do intervalo;
+    com `bucket`, cada status espera um token (taxa fixa de eventos/s).
+    """
+    sent = [0]
+    total = len(metrics)
+
+    # 1) Sorteio vetorizado de status e métricas de todos os gateways
+    metrics.step()
+
+    async def _paced(item) -> None:
+        if pace:
+            await pace(item[0], total)
+        if bucket:
+            await bucket.aacquire()
+        await _tick_gateway(item, gateways_by_mac, sem, sent, batcher)
+
+    # Um único fragmento de data (JSON) para todos os status do tick
+    await run_bounded(metrics.iter_bodies(date_fragment(now)), _paced, concurrency)
+    return sent[0]
+
+
+async def start_gateway_status_loop_async(
+    interval_seconds: int = 5,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    spread: bool = False,
+    batch_size: int = 1,
+    linger_seconds: float = 0.5,
+    rate: Optional[float] = None,
+    burst: Optional[int] = None,
+) -> None:
+    """
+    Variante assíncrona do loop de status: cada tick envia os status de todos os
+    gateways concorrentemente, com no máximo `concurrency` requisições em voo.
+    Com `spread`, os envios são distribuídos ao longo do intervalo; com `batch_size` > 1,
+    os status vão em lotes (StatusBatcher); com `rate`, a `rate` eventos/s (TokenBucket),
+    em rodadas seguidas.
+    """
+    sync_service.status_loop_running = True
+
+    print(f"\n⏳ Starting async gateway status loop every {interval_seconds} seconds (concurrency={concurrency})...")
+
+    macs = await asyncio.to_thread(get_macs)
+    if not macs:
+        print("⚠️ No MAC addresses found. Simulation aborted.")
+        return
+
+    metrics = GatewayMetricState(macs)
+    gateways_by_mac = await asyncio.to_thread(_fetch_gateways_by_mac)
+    device_index.clear()  # recarregado no primeiro cascade desta execução
+    sem = asyncio.Semaphore(concurrency)
+    bucket = open_bucket(GATEWAY_STATUS_API_URL, rate, burst, label="Gateway status rate")
+    scheduler = sync_service.loop_scheduler = TickScheduler(
+        0 if bucket else interval_seconds, label="Async gateway status loop"
+    )
+    pace = scheduler.apace if spread and not bucket else None
+    batcher = sync_service.status_batcher = open_status_batcher(
+        GATEWAY_STATUS_API_URL, batch_size, linger_seconds, label="gateway-status-batch"
+    )
+    scheduler.begin()
+
+    try:
+        while sync_service.status_loop_running:
+            now = datetime.now()
+            started = time.monotonic()
+            sent = await run_gateway_status_tick_async(
+                metrics, gateways_by_mac, now, sem, concurrency, pace, batcher, bucket
+            )
+
+            print(f"✅ Tick: {sent}/{len(macs)} gateway statuses sent in {time.monotonic() - started:.2f}s")
+            await scheduler.wait_next_async()
+
+    except Exception as e:
+        print(f"❌ Error during async status loop: {e!r}")
+    finally:
+        close_bucket(bucket)
+        if batcher:
+            await asyncio.to_thread(batcher.close)
+
+
+async def start_gateway_status_wheel_loop(
+    default_interval: float = 5,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    resolution_seconds: float = 0.1,
+    batch_size: int = 1,
+    linger_seconds: float = 0.5,
+) -> None:
+    """
+    Loop com intervalo próprio por gateway (SOLUTION_STATUS_INTERVALS, pela `solution`;
+    `default_interval` para as demais). Um TimerWheel guarda o próximo disparo de cada
+    gateway e a cada passo só os gateways vencidos geram e enviam status (em lotes
+    com `batch_size` > 1).
+    """
+    sync_service.status_loop_running = True
+
+    print(f"\n⏳ Starting per-gateway status loop (default {default_interval}s, concurrency={concurrency})...")
+
+    macs = await asyncio.to_thread(get_macs)
+    if not macs:
+        print("⚠️ No MAC addresses found. Simulation aborted.")
+        return
+
+    metrics = GatewayMetricState(macs)
+    gateways_by_mac = await asyncio.to_thread(_fetch_gateways_by_mac)
+    device_index.clear()  # recarregado no primeiro cascade desta execução
+    sem = asyncio.Semaphore(concurrency)
+
+    intervals = np.array([
+        SOLUTION_STATUS_INTERVALS.get(gateways_by_mac.get(mac, {}).get("solution"), default_interval)
+        for mac in macs
+    ], dtype=float)
+    wheel = sync_service.loop_scheduler = TimerWheel(resolution_seconds, label="Per-gateway status loop")
+    # Fase aleatória dentro do próprio intervalo: gateways iguais não disparam juntos
+    wheel.schedule_many(np.arange(len(macs)), intervals, np.random.default_rng().uniform(0, intervals))
+    batcher = sync_service.status_batcher = open_status_batcher(
+        GATEWAY_STATUS_API_URL, batch_size, linger_seconds, label="gateway-status-batch"
+    )
+
+    try:
+        while sync_service.status_loop_running:
+            due = wheel.advance()
+            if due:
+                metrics.step(due)
+                sent = [0]
+                await run_bounded(
+                    metrics.iter_bodies(date_fragment(datetime.now()), due),
+                    lambda item: _tick_gateway(item, gateways_by_mac, sem, sent, batcher),
+                    concurrency,
+                )
+            await asyncio.sleep(wheel.seconds_until_next_tick())
+
+    except Exception as e:
+        print(f"❌ Error during per-gateway status loop: {e!r}")
+    finally:
+        if batcher:
+            await asyncio.to_thread(batcher.close)
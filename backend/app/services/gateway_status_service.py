@@ -1,21 +1,37 @@
 # app/services/gateway_status_service.py
 
 import requests
-import random
-import time
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional
 
+from app.services import upstream, status_spool
 from app.services.gateway_service import get_macs
+from app.services.scheduler import TickScheduler
+from app.services.device_index import device_index
+from app.services.registry_cache import registry_cache
+from app.services.cascade_executor import CascadeExecutor
+from app.services.write_behind import WriteBehindQueue
+from app.services.gateway_metrics import GatewayMetricState
+from app.services.payload_template import PatchedRecord, device_templates, date_fragment, JSON_HEADERS
+from app.services.status_batcher import StatusBatcher, open_status_batcher
+from app.services.rate_limiter import TokenBucket, open_bucket, close_bucket
 from app.config import (
     GATEWAY_STATUS_API_URL,
     GATEWAY_API_URL,
     DEVICE_API_URL,
+    CASCADE_WORKERS,
+    PUT_QUEUE_WORKERS,
 )
 
 # Flag to control loop
 status_loop_running = True
 
+# Agendador do loop em execução (métricas em GET /status-gateway/loop/stats)
+loop_scheduler: Optional[TickScheduler] = None
+
+# Envio em lote dos status do loop em execução (None: um POST por status)
+status_batcher: Optional[StatusBatcher] = None
+
 # Cache local para evitar PUTs desnecessários no cadastro do gateway
 _last_known_gateway_status: Dict[str, bool] = {}
 
@@ -24,49 +40,23 @@ _last_known_gateway_status: Dict[str, bool] = {}
 _device_prev_status_by_gateway: Dict[str, Dict[str, bool]] = {}
 
 
-def generate_status(gateway_mac: str, timestamp: datetime, state: Dict[str, float]) -> Dict[str, Any]:
-    """Gera status do gateway com True/False aleatório (50/50) e métricas variando suavemente."""
-    active = bool(random.getrandbits(1))  # True/False com 50% de probabilidade
-
-    battery = max(0.0, round(state["baterryLevel"] - random.uniform(0.001, 0.005), 2))
-    memory = min(1.0, max(0.0, round(state["usedMemory"] + random.uniform(-0.05, 0.05), 2)))
-    cpu = min(1.0, max(0.0, round(state["usedProcessor"] + random.uniform(-0.05, 0.05), 2)))
-
-    return {
-        "date": {
-            "year": timestamp.year,
-            "month": timestamp.month,
-            "dayOfMonth": timestamp.day,
-            "hourOfDay": timestamp.hour,
-            "minute": timestamp.minute,
-            "second": timestamp.second
-        },
-        "gateway": {
-            "mac": gateway_mac,
-            "status": active
-        },
-        "baterryLevel": battery,
-        "usedMemory": memory,
-        "usedProcessor": cpu
-    }
-
-
-def send_status_to_api(status_data: Dict[str, Any]) -> None:
-    """Envia o status gerado para a API de histórico."""
+def send_status_to_api(body: bytes, mac: str) -> bool:
+    """Envia o status (JSON já serializado, GatewayMetricState.iter_bodies) para a API de histórico."""
     try:
-        response = requests.post(GATEWAY_STATUS_API_URL, json=status_data, timeout=10)
+        response = upstream.post(GATEWAY_STATUS_API_URL, data=body, headers=JSON_HEADERS)
         response.raise_for_status()
-        print(f"✅ Status sent: {status_data['gateway']['mac']} @ {status_data['date']}")
+        print(f"✅ Status sent: {mac}")
+        return True
     except requests.exceptions.RequestException as e:
         print(f"❌ Error sending status: {e}")
+        status_spool.capture(GATEWAY_STATUS_API_URL, (body,), e)
+        return False
 
 
 def _fetch_gateways_by_mac() -> Dict[str, Dict[str, Any]]:
     """Busca todos os gateways e indexa por MAC (mantendo campos para PUT completo)."""
     try:
-        resp = requests.get(GATEWAY_API_URL, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        data = registry_cache.get(GATEWAY_API_URL)
         if not isinstance(data, list):
             print("⚠️ Gateway API did not return a list.")
             return {}
@@ -87,8 +77,9 @@ def _put_gateway(payload: Dict[str, Any]) -> bool:
     Retorna True em caso de sucesso (200/204), False caso contrário.
     """
     try:
-        resp = requests.put(GATEWAY_API_URL, json=payload, timeout=10)
+        resp = upstream.put(GATEWAY_API_URL, json=payload)
         resp.raise_for_status()
+        registry_cache.put_record(GATEWAY_API_URL, payload, "mac")
         print(f"🔄 Gateway updated via PUT: {payload.get('mac')} (status={payload.get('status')})")
         return True
     except requests.exceptions.RequestException as e:
@@ -103,9 +94,7 @@ def _put_gateway(payload: Dict[str, Any]) -> bool:
 def _fetch_devices() -> List[Dict[str, Any]]:
     """Busca a lista completa de dispositivos."""
     try:
-        resp = requests.get(DEVICE_API_URL, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
+        data = registry_cache.get(DEVICE_API_URL)
         if not isinstance(data, list):
             print("⚠️ Device API did not return a list.")
             return []
@@ -115,14 +104,30 @@ def _fetch_devices() -> List[Dict[str, Any]]:
         return []
 
 
-def _put_device(payload: Dict[str, Any]) -> bool:
+def _gateway_devices(gateway_mac: str) -> List[Dict[str, Any]]:
+    """
+    Dispositivos do gateway lidos do índice gateway→devices. A lista completa só é
+    buscada (um GET) enquanto o índice não estiver carregado; depois ele é mantido
+    pelos nossos próprios POST/PUT.
+    """
+    if not device_index.loaded:
+        devices = _fetch_devices()
+        if devices:
+            device_index.load(devices)
+    return device_index.devices_for(gateway_mac)
+
+
+def _put_device(payload: PatchedRecord) -> bool:
     """
     Executa PUT no cadastro do dispositivo com payload COMPLETO.
-    Mantém todos os campos e apenas altera 'status' e 'date'.
+    Mantém todos os campos e apenas altera 'status' e 'date' (template pré-serializado).
     """
     try:
-        resp = requests.put(DEVICE_API_URL, json=payload, timeout=10)
+        resp = upstream.put(DEVICE_API_URL, data=payload.body(), headers=JSON_HEADERS)
         resp.raise_for_status()
+        record = payload.merged()
+        device_index.upsert(record)
+        registry_cache.put_record(DEVICE_API_URL, record, "id")
         print(f"🔄 Device updated via PUT: {payload.get('id')} (status={payload.get('status')})")
         return True
     except requests.exceptions.RequestException as e:
@@ -130,24 +135,17 @@ def _put_device(payload: Dict[str, Any]) -> bool:
         return False
 
 
-def _set_all_devices_offline_for_gateway(gateway_mac: str) -> None:
+def _offline_cascade_payloads(gateway_mac: str, devices: List[Dict[str, Any]], now: datetime) -> List[PatchedRecord]:
     """
-    Força todos os dispositivos vinculados ao gateway (gateway.mac == gateway_mac)
-    a ficarem offline (status=False) via PUT (payload completo).
-    Também MEMORIZA o status anterior para futura restauração.
+    Monta os payloads COMPLETOS (status=False) dos dispositivos vinculados ao gateway
+    e MEMORIZA o status anterior de cada um para futura restauração.
     """
-    devices = _fetch_devices()
-    if not devices:
-        print("ℹ️ No devices to cascade offline.")
-        return
-
     # cria o bucket de memória se não existir
     if gateway_mac not in _device_prev_status_by_gateway:
         _device_prev_status_by_gateway[gateway_mac] = {}
+    prev_map = _device_prev_status_by_gateway[gateway_mac]
 
-    affected = 0
-    now = datetime.now()
-
+    payloads = []
     for d in devices:
         gw = d.get("gateway") or {}
         gw_mac = gw.get("mac")
@@ -159,49 +157,28 @@ def _set_all_devices_offline_for_gateway(gateway_mac: str) -> None:
             continue
 
         # memorize previous status only once (if not stored yet)
-        if dev_id not in _device_prev_status_by_gateway[gateway_mac]:
-            _device_prev_status_by_gateway[gateway_mac][dev_id] = bool(d.get("status", True))
+        if dev_id not in prev_map:
+            prev_map[dev_id] = bool(d.get("status", True))
 
         # Se já está offline, não precisa PUT
         if d.get("status") is False:
             continue
 
-        payload = dict(d)
-        payload["status"] = False
-        payload["date"] = {
-            "year": now.year,
-            "month": now.month,
-            "dayOfMonth": now.day,
-            "hourOfDay": now.hour,
-            "minute": now.minute,
-            "second": now.second
-        }
+        payloads.append(PatchedRecord(d, False, now, device_templates))
 
-        if _put_device(payload):
-            affected += 1
+    return payloads
 
-    print(f"📉 Cascade: {affected} device(s) set to offline for gateway {gateway_mac}.")
 
-
-def _restore_devices_for_gateway_online(gateway_mac: str) -> None:
+def _restore_cascade_payloads(gateway_mac: str, devices: List[Dict[str, Any]], now: datetime) -> List[PatchedRecord]:
     """
-    Quando o gateway volta a ficar online, restaura o status dos devices
-    para o que estava MEMORIZADO antes da queda. Se não houver memória,
-    não altera o device (deixa como está).
+    Monta os payloads que devolvem os dispositivos do gateway ao status MEMORIZADO
+    antes da queda. A memória só fica para os devices com PUT pendente (liberada
+    em _put_cascade_device); devices sem memória não são alterados.
     """
-    prev_map = _device_prev_status_by_gateway.get(gateway_mac)
-    if not prev_map:
-        print(f"ℹ️ No previous device states stored for gateway {gateway_mac}. Nothing to restore.")
-        return
-
-    devices = _fetch_devices()
-    if not devices:
-        print("ℹ️ No devices to restore.")
-        return
-
-    restored = 0
-    now = datetime.now()
+    prev_map = _device_prev_status_by_gateway.get(gateway_mac) or {}
 
+    payloads = []
+    pending: Dict[str, bool] = {}
     for d in devices:
         gw = d.get("gateway") or {}
         if gw.get("mac") != gateway_mac:
@@ -219,43 +196,85 @@ def _restore_devices_for_gateway_online(gateway_mac: str) -> None:
         if d.get("status") == target_status:
             continue  # já está no estado desejado
 
-        payload = dict(d)
-        payload["status"] = target_status
-        payload["date"] = {
-            "year": now.year,
-            "month": now.month,
-            "dayOfMonth": now.day,
-            "hourOfDay": now.hour,
-            "minute": now.minute,
-            "second": now.second
-        }
+        payloads.append(PatchedRecord(d, target_status, now, device_templates))
+        pending[dev_id] = target_status
+
+    # Limpa a memória para esse gateway (evita estados antigos), exceto o que falta restaurar
+    if pending:
+        _device_prev_status_by_gateway[gateway_mac] = pending
+    else:
+        _device_prev_status_by_gateway.pop(gateway_mac, None)
+    return payloads
+
+
+def _cascade_payloads(gateway_mac: str, online: bool) -> List[PatchedRecord]:
+    """
+    Plano da cascata, montado pelo executor quando ela começa a rodar:
+    offline força os devices do gateway a False (memorizando o status anterior),
+    online restaura o status MEMORIZADO antes da queda.
+    """
+    if online and not _device_prev_status_by_gateway.get(gateway_mac):
+        print(f"ℹ️ No previous device states stored for gateway {gateway_mac}. Nothing to restore.")
+        return []
+
+    devices = _gateway_devices(gateway_mac)
+    if not devices:
+        print(f"ℹ️ No devices to {'restore' if online else 'cascade offline'}.")
+        return []
+
+    if online:
+        return _restore_cascade_payloads(gateway_mac, devices, datetime.now())
+    return _offline_cascade_payloads(gateway_mac, devices, datetime.now())
 
-        if _put_device(payload):
-            restored += 1
 
-    # Limpa a memória para esse gateway (evita estados antigos)
-    _device_prev_status_by_gateway.pop(gateway_mac, None)
-    print(f"📈 Restore: {restored} device(s) restored for gateway {gateway_mac} (online).")
+def _put_cascade_device(gateway_mac: str, online: bool, payload: PatchedRecord) -> bool:
+    if not _put_device(payload):
+        return False
+    if online:
+        # restaurado: libera a memória; se a restauração for interrompida, o resto fica guardado
+        prev_map = _device_prev_status_by_gateway.get(gateway_mac) or {}
+        prev_map.pop(payload.get("id"), None)
+    return True
 
 
-def _maybe_put_gateway_status(mac: str, new_status: bool, gateways_by_mac: Dict[str, Dict[str, Any]]) -> None:
+def _report_cascade(gateway_mac: str, online: bool, applied: int) -> None:
+    if online:
+        if not _device_prev_status_by_gateway.get(gateway_mac):
+            _device_prev_status_by_gateway.pop(gateway_mac, None)
+        print(f"📈 Restore: {applied} device(s) restored for gateway {gateway_mac} (online).")
+    else:
+        print(f"📉 Cascade: {applied} device(s) set to offline for gateway {gateway_mac}.")
+
+
+# Cascatas rodam fora do tick, com coalescência por gateway (ver CascadeExecutor)
+cascade_executor = CascadeExecutor(_cascade_payloads, _put_cascade_device, CASCADE_WORKERS, on_done=_report_cascade)
+
+
+def _set_all_devices_offline_for_gateway(gateway_mac: str) -> None:
     """
-    Atualiza o cadastro do gateway via PUT se o status tiver mudado.
-    Em caso de desligamento (False) bem-sucedido, força devices -> offline.
-    Em caso de religamento (True) bem-sucedido, restaura devices ao status anterior.
+    Agenda a cascata que força todos os dispositivos vinculados ao gateway
+    a ficarem offline (status=False) via PUT (payload completo).
     """
+    cascade_executor.submit(gateway_mac, False)
+
+
+def _restore_devices_for_gateway_online(gateway_mac: str) -> None:
+    """
+    Agenda a restauração dos devices do gateway para o status MEMORIZADO antes da queda.
+    Se o gateway caiu e voltou antes da cascata rodar, nada é enviado.
+    """
+    cascade_executor.submit(gateway_mac, True)
+
+
+def _gateway_status_changed(mac: str, new_status: bool) -> bool:
+    """Atualiza o cache local e indica se o status do gateway mudou."""
     prev = _last_known_gateway_status.get(mac)
     _last_known_gateway_status[mac] = new_status  # atualiza cache
+    return prev is None or prev != new_status
 
-    if prev is not None and prev == new_status:
-        return  # nada mudou
 
-    gw = gateways_by_mac.get(mac)
-    if not gw:
-        print(f"⚠️ Gateway metadata for MAC {mac} not found. Skipping PUT.")
-        return
-
-    payload = {
+def _gateway_put_payload(gw: Dict[str, Any], new_status: bool) -> Dict[str, Any]:
+    return {
         "mac": gw.get("mac"),
         "ip": gw.get("ip"),
         "manufacturer": gw.get("manufacturer"),
@@ -265,18 +284,95 @@ def _maybe_put_gateway_status(mac: str, new_status: bool, gateways_by_mac: Dict[
         "status": new_status  # incluímos o status atualizado
     }
 
-    success = _put_gateway(payload)
 
+def _after_gateway_put(mac: str, payload: Dict[str, Any], success: bool) -> None:
+    """
+    Chamado pela fila após cada PUT do gateway.
+    Em caso de desligamento (False) bem-sucedido, força devices -> offline.
+    Em caso de religamento (True) bem-sucedido, restaura devices ao status anterior.
+    """
     if success:
-        if new_status is False:
+        if payload["status"] is False:
             _set_all_devices_offline_for_gateway(mac)
         else:
             _restore_devices_for_gateway_online(mac)
 
 
-def start_gateway_status_loop(interval_seconds: int = 5) -> None:
-    """Inicia o loop contínuo de simulação de status dos gateways."""
-    global status_loop_running
+# PUTs do cadastro de gateways: só o último status desejado por MAC é enviado
+gateway_put_queue = WriteBehindQueue(_put_gateway, PUT_QUEUE_WORKERS, on_done=_after_gateway_put, label="gateway-put")
+
+
+def _maybe_put_gateway_status(mac: str, new_status: bool, gateways_by_mac: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Enfileira o PUT do cadastro do gateway se o status tiver mudado; a cascata
+    dos devices roda depois do PUT bem-sucedido (_after_gateway_put).
+    """
+    if not _gateway_status_changed(mac, new_status):
+        return  # nada mudou
+
+    gw = gateways_by_mac.get(mac)
+    if not gw:
+        print(f"⚠️ Gateway metadata for MAC {mac} not found. Skipping PUT.")
+        return
+
+    gateway_put_queue.submit(mac, _gateway_put_payload(gw, new_status))
+
+
+def run_gateway_status_tick(
+    metrics: GatewayMetricState,
+    gateways_by_mac: Dict[str, Dict[str, Any]],
+    now: datetime,
+    pace: Optional[Callable[[int, int], None]] = None,
+    batcher: Optional[StatusBatcher] = None,
+    bucket: Optional[TokenBucket] = None,
+) -> int:
+    """
+    Executa uma rodada serial do loop de status; retorna quantos status foram enviados
+    (com `batcher`, entregues ao lote).
+    `pace(i, n)`, se informado, segura o gateway i até o seu instante dentro do intervalo;
+    com `bucket`, cada status espera um token (taxa fixa de eventos/s).
+    """
+    sent = 0
+    total = len(metrics)
+
+    # 1) Sorteia status (True/False) e variação das métricas de todos os gateways de uma vez
+    metrics.step()
+
+    # Um único fragmento de data (JSON) para todos os status do tick
+    for i, mac, active, body in metrics.iter_bodies(date_fragment(now)):
+        if pace:
+            pace(i, total)
+        if bucket:
+            bucket.acquire()
+
+        # 2) Envia status para API de histórico (direto ou em lote)
+        if batcher:
+            batcher.add(body)
+            sent += 1
+        elif send_status_to_api(body, mac):
+            sent += 1
+
+        # 3) Atualiza cadastro via PUT se mudou (e aplica cascata/restore conforme necessário)
+        _maybe_put_gateway_status(mac, active, gateways_by_mac)
+    return sent
+
+
+def start_gateway_status_loop(
+    interval_seconds: int = 5,
+    spread: bool = False,
+    batch_size: int = 1,
+    linger_seconds: float = 0.5,
+    rate: Optional[float] = None,
+    burst: Optional[int] = None,
+) -> None:
+    """
+    Inicia o loop contínuo de simulação de status dos gateways.
+    Os ticks seguem deadlines monotônicos; com `spread`, os envios são distribuídos ao longo do intervalo.
+    Com `batch_size` > 1, os status vão em lotes (StatusBatcher) de até `batch_size`
+    registros ou `linger_seconds` de espera. Com `rate`, as rodadas emendam umas nas
+    outras e os status saem a `rate` eventos/s (TokenBucket com `burst`), sem `interval`.
+    """
+    global status_loop_running, loop_scheduler, status_batcher
     status_loop_running = True
 
     print(f"\n⏳ Starting gateway status loop every {interval_seconds} seconds...")
@@ -286,44 +382,31 @@ def start_gateway_status_loop(interval_seconds: int = 5) -> None:
         print("⚠️ No MAC addresses found. Simulation aborted.")
         return
 
-    states = {
-        mac: {
-            "baterryLevel": round(random.uniform(0.7, 1.0), 2),
-            "usedMemory": round(random.uniform(0.2, 0.5), 2),
-            "usedProcessor": round(random.uniform(0.2, 0.5), 2)
-        }
-        for mac in macs
-    }
+    metrics = GatewayMetricState(macs)
 
     gateways_by_mac = _fetch_gateways_by_mac()
+    device_index.clear()  # recarregado no primeiro cascade desta execução
+
+    bucket = open_bucket(GATEWAY_STATUS_API_URL, rate, burst, label="Gateway status rate")
+    # Com taxa fixa, intervalo 0: a próxima rodada começa assim que a anterior termina
+    scheduler = loop_scheduler = TickScheduler(0 if bucket else interval_seconds, label="Gateway status loop")
+    pace = scheduler.pace if spread and not bucket else None
+    batcher = status_batcher = open_status_batcher(
+        GATEWAY_STATUS_API_URL, batch_size, linger_seconds, label="gateway-status-batch"
+    )
+    scheduler.begin()
 
     try:
         while status_loop_running:
-            now = datetime.now()
-            for mac in macs:
-                current_state = states[mac]
-
-                # 1) Gera status histórico (inclui status aleatório True/False)
-                status_obj = generate_status(mac, now, current_state)
-
-                # 2) Envia status para API de histórico
-                send_status_to_api(status_obj)
-
-                # 3) Atualiza cadastro via PUT se mudou (e aplica cascata/restore conforme necessário)
-                new_status = bool(status_obj["gateway"]["status"])
-                _maybe_put_gateway_status(mac, new_status, gateways_by_mac)
-
-                # 4) Persiste variação das métricas locais
-                current_state.update({
-                    "baterryLevel": status_obj["baterryLevel"],
-                    "usedMemory": status_obj["usedMemory"],
-                    "usedProcessor": status_obj["usedProcessor"]
-                })
-
-            time.sleep(interval_seconds)
+            run_gateway_status_tick(metrics, gateways_by_mac, datetime.now(), pace, batcher, bucket)
+            scheduler.wait_next()
 
     except Exception as e:
         print(f"❌ Error during status loop: {e}")
+    finally:
+        close_bucket(bucket)
+        if batcher:
+            batcher.close()  # envia o que ficou no buffer
 
 
 def stop_gateway_status_loop() -> None:
@@ -336,7 +419,7 @@ def stop_gateway_status_loop() -> None:
 def get_gateway_statuses():
     """Retorna lista de status de gateways gravados (se o backend expõe esse endpoint)."""
     try:
-        resp = requests.get(GATEWAY_STATUS_API_URL, timeout=10)
+        resp = upstream.get(GATEWAY_STATUS_API_URL)
         resp.raise_for_status()
         data = resp.json()
         if not isinstance(data, list):
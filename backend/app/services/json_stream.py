@@ -0,0 +1,103 @@
+# app/services/json_stream.py
+
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, List
+
+_WHITESPACE = " \t\n\r"
+
+# Tamanho dos chunks lidos do corpo da resposta
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class JsonArrayParser:
+    """
+    Incremental parser for a top-level JSON array.
+
+    Feed it the body in chunks of bytes as they arrive; `feed` returns the elements
+    completed so far, so only the element being received stays buffered (not the
+    whole list). Elements are decoded with the stdlib json.JSONDecoder.raw_decode.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+
+    def _skip(self, chars: str) -> None:
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in chars:
+            self._pos += 1
+
+    def _parse(self, final: bool) -> List[Any]:
+        items = []
+        buf = self._buffer
+        if not self._started:
+            self._skip(_WHITESPACE)
+            if self._pos == len(buf):
+                return items
+            if buf[self._pos] != "[":
+                raise ValueError("Expected a JSON array")
+            self._pos += 1
+            self._started = True
+
+        while not self._finished:
+            self._skip(_WHITESPACE + ",")
+            if self._pos == len(buf):
+                break
+            if buf[self._pos] == "]":
+                self._finished = True
+                self._pos += 1
+                break
+            try:
+                item, end = self._decoder.raw_decode(buf, self._pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # elemento ainda incompleto: espera o próximo chunk
+            # Só aceita o elemento quando vier o separador: "12" pode ser o início de "12.5"
+            after = end
+            while after < len(buf) and buf[after] in _WHITESPACE:
+                after += 1
+            if after == len(buf) or buf[after] not in ",]":
+                if final:
+                    raise ValueError(f"Malformed JSON array at char {after}")
+                break
+            items.append(item)
+            self._pos = end
+
+        # descarta o que já foi consumido
+        self._buffer = buf[self._pos:]
+        self._pos = 0
+        return items
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        self._buffer += self._utf8.decode(chunk)
+        return self._parse(final=False)
+
+    def close(self) -> List[Any]:
+        """Parse what is left at end of body; raises ValueError if the array is truncated."""
+        self._buffer += self._utf8.decode(b"", final=True)
+        items = self._parse(final=True)
+        if not self._finished:
+            raise ValueError("Truncated JSON array")
+        return items
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Yield the elements of a JSON array body as its byte chunks arrive."""
+    parser = JsonArrayParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_json_array(chunks: AsyncIterable[bytes]) -> AsyncIterator[Any]:
+    parser = JsonArrayParser()
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.close():
+        yield item
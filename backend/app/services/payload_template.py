@@ -0,0 +1,162 @@
+# app/services/payload_template.py
+
+import json
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Campos que mudam a cada PUT; o resto do registro é serializado uma única vez
+PATCHED_FIELDS = ("status", "date")
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+_SEPARATORS = (",", ":")
+_MISSING = object()
+
+
+def date_dict(timestamp: datetime) -> Dict[str, int]:
+    return {
+        "year": timestamp.year,
+        "month": timestamp.month,
+        "dayOfMonth": timestamp.day,
+        "hourOfDay": timestamp.hour,
+        "minute": timestamp.minute,
+        "second": timestamp.second
+    }
+
+
+# Último fragmento de data codificado: (segundo, bytes)
+_last_date: Tuple[Optional[datetime], bytes] = (None, b"")
+
+
+def date_fragment(timestamp: datetime) -> bytes:
+    """JSON bytes of `date_dict(timestamp)`, encoded once per second."""
+    global _last_date
+    second = timestamp.replace(microsecond=0)
+    cached_second, fragment = _last_date
+    if cached_second != second:
+        fragment = json.dumps(date_dict(second), separators=_SEPARATORS).encode()
+        _last_date = (second, fragment)
+    return fragment
+
+
+class RecordTemplate:
+    """
+    The JSON of one registry record, encoded once and split around the PATCHED_FIELDS:
+    `render(status, date)` only joins the constant byte fragments with the new values.
+    """
+
+    __slots__ = ("source", "_parts", "_order", "_others")
+
+    def __init__(self, record: Dict[str, Any]):
+        self.source = record
+        markers = {field: f"\x00{field}\x00" for field in PATCHED_FIELDS}
+        # campos existentes mantêm a posição; os ausentes vão para o fim
+        text = json.dumps({**record, **markers}, separators=_SEPARATORS)
+        found = sorted((text.index(json.dumps(marker)), field, marker) for field, marker in markers.items())
+
+        self._parts: List[bytes] = []
+        self._order: List[str] = []
+        pos = 0
+        for start, field, marker in found:
+            self._parts.append(text[pos:start].encode())
+            self._order.append(field)
+            pos = start + len(json.dumps(marker))
+        self._parts.append(text[pos:].encode())
+        self._others = sum(1 for k in record if k not in PATCHED_FIELDS)
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        """
+        True if `record` differs from the source at most in the PATCHED_FIELDS. Values are
+        compared by identity: our own PUTs merge into the cached record and keep the same
+        objects, while a fresh GET brings new ones (and the template is rebuilt).
+        """
+        if record is self.source:
+            return True
+        source = self.source
+        others = 0
+        for k, v in record.items():
+            if k in PATCHED_FIELDS:
+                continue
+            if source.get(k, _MISSING) is not v:
+                return False
+            others += 1
+        return others == self._others
+
+    def render(self, values: Dict[str, bytes]) -> bytes:
+        parts, order = self._parts, self._order
+        return b"".join((parts[0], values[order[0]], parts[1], values[order[1]], parts[2]))
+
+
+class TemplateCache:
+    """RecordTemplate per record key (id/MAC), rebuilt when the cached record really changes."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self._templates: Dict[Any, RecordTemplate] = {}
+        self._lock = threading.Lock()
+        self.counters = {"built": 0, "reused": 0}
+
+    def template_for(self, record: Dict[str, Any]) -> RecordTemplate:
+        record_key = record.get(self.key)
+        template = self._templates.get(record_key)
+        if template is not None and template.matches(record):
+            self.counters["reused"] += 1
+            return template
+        template = RecordTemplate(record)  # fora do lock: é a parte cara
+        with self._lock:
+            self._templates[record_key] = template
+            self.counters["built"] += 1
+        return template
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "templates": len(self._templates)}
+
+
+class PatchedRecord(Mapping):
+    """
+    PUT payload = a cached registry record with `status` and `date` replaced, without
+    copying it. Reads like the full record (payload["id"], payload["status"]);
+    `body()` renders the JSON from the record's template and `merged()` gives the
+    dict to write back to the local caches after a successful PUT.
+    """
+
+    __slots__ = ("record", "status", "timestamp", "_templates")
+
+    def __init__(self, record: Dict[str, Any], status: bool, timestamp: datetime, templates: TemplateCache):
+        self.record = record
+        self.status = status
+        self.timestamp = timestamp
+        self._templates = templates
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "status":
+            return self.status
+        if key == "date":
+            return date_dict(self.timestamp)
+        return self.record[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.record
+        for field in PATCHED_FIELDS:
+            if field not in self.record:
+                yield field
+
+    def __len__(self) -> int:
+        return len(self.record) + sum(1 for field in PATCHED_FIELDS if field not in self.record)
+
+    def body(self) -> bytes:
+        values = {"status": b"true" if self.status else b"false", "date": date_fragment(self.timestamp)}
+        return self._templates.template_for(self.record).render(values)
+
+    def merged(self) -> Dict[str, Any]:
+        return {**self.record, "status": self.status, "date": date_dict(self.timestamp)}
+
+
+# Templates dos registros de devices (PUTs de energia e das cascatas)
+device_templates = TemplateCache("id")
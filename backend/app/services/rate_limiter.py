@@ -0,0 +1,121 @@
+# app/services/rate_limiter.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+# Janela (segundos completos) da taxa recente reportada em stats()
+RECENT_WINDOW_SECONDS = 5
+
+
+def default_burst(rate: float) -> int:
+    """50 ms worth of tokens: enough to absorb sleep/GC hiccups without visible bursts."""
+    return max(1, round(rate / 20))
+
+
+class TokenBucket:
+    """
+    Token bucket for one upstream endpoint: `rate` tokens per second, at most `burst`
+    saved up. Each status event takes one token (`acquire` / `aacquire`) right before it
+    is emitted. Tokens are reserved in arrival order, so concurrent senders share the
+    rate exactly; a sender that falls behind can catch up by at most `burst` events.
+    The bucket starts empty, so a run never opens with a burst.
+    `stats()` reports the achieved rate (since the start and over the last
+    RECENT_WINDOW_SECONDS) against the requested one.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None, label: str = "rate-limit"):
+        self.rate = float(rate)
+        self.burst = max(1, burst or default_burst(rate))
+        self.label = label
+        self._lock = threading.Lock()
+        self._tokens = 0.0
+        self._refilled = time.monotonic()
+        self.started = self._refilled
+        self.stopped: Optional[float] = None
+        self.events = 0
+        self.waited_seconds = 0.0
+        self._per_second: Deque[List[int]] = deque(maxlen=RECENT_WINDOW_SECONDS + 1)  # [segundo, eventos]
+
+    def _reserve(self) -> float:
+        """Take one token (possibly in debt); return how long to wait before emitting."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited_seconds += wait
+            return wait
+
+    def _emitted(self) -> None:
+        with self._lock:
+            self.events += 1
+            second = int(time.monotonic())
+            if self._per_second and self._per_second[-1][0] == second:
+                self._per_second[-1][1] += 1
+            else:
+                self._per_second.append([second, 1])
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        self._emitted()
+
+    async def aacquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._emitted()
+
+    def stop(self) -> None:
+        """Freeze the elapsed time, so the achieved rate stays readable after the loop ends."""
+        with self._lock:
+            if self.stopped is None:
+                self.stopped = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            end = self.stopped or time.monotonic()
+            elapsed = end - self.started
+            current = int(end)
+            recent = [count for second, count in self._per_second if current - RECENT_WINDOW_SECONDS <= second < current]
+            return {
+                "requested_rate": self.rate,
+                "burst": self.burst,
+                "events": self.events,
+                "elapsed_seconds": round(elapsed, 3),
+                "achieved_rate": round(self.events / elapsed, 1) if elapsed > 0 else None,
+                # só segundos completos; vazio nos primeiros segundos de execução
+                "recent_rate": round(sum(recent) / RECENT_WINDOW_SECONDS, 1) if len(recent) == RECENT_WINDOW_SECONDS else None,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "running": self.stopped is None,
+            }
+
+
+# Bucket atual por endpoint de status: { url: TokenBucket } (o último fica para as stats)
+_buckets: Dict[str, TokenBucket] = {}
+
+
+def open_bucket(url: str, rate: Optional[float], burst: Optional[int], label: str) -> Optional[TokenBucket]:
+    """New bucket for a loop's endpoint, or None without `rate` (the loop keeps its interval)."""
+    if not rate:
+        return None
+    bucket = _buckets[url] = TokenBucket(rate, burst, label=label)
+    print(f"🚦 {label}: {bucket.rate:g} events/s (burst {bucket.burst}).")
+    return bucket
+
+
+def close_bucket(bucket: Optional[TokenBucket]) -> None:
+    if bucket is None:
+        return
+    bucket.stop()
+    s = bucket.stats()
+    print(f"🚦 {bucket.label}: achieved {s['achieved_rate']} events/s of {s['requested_rate']:g} requested ({s['events']} events).")
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {url: bucket.stats() for url, bucket in list(_buckets.items())}
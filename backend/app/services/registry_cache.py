@@ -0,0 +1,150 @@
+# app/services/registry_cache.py
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import REGISTRY_CACHE_TTL
+from app.services import upstream
+
+
+class _Entry:
+    __slots__ = ("data", "etag", "last_modified", "fetched_at", "stale", "positions", "fetching")
+
+    def __init__(self):
+        self.data: Any = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.fetched_at = 0.0
+        self.stale = True
+        self.positions: Optional[Dict[Any, int]] = None
+        self.fetching: Optional[asyncio.Task] = None  # download em curso de aget
+
+
+class RegistryCache:
+    """
+    Shared cache of the upstream entity lists (gateways, devices), one entry per URL.
+
+    A list younger than `ttl_seconds` is served from memory. Once it expires (or is
+    invalidated) the next read revalidates it with If-None-Match / If-Modified-Since
+    when the upstream sent an ETag / Last-Modified, so an unchanged list costs a 304
+    instead of the full body. Our own single-record writes are applied in place
+    (`put_record`); bulk creations call `invalidate`.
+    Callers get the cached list itself and must treat the records as read-only.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self.counters = {"hits": 0, "fetches": 0, "not_modified": 0, "invalidations": 0}
+
+    def _entry(self, url: str) -> _Entry:
+        with self._lock:
+            return self._entries.setdefault(url, _Entry())
+
+    def _fresh(self, entry: _Entry) -> bool:
+        return not entry.stale and time.monotonic() - entry.fetched_at < self.ttl
+
+    def _hit(self, entry: _Entry) -> bool:
+        with self._lock:
+            if not self._fresh(entry):
+                return False
+            self.counters["hits"] += 1
+            return True
+
+    @staticmethod
+    def _conditional_headers(entry: _Entry) -> Dict[str, str]:
+        headers = {}
+        if entry.data is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def _store(self, entry: _Entry, response) -> Any:
+        modified = response.status_code != 304
+        if modified:
+            response.raise_for_status()
+            data = response.json()  # fora do lock: listas grandes levam tempo
+        with self._lock:
+            if modified:
+                entry.data = data
+                entry.etag = response.headers.get("ETag")
+                entry.last_modified = response.headers.get("Last-Modified")
+                entry.positions = None
+                self.counters["fetches"] += 1
+            else:
+                self.counters["not_modified"] += 1
+            entry.fetched_at = time.monotonic()
+            entry.stale = False
+            return entry.data
+
+    def get(self, url: str) -> Any:
+        """Cached list for `url`, revalidated when older than the TTL. Raises requests errors."""
+        entry = self._entry(url)
+        if self._hit(entry):
+            return entry.data
+        with self._fetch_lock:  # um único download quando vários expiram juntos
+            if self._hit(entry):
+                return entry.data
+            return self._store(entry, upstream.get(url, headers=self._conditional_headers(entry)))
+
+    async def aget(self, url: str) -> Any:
+        """
+        Async variant of get (raises httpx errors). Coroutines that find the list
+        expired together await the same download instead of starting one each.
+        """
+        entry = self._entry(url)
+        if self._hit(entry):
+            return entry.data
+        loop = asyncio.get_running_loop()
+        task = entry.fetching
+        if task is None or task.get_loop() is not loop:  # loop novo (ex.: outro asyncio.run)
+            task = entry.fetching = loop.create_task(self._afetch(entry, url))
+        return await asyncio.shield(task)  # cancelar um leitor não cancela o download dos outros
+
+    async def _afetch(self, entry: _Entry, url: str) -> Any:
+        try:
+            return self._store(entry, await upstream.aget(url, headers=self._conditional_headers(entry)))
+        finally:
+            if entry.fetching is asyncio.current_task():
+                entry.fetching = None
+
+    def put_record(self, url: str, record: Dict[str, Any], key: str) -> None:
+        """Apply one of our successful POST/PUTs to the cached list (merged by `key`, like the upstream PUT)."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or not isinstance(entry.data, list):
+                return
+            if entry.positions is None:
+                entry.positions = {r.get(key): i for i, r in enumerate(entry.data) if isinstance(r, dict)}
+            i = entry.positions.get(record.get(key))
+            if i is None:
+                entry.positions[record.get(key)] = len(entry.data)
+                entry.data.append(record)
+            else:
+                entry.data[i] = {**entry.data[i], **record}
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """Force the next read of `url` (or of every list) to revalidate with the upstream."""
+        with self._lock:
+            self.counters["invalidations"] += 1
+            for u, entry in self._entries.items():
+                if url is None or u == url:
+                    entry.stale = True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "ttl_seconds": self.ttl,
+                "entries": {u: len(e.data) if isinstance(e.data, list) else None for u, e in self._entries.items()},
+            }
+
+
+# Cache compartilhado por serviços, loops e rotas
+registry_cache = RegistryCache(REGISTRY_CACHE_TTL)
@@ -0,0 +1,104 @@
+# app/services/resilience.py
+
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# Respostas que valem nova tentativa (PUT/GET) — o upstream pode se recuperar em instantes
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Request refused without touching the network: the endpoint's circuit is open."""
+
+
+class AsyncCircuitOpenError(httpx.TransportError):
+    """Async variant of CircuitOpenError (an httpx error, like the ones the async services catch)."""
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2^(attempt-1)))."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    CLOSED: requests pass; `failure_threshold` consecutive failures (timeouts, network
+    errors, 5xx) open it. OPEN: `allow()` is False for `reset_seconds`, so callers fail
+    fast instead of waiting on timeouts. HALF_OPEN: one probe request at a time goes
+    through; its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, label: str, failure_threshold: int, reset_seconds: float):
+        self.label = label
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.counters = {"failures": 0, "rejected": 0, "opened": 0, "probes": 0, "retries": 0}
+
+    def allow(self) -> bool:
+        """True if a request may go out now (in HALF_OPEN, only the probe)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                print(f"🟡 Circuit half-open for {self.label}: probing.")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                self.counters["probes"] += 1
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if success:
+                if self.state != CLOSED:
+                    print(f"🟢 Circuit closed for {self.label}: upstream is back.")
+                self.state = CLOSED
+                self._failures = 0
+                return
+            self.counters["failures"] += 1
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.counters["opened"] += 1
+                    print(f"🔴 Circuit open for {self.label} after {self._failures} failure(s); "
+                          f"failing fast for {self.reset_seconds:g}s.")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def cancel(self) -> None:
+        """The request ended without a verdict (cancelled): free the half-open probe."""
+        with self._lock:
+            self._probing = False
+
+    def retried(self) -> None:
+        with self._lock:
+            self.counters["retries"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_for: Optional[float] = None
+            if self.state == OPEN:
+                open_for = round(max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at)), 3)
+            return {
+                **self.counters,
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "open_for_seconds": open_for,
+            }
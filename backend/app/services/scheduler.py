@@ -0,0 +1,87 @@
+# app/services/scheduler.py
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+
+class TickScheduler:
+    """
+    Fixed-period ticks anchored on time.monotonic() deadlines.
+
+    Tick k starts at t0 + k * interval no matter how long the previous tick took,
+    so the period never drifts. A tick that runs past the next deadline is counted
+    as an overrun; whole periods it missed are skipped (not replayed in a burst) and
+    the next tick is re-anchored at the current instant, so its phase offsets lie
+    ahead instead of in the past.
+    Inside a tick, `pace(i, n)` delays entity i until its phase offset
+    tick_start + interval * i / n, spreading the sends evenly across the period.
+    """
+
+    def __init__(self, interval_seconds: float, label: str = "loop"):
+        self.interval = float(interval_seconds)
+        self.label = label
+        self.tick_start: Optional[float] = None
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.last_tick_seconds: Optional[float] = None
+        self.max_lateness_seconds = 0.0
+
+    def begin(self) -> None:
+        """Anchor the first tick at the current instant."""
+        self.tick_start = time.monotonic()
+
+    def _advance(self) -> float:
+        """Close the current tick and return how long to wait for the next one."""
+        now = time.monotonic()
+        if self.tick_start is None:
+            self.tick_start = now
+        self.ticks += 1
+        self.last_tick_seconds = now - self.tick_start
+
+        next_start = self.tick_start + self.interval
+        if self.interval > 0 and now > next_start:
+            late = now - next_start
+            skipped = int(late // self.interval)
+            self.overruns += 1
+            self.skipped_ticks += skipped
+            self.max_lateness_seconds = max(self.max_lateness_seconds, late)
+            next_start = now  # reancora: a grade antiga ficou para trás
+            print(f"⚠️ {self.label}: tick took {self.last_tick_seconds:.2f}s (> {self.interval:g}s), "
+                  f"late by {late:.2f}s, {skipped} tick(s) skipped")
+
+        self.tick_start = next_start
+        return max(0.0, next_start - now)
+
+    def wait_next(self) -> None:
+        time.sleep(self._advance())
+
+    async def wait_next_async(self) -> None:
+        await asyncio.sleep(self._advance())
+
+    def _phase_delay(self, index: int, total: int) -> float:
+        if self.tick_start is None or total <= 0:
+            return 0.0
+        return self.tick_start + self.interval * index / total - time.monotonic()
+
+    def pace(self, index: int, total: int) -> None:
+        """Block until entity `index` of `total` reaches its phase offset in the current tick."""
+        delay = self._phase_delay(index, total)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def apace(self, index: int, total: int) -> None:
+        delay = self._phase_delay(index, total)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "last_tick_seconds": round(self.last_tick_seconds, 3) if self.last_tick_seconds is not None else None,
+            "max_lateness_seconds": round(self.max_lateness_seconds, 3),
+        }
@@ -0,0 +1,217 @@
+# app/services/status_batcher.py
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from app.config import STATUS_BATCH_WORKERS
+from app.services import upstream, status_spool
+from app.services.payload_template import JSON_HEADERS
+
+# Respostas de um POST com array no corpo que indicam "endpoint não aceita lote"
+_BULK_REJECTED = {400, 405, 415, 422}
+
+
+class StatusBatcher:
+    """
+    Client-side batching of status records (already-encoded JSON bodies) for one
+    history endpoint.
+
+    `add(body)` only buffers the record; the buffer goes out as ONE POST with a JSON
+    array body when it holds `batch_size` records or its oldest record is
+    `linger_seconds` old. `workers` threads send the batches. The first batch probes
+    the endpoint: if it rejects an array body (400/405/415/422) the batcher switches
+    to single POSTs for good, still spread over the workers (pipelined). Records that
+    fail because the endpoint is down go to the disk spool (status_spool), if enabled;
+    that write happens on the worker threads, so async loops (`aadd`) never wait on disk.
+    At most `max_pending` batches wait for a worker; beyond that `add` blocks
+    (`aadd` waits in a thread) so a slow upstream slows the loop instead of memory growing.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        batch_size: int,
+        linger_seconds: float,
+        workers: int = STATUS_BATCH_WORKERS,
+        label: str = "status-batcher",
+        max_pending: Optional[int] = None,
+    ):
+        self.url = url
+        self.batch_size = max(1, batch_size)
+        self.linger = linger_seconds
+        self.label = label
+        self.bulk: Optional[bool] = None  # None: endpoint ainda não testado
+        self._cond = threading.Condition()
+        self._buffer: List[bytes] = []
+        self._deadline = 0.0
+        self._closed = False
+        self._batches: "queue.Queue[Optional[List[bytes]]]" = queue.Queue(max_pending or max(1, workers) * 4)
+        self._probe_lock = threading.Lock()
+        self.counters = {"records": 0, "batches": 0, "bulk_posts": 0, "single_posts": 0, "sent": 0, "failed": 0}
+
+        self._workers = [
+            threading.Thread(target=self._work, name=f"{label}-{i}", daemon=True) for i in range(max(1, workers))
+        ]
+        self._linger_thread = threading.Thread(target=self._linger, name=f"{label}-linger", daemon=True)
+        for t in (*self._workers, self._linger_thread):
+            t.start()
+
+    # ---------------------------
+    #  Entrada (loops de status)
+    # ---------------------------
+
+    def _take_locked(self) -> List[bytes]:
+        batch, self._buffer = self._buffer, []
+        self.counters["batches"] += 1
+        return batch
+
+    def _append(self, body: bytes) -> Optional[List[bytes]]:
+        """Buffer `body`; return the batch to enqueue once it is full."""
+        with self._cond:
+            self._buffer.append(body)
+            self.counters["records"] += 1
+            if len(self._buffer) == 1:
+                self._deadline = time.monotonic() + self.linger
+                self._cond.notify_all()  # acorda o flush por tempo
+            if len(self._buffer) >= self.batch_size:
+                return self._take_locked()
+        return None
+
+    def add(self, body: bytes) -> None:
+        batch = self._append(body)
+        if batch:
+            self._batches.put(batch)
+
+    async def aadd(self, body: bytes) -> None:
+        """Async variant of add: never blocks the event loop when the queue is full."""
+        batch = self._append(body)
+        if batch:
+            try:
+                self._batches.put_nowait(batch)
+            except queue.Full:
+                await asyncio.to_thread(self._batches.put, batch)
+
+    def _linger(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (not self._buffer or time.monotonic() < self._deadline):
+                    self._cond.wait(self._deadline - time.monotonic() if self._buffer else None)
+                if self._closed:
+                    return  # close() envia o que sobrou
+                batch = self._take_locked()
+            self._batches.put(batch)
+
+    # ---------------------------
+    #  Envio (workers)
+    # ---------------------------
+
+    def _post_bulk(self, batch: List[bytes]) -> Optional[bool]:
+        """POST the batch as a JSON array; None if the endpoint does not accept arrays."""
+        try:
+            response = upstream.post(self.url, data=b"[" + b",".join(batch) + b"]", headers=JSON_HEADERS)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ {self.label}: error sending batch of {len(batch)}: {e}")
+            status_spool.capture(self.url, batch, e)
+            return False
+        if response.status_code in _BULK_REJECTED and not self.bulk:
+            print(f"ℹ️ {self.label}: upstream rejected array bodies ({response.status_code}); using single POSTs.")
+            self.bulk = False
+            return None
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ {self.label}: error sending batch of {len(batch)}: {e}")
+            status_spool.capture(self.url, batch, e)
+            return False
+        self.bulk = True
+        return True
+
+    def _post_single(self, body: bytes) -> bool:
+        try:
+            upstream.post(self.url, data=body, headers=JSON_HEADERS).raise_for_status()
+            return True
+        except requests.exceptions.RequestException as e:
+            print(f"❌ {self.label}: error sending status: {e}")
+            status_spool.capture(self.url, (body,), e)
+            return False
+
+    def _count(self, records: int, ok: bool, bulk: bool) -> None:
+        with self._cond:
+            self.counters["bulk_posts" if bulk else "single_posts"] += 1
+            self.counters["sent" if ok else "failed"] += records
+
+    def _send(self, batch: List[bytes]) -> None:
+        if len(batch) > 1 and self.bulk is not False:
+            if self.bulk is None:
+                with self._probe_lock:  # só um lote testa o endpoint; os outros esperam o resultado
+                    result = self._post_bulk(batch) if self.bulk is not False else None
+            else:
+                result = self._post_bulk(batch)
+            if result is not None:
+                self._count(len(batch), result, bulk=True)
+                return
+        for body in batch:
+            self._count(1, self._post_single(body), bulk=False)
+
+    def _work(self) -> None:
+        while True:
+            batch = self._batches.get()
+            try:
+                if batch is None:
+                    return
+                self._send(batch)
+            except Exception as e:  # um lote ruim não derruba o worker
+                print(f"❌ {self.label}: unexpected error: {e!r}")
+            finally:
+                self._batches.task_done()
+
+    # ---------------------------
+    #  Controle
+    # ---------------------------
+
+    def flush(self) -> None:
+        """Enqueue whatever is buffered now, without waiting for the linger time."""
+        with self._cond:
+            batch = self._take_locked() if self._buffer else None
+        if batch:
+            self._batches.put(batch)
+
+    def wait_idle(self) -> None:
+        """Flush and block until every buffered record has been sent (or failed)."""
+        self.flush()
+        self._batches.join()
+
+    def close(self) -> None:
+        """Send what is left and stop the threads."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._linger_thread.join()
+        self.flush()
+        for _ in self._workers:
+            self._batches.put(None)
+        for t in self._workers:
+            t.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.counters,
+                "bulk": self.bulk,
+                "batch_size": self.batch_size,
+                "linger_seconds": self.linger,
+                "buffered": len(self._buffer),
+                "queued_batches": self._batches.qsize(),
+            }
+
+
+def open_status_batcher(url: str, batch_size: int, linger_seconds: float, label: str) -> Optional[StatusBatcher]:
+    """Batcher for a status loop, or None when batch_size <= 1 (one direct POST per record)."""
+    if batch_size <= 1:
+        return None
+    return StatusBatcher(url, batch_size, linger_seconds, label=label)
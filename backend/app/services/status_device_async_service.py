@@ -0,0 +1,304 @@
+# app/services/status_device_async_service.py
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union
+
+import httpx
+import numpy as np
+
+from app.services import upstream, status_spool
+from app.services import status_device_service as sync_service
+from app.services.concurrency import run_bounded
+from app.services.scheduler import TickScheduler
+from app.services.timer_wheel import TimerWheel
+from app.services.registry_cache import registry_cache
+from app.services.json_stream import aiter_json_array, STREAM_CHUNK_BYTES
+from app.services.device_service import STATUS_INTERVAL_BY_TYPE
+from app.services.device_power import device_power, power_steps, apower_steps
+from app.services.payload_template import date_fragment, JSON_HEADERS
+from app.services.status_batcher import StatusBatcher, open_status_batcher
+from app.services.rate_limiter import TokenBucket, open_bucket, close_bucket
+from app.services.status_device_service import device_status_body, submit_device_power_state
+from app.config import DEVICE_API_URL, DEVICE_STATUS_API_URL
+
+# Limite padrão de requisições simultâneas por rodada
+DEFAULT_CONCURRENCY = 100
+
+# Métricas da última rodada (expostas em GET /status-device/loop/stats)
+device_status_loop_stats: Dict[str, Any] = {
+    "ticks": 0,
+    "last_tick_seconds": None,
+    "last_tick_devices": 0,
+    "last_tick_puts": 0,
+    "last_tick_statuses_sent": 0,
+    "last_tick_errors": 0,
+}
+
+
+async def get_devices() -> List[Dict[str, Any]]:
+    try:
+        data = await registry_cache.aget(DEVICE_API_URL)
+        return data if isinstance(data, list) else []
+    except httpx.HTTPError as e:
+        print(f"❌ Error fetching devices: {e!r}")
+        return []
+
+
+async def aiter_devices() -> AsyncIterator[Dict[str, Any]]:
+    """Async variant of device_service.iter_devices: records as the body streams in."""
+    try:
+        async with upstream.astream("GET", DEVICE_API_URL) as response:
+            response.raise_for_status()
+            async for device in aiter_json_array(response.aiter_bytes(STREAM_CHUNK_BYTES)):
+                yield device
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"❌ Error streaming devices: {e!r}")
+
+
+async def _aenumerate(items: AsyncIterable[Any]) -> AsyncIterator[Any]:
+    i = 0
+    async for item in items:
+        yield i, item
+        i += 1
+
+
+async def send_device_status_to_api(body: bytes, device_id: str, sem: asyncio.Semaphore) -> bool:
+    try:
+        async with sem:
+            response = await upstream.apost(DEVICE_STATUS_API_URL, content=body, headers=JSON_HEADERS)
+        response.raise_for_status()
+        return True
+    except httpx.HTTPError as e:
+        print(f"❌ Error sending device status {device_id}: {e!r}")
+        await status_spool.acapture(DEVICE_STATUS_API_URL, (body,), e)
+        return False
+
+
+async def _process_device(
+    device: Dict[str, Any],
+    changed: bool,
+    status: bool,
+    date: bytes,
+    sem: asyncio.Semaphore,
+    counters: Dict[str, int],
+    batcher: Optional[StatusBatcher] = None,
+    bucket: Optional[TokenBucket] = None,
+) -> None:
+    """
+    Pipeline de um device numa rodada: PUT de energia (se o passo de device_power o
+    mudou) e, estando ON, POST do status histórico (ou entrega ao `batcher`), depois
+    de um token do `bucket` quando há taxa fixa.
+    O PUT vai para a fila write-behind do loop síncrono (device_put_queue): só o último
+    estado por device é enviado, e um PUT que falha volta o ON/OFF em device_power.
+    Rodadas de devices diferentes se sobrepõem.
+    """
+    device_id = device.get("id")
+    if not device_id or not sync_service.device_status_loop_running:
+        return
+
+    if changed:
+        submit_device_power_state(device, status)  # só enfileira; não bloqueia o event loop
+        counters["puts"] += 1
+
+    # Só envia status histórico se o device estiver ON
+    if status:
+        if bucket:
+            await bucket.aacquire()
+        body = device_status_body(device_id, date)
+        if batcher:
+            await batcher.aadd(body)
+            counters["sent"] += 1
+        elif await send_device_status_to_api(body, device_id, sem):
+            counters["sent"] += 1
+        else:
+            counters["errors"] += 1
+
+
+async def run_device_status_tick_async(
+    devices: Union[List[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+    now: datetime,
+    sem: asyncio.Semaphore,
+    concurrency: int,
+    prob_down: float = 0.12,
+    prob_up: float = 0.25,
+    pace: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    total: Optional[int] = None,
+    batcher: Optional[StatusBatcher] = None,
+    bucket: Optional[TokenBucket] = None,
+) -> Dict[str, int]:
+    """
+    Executa uma rodada em pipeline; retorna os contadores de devices, PUTs (enfileirados),
+    envios e erros.
+    `devices` pode ser uma lista ou um async iterator em streaming (aiter_devices); o
+    ON/OFF de todos avança num passo vetorizado (device_power) com prob_down/prob_up.
+    `pace(i, n)`, se informado, segura o device i até o seu instante dentro do intervalo;
+    `total` é o n quando `devices` não tem len (sem ele, não há espaçamento).
+    """
+    counters = {"devices": 0, "puts": 0, "sent": 0, "errors": 0}
+    date = date_fragment(now)  # um único fragmento de data (JSON) por rodada
+    if total is None and hasattr(devices, "__len__"):
+        total = len(devices)
+
+    async def _paced(item) -> None:
+        i, device, changed, status = item
+        counters["devices"] += 1
+        if pace and total:
+            await pace(i, total)
+        await _process_device(device, changed, status, date, sem, counters, batcher, bucket)
+
+    if hasattr(devices, "__aiter__"):
+        steps = apower_steps(devices, prob_down, prob_up)
+    else:
+        steps = power_steps(devices, prob_down, prob_up)
+    await run_bounded(steps, _paced, concurrency)
+    return counters
+
+
+def _record_round(devices: int, elapsed: float, counters: Dict[str, int]) -> None:
+    device_status_loop_stats.update({
+        "ticks": device_status_loop_stats["ticks"] + 1,
+        "last_tick_seconds": round(elapsed, 3),
+        "last_tick_devices": devices,
+        "last_tick_puts": counters["puts"],
+        "last_tick_statuses_sent": counters["sent"],
+        "last_tick_errors": counters["errors"],
+    })
+
+
+async def start_device_status_loop_async(
+    interval_seconds: int = 5,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    prob_down: float = 0.12,
+    prob_up: float = 0.25,
+    spread: bool = False,
+    stream: bool = False,
+    batch_size: int = 1,
+    linger_seconds: float = 0.5,
+    rate: Optional[float] = None,
+    burst: Optional[int] = None,
+) -> None:
+    """
+    Variante assíncrona do loop de status de devices: PUTs de energia e POSTs de
+    histórico de toda a rodada rodam em pipeline com no máximo `concurrency` em voo.
+    Com `spread`, os devices são distribuídos ao longo do intervalo. Com `stream`, a
+    rodada começa enquanto a lista ainda é baixada (aiter_devices), com memória limitada.
+    Com `batch_size` > 1, os status vão em lotes (StatusBatcher); com `rate`, a `rate`
+    eventos/s (TokenBucket), em rodadas seguidas.
+    """
+    sync_service.device_status_loop_running = True
+    sem = asyncio.Semaphore(concurrency)
+    device_power.clear()  # uma rodada interrompida não chegou a enviar todos os PUTs
+    bucket = open_bucket(DEVICE_STATUS_API_URL, rate, burst, label="Device status rate")
+    scheduler = sync_service.loop_scheduler = TickScheduler(
+        0 if bucket else interval_seconds, label="Async device status loop"
+    )
+    pace = scheduler.apace if spread and not bucket else None
+    batcher = sync_service.status_batcher = open_status_batcher(
+        DEVICE_STATUS_API_URL, batch_size, linger_seconds, label="device-status-batch"
+    )
+    scheduler.begin()
+
+    print(
+        f"\n⏳ Starting async device status loop every {interval_seconds} seconds "
+        f"(concurrency={concurrency}{', streaming' if stream else ''})..."
+    )
+
+    last_total: Optional[int] = None
+    try:
+        while sync_service.device_status_loop_running:
+            devices = aiter_devices() if stream else await get_devices()
+            if not stream and not devices:
+                print("⚠️ No devices found.")
+                if bucket:
+                    await asyncio.sleep(interval_seconds)  # taxa fixa: nova tentativa após `interval`
+                await scheduler.wait_next_async()
+                continue
+
+            # Timestamp único por rodada (como no backend Java)
+            now = datetime.now()
+            started = time.monotonic()
+            counters = await run_device_status_tick_async(
+                devices, now, sem, concurrency, prob_down, prob_up, pace,
+                total=last_total, batcher=batcher, bucket=bucket,
+            )
+            if stream and counters["devices"]:
+                last_total = counters["devices"]  # espaçamento da próxima rodada
+            elif stream and bucket:
+                await asyncio.sleep(interval_seconds)  # lista vazia com taxa fixa: nova tentativa após `interval`
+
+            elapsed = time.monotonic() - started
+            _record_round(counters["devices"], elapsed, counters)
+            print(
+                f"✅ Device tick: {counters['devices']} devices in {elapsed:.2f}s "
+                f"(PUTs={counters['puts']}, statuses={counters['sent']}, errors={counters['errors']})"
+            )
+
+            await scheduler.wait_next_async()
+
+    except Exception as e:
+        print(f"❌ Error during async device status loop: {e!r}")
+    finally:
+        close_bucket(bucket)
+        if batcher:
+            await asyncio.to_thread(batcher.close)
+
+
+async def start_device_status_wheel_loop(
+    default_interval: float = 5,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    prob_down: float = 0.12,
+    prob_up: float = 0.25,
+    resolution_seconds: float = 0.1,
+    batch_size: int = 1,
+    linger_seconds: float = 0.5,
+) -> None:
+    """
+    Loop com intervalo próprio por device (STATUS_INTERVAL_BY_TYPE, pelo `typeDevice`;
+    `default_interval` para tipos desconhecidos). Um TimerWheel guarda o próximo disparo
+    de cada device e a cada passo só os vencidos avançam o ON/OFF (device_power) e
+    passam por _process_device (status em lotes com `batch_size` > 1).
+    """
+    sync_service.device_status_loop_running = True
+    sem = asyncio.Semaphore(concurrency)
+
+    print(f"\n⏳ Starting per-device status loop (default {default_interval}s, concurrency={concurrency})...")
+
+    devices = await get_devices()
+    if not devices:
+        print("⚠️ No devices found. Simulation aborted.")
+        return
+
+    intervals = np.array(
+        [STATUS_INTERVAL_BY_TYPE.get(d.get("typeDevice"), default_interval) for d in devices], dtype=float
+    )
+    device_power.load(devices)
+    wheel = sync_service.loop_scheduler = TimerWheel(resolution_seconds, label="Per-device status loop")
+    # Fase aleatória dentro do próprio intervalo: devices do mesmo tipo não disparam juntos
+    wheel.schedule_many(np.arange(len(devices)), intervals, np.random.default_rng().uniform(0, intervals))
+    batcher = sync_service.status_batcher = open_status_batcher(
+        DEVICE_STATUS_API_URL, batch_size, linger_seconds, label="device-status-batch"
+    )
+
+    try:
+        while sync_service.device_status_loop_running:
+            due = wheel.advance()
+            if due:
+                date = date_fragment(datetime.now())
+                started = time.monotonic()
+                counters = {"puts": 0, "sent": 0, "errors": 0}
+                flips = device_power.step(prob_down, prob_up, due)
+                await run_bounded(
+                    zip(due, flips.tolist(), device_power.active[due].tolist()),
+                    lambda item: _process_device(devices[item[0]], item[1], item[2], date, sem, counters, batcher),
+                    concurrency,
+                )
+                _record_round(len(due), time.monotonic() - started, counters)
+            await asyncio.sleep(wheel.seconds_until_next_tick())
+
+    except Exception as e:
+        print(f"❌ Error during per-device status loop: {e!r}")
+    finally:
+        if batcher:
+            await asyncio.to_thread(batcher.close)
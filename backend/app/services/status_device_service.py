@@ -1,79 +1,93 @@
 # app/services/status_device_service.py
 
+import json
 import requests
 import random
 import time
 from datetime import datetime
-from typing import Dict
-import copy
-
-from app.config import DEVICE_API_URL, DEVICE_STATUS_API_URL
+from typing import Callable, Dict, Iterable, Optional
+
+from app.config import DEVICE_API_URL, DEVICE_STATUS_API_URL, PUT_QUEUE_WORKERS
+from app.services import upstream, status_spool
+from app.services.scheduler import TickScheduler
+from app.services.device_index import device_index
+from app.services.registry_cache import registry_cache
+from app.services.write_behind import WriteBehindQueue
+from app.services.device_service import iter_devices
+from app.services.device_power import device_power, power_steps
+from app.services.payload_template import PatchedRecord, device_templates, date_dict, date_fragment, JSON_HEADERS
+from app.services.status_batcher import StatusBatcher, open_status_batcher
+from app.services.rate_limiter import TokenBucket, open_bucket, close_bucket
 
 # Modos de operação (histórico)
 OPERATION_MODES = ["operational", "test", "disabled", "maintenance"]
 
+# Fragmentos JSON constantes do POST de status (ver device_status_body)
+_SITUATION_FRAGMENTS = [b',"situation":' + json.dumps(mode).encode() + b"}" for mode in OPERATION_MODES]
+
+# {"idDevice":"...","date":  — por device, codificado no primeiro envio
+_status_heads: Dict[str, bytes] = {}
+
 # Controle do loop
 device_status_loop_running = True
 
-# Memória local para evitar PUTs desnecessários
-_last_known_status: Dict[str, bool] = {}
+# Agendador do loop em execução (métricas em GET /status-device/loop/stats)
+loop_scheduler: Optional[TickScheduler] = None
 
+# Envio em lote dos status do loop em execução (None: um POST por status)
+status_batcher: Optional[StatusBatcher] = None
 
 def get_devices():
     try:
-        response = requests.get(DEVICE_API_URL, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return registry_cache.get(DEVICE_API_URL)
     except requests.RequestException as e:
         print(f"❌ Error fetching devices: {e}")
         return []
 
 
-def _now_date_dict():
-    now = datetime.now()
-    return {
-        "year": now.year,
-        "month": now.month,
-        "dayOfMonth": now.day,
-        "hourOfDay": now.hour,
-        "minute": now.minute,
-        "second": now.second
-    }
-
-
 def generate_device_status(device_id, timestamp):
     return {
         "idDevice": device_id,
-        "date": {
-            "year": timestamp.year,
-            "month": timestamp.month,
-            "dayOfMonth": timestamp.day,
-            "hourOfDay": timestamp.hour,
-            "minute": timestamp.minute,
-            "second": timestamp.second
-        },
+        "date": date_dict(timestamp),
         "situation": random.choice(OPERATION_MODES)
     }
 
 
-def send_device_status_to_api(status_data):
+def device_status_body(device_id: str, date: bytes) -> bytes:
+    """
+    JSON do status histórico do device (mesmo conteúdo de generate_device_status) a partir
+    de fragmentos pré-codificados; `date` é o fragmento de data do tick (date_fragment).
+    """
+    head = _status_heads.get(device_id)
+    if head is None:
+        head = _status_heads[device_id] = b'{"idDevice":' + json.dumps(device_id).encode() + b',"date":'
+    # random.choice é ~2x mais lento que indexar com random.random() (igualmente uniforme)
+    return head + date + _SITUATION_FRAGMENTS[int(random.random() * len(_SITUATION_FRAGMENTS))]
+
+
+def send_device_status_to_api(body: bytes, device_id: str):
     try:
-        response = requests.post(DEVICE_STATUS_API_URL, json=status_data, timeout=10)
+        response = upstream.post(DEVICE_STATUS_API_URL, data=body, headers=JSON_HEADERS)
         response.raise_for_status()
-        print(f"✅ Device status sent: {status_data['idDevice']} @ {status_data['date']}")
+        print(f"✅ Device status sent: {device_id}")
     except requests.exceptions.RequestException as e:
         print(f"❌ Error sending device status: {e}")
+        status_spool.capture(DEVICE_STATUS_API_URL, (body,), e)
 
 
-def _put_full_device_payload(updated_device: dict) -> bool:
+def _put_full_device_payload(updated_device: PatchedRecord) -> bool:
     """
     Envia o payload COMPLETO do device via PUT para atualizar o campo booleano 'status'.
-    Mantém a estrutura retornada pelo GET e só altera 'status' e 'date'.
+    Mantém a estrutura retornada pelo GET e só altera 'status' e 'date'; o corpo vem do
+    template pré-serializado do registro (device_templates).
     Retorna True/False conforme sucesso da operação.
     """
     try:
-        resp = requests.put(DEVICE_API_URL, json=updated_device, timeout=10)
+        resp = upstream.put(DEVICE_API_URL, data=updated_device.body(), headers=JSON_HEADERS)
         resp.raise_for_status()
+        record = updated_device.merged()
+        device_index.upsert(record)
+        registry_cache.put_record(DEVICE_API_URL, record, "id")
         print(f"🔄 Device {updated_device.get('id')} updated via PUT (status={updated_device.get('status')}).")
         return True
     except requests.RequestException as e:
@@ -81,90 +95,159 @@ def _put_full_device_payload(updated_device: dict) -> bool:
         return False
 
 
-def maybe_update_device_power_state(device: dict, prob_down: float = 0.12, prob_up: float = 0.25) -> dict:
-    """
-    Decide aleatoriamente se atualiza o booleano 'status' do cadastro do device (via PUT) e
-    RETORNA o device (atualizado ou original).
+def _after_device_put(device_id: str, payload: dict, success: bool) -> None:
+    if not success:
+        device_power.revert(device_id, payload["status"])  # PUT falhou; volta ao original
 
-    - Se o device está ON (True): com prob_down, desliga (False).
-    - Se está OFF (False): com prob_up, liga (True).
 
-    Sempre que mudar, envia o JSON completo (como veio do GET) com 'status' e 'date' atualizados.
-    """
-    device_id = device.get("id")
-    if not device_id:
-        return device
+# PUTs de energia dos devices: só o último estado desejado por id é enviado
+device_put_queue = WriteBehindQueue(
+    _put_full_device_payload, PUT_QUEUE_WORKERS, on_done=_after_device_put, label="device-put"
+)
+
 
-    current_status = bool(device.get("status", True))
-    prev_mem = _last_known_status.get(device_id, current_status)
+def _power_state_payload(device: dict, new_status: bool) -> PatchedRecord:
+    """Payload completo do device (como veio do GET) alterando apenas status e date, sem copiá-lo."""
+    return PatchedRecord(device, new_status, datetime.now(), device_templates)
 
-    new_status = current_status
-    if current_status and random.random() < prob_down:
-        new_status = False
-    elif not current_status and random.random() < prob_up:
-        new_status = True
 
-    # Evita PUT se nada mudou
-    if new_status == current_status:
-        _last_known_status[device_id] = current_status
-        return device
+def submit_device_power_state(device: dict, new_status: bool) -> PatchedRecord:
+    """
+    Enfileira o PUT do device com o novo booleano 'status' (decidido em device_power)
+    e RETORNA o payload enviado.
 
+    Envia o JSON completo (como veio do GET) com 'status' e 'date' atualizados.
+    """
     # Monta payload completo alterando apenas status e date
-    payload = copy.deepcopy(device)
-    payload["status"] = new_status
-    payload["date"] = _now_date_dict()
+    payload = _power_state_payload(device, new_status)
 
     # IMPORTANTE: mantenha 'gateway' exatamente como o GET retornou.
-    if _put_full_device_payload(payload):
-        _last_known_status[device_id] = new_status
-        return payload  # devolve o device atualizado para uso imediato no loop
-    else:
-        # PUT falhou; mantemos o original
-        _last_known_status[device_id] = current_status
-        return device
-
-
-def start_device_status_loop(interval_seconds: int = 5):
-    global device_status_loop_running
+    # PUT via fila write-behind: só o último estado por device é enviado
+    device_put_queue.submit(device.get("id"), payload)
+    return payload
+
+
+def run_device_status_tick(
+    devices: Iterable[dict],
+    now: datetime,
+    pace: Optional[Callable[[int, int], None]] = None,
+    total: Optional[int] = None,
+    prob_down: float = 0.12,
+    prob_up: float = 0.25,
+    batcher: Optional[StatusBatcher] = None,
+    bucket: Optional[TokenBucket] = None,
+) -> int:
+    """
+    Executa uma rodada serial: PUT de energia (se mudou) e status histórico dos devices ON
+    (direto ou, com `batcher`, em lote; com `bucket`, cada status espera um token).
+    `devices` pode ser uma lista ou um iterador em streaming (iter_devices); o ON/OFF de
+    todos avança num passo vetorizado (device_power) com prob_down/prob_up.
+    `pace(i, n)`, se informado, segura o device i até o seu instante dentro do intervalo;
+    `total` é o n quando `devices` não tem len (sem ele, não há espaçamento).
+    Retorna quantos devices foram percorridos.
+    """
+    if total is None and hasattr(devices, "__len__"):
+        total = len(devices)
+    count = 0
+    date = date_fragment(now)  # um único fragmento de data (JSON) por rodada
+    for i, device, changed, status in power_steps(devices, prob_down, prob_up):
+        if not device_status_loop_running:
+            break
+        count += 1
+        if pace and total:
+            pace(i, total)
+
+        device_id = device.get("id")
+        if not device_id:
+            continue
+
+        # 1) PUT de energia só para os devices que mudaram de estado neste passo
+        if changed:
+            submit_device_power_state(device, status)
+
+        # 2) Só envia status histórico se o device estiver ON (status=True)
+        if status:
+            if bucket:
+                bucket.acquire()
+            body = device_status_body(device_id, date)
+            if batcher:
+                batcher.add(body)
+            else:
+                send_device_status_to_api(body, device_id)
+        else:
+            # opcional: debug curto
+            # print(f"⏸️ Skipping status for OFF device {device_id}")
+            pass
+    return count
+
+
+def start_device_status_loop(
+    interval_seconds: int = 5,
+    spread: bool = False,
+    stream: bool = False,
+    batch_size: int = 1,
+    linger_seconds: float = 0.5,
+    rate: Optional[float] = None,
+    burst: Optional[int] = None,
+):
+    """
+    Loop serial de status dos devices. Com `stream`, cada rodada percorre a lista enquanto
+    ela é baixada (iter_devices): o primeiro envio não espera o corpo inteiro e a memória
+    não cresce com o número de devices; o espaçamento usa a contagem da rodada anterior.
+    Com `batch_size` > 1, os status vão em lotes (StatusBatcher) de até `batch_size`
+    registros ou `linger_seconds` de espera. Com `rate`, as rodadas emendam umas nas
+    outras e os status saem a `rate` eventos/s (TokenBucket com `burst`), sem `interval`.
+    """
+    global device_status_loop_running, loop_scheduler, status_batcher
     device_status_loop_running = True
 
-    print(f"\n⏳ Starting device status loop every {interval_seconds} seconds...")
+    print(f"\n⏳ Starting device status loop every {interval_seconds} seconds{' (streaming)' if stream else ''}...")
+
+    device_power.clear()  # uma rodada interrompida não chegou a enviar todos os PUTs
+    bucket = open_bucket(DEVICE_STATUS_API_URL, rate, burst, label="Device status rate")
+    # Com taxa fixa, intervalo 0: a próxima rodada começa assim que a anterior termina
+    scheduler = loop_scheduler = TickScheduler(0 if bucket else interval_seconds, label="Device status loop")
+    pace = scheduler.pace if spread and not bucket else None
+    batcher = status_batcher = open_status_batcher(
+        DEVICE_STATUS_API_URL, batch_size, linger_seconds, label="device-status-batch"
+    )
+    scheduler.begin()
 
+    last_total: Optional[int] = None
     try:
         while device_status_loop_running:
+            if stream:
+                seen = run_device_status_tick(
+                    iter_devices(), datetime.now(), pace, last_total, batcher=batcher, bucket=bucket
+                )
+                if seen:
+                    last_total = seen
+                else:
+                    print("⚠️ No devices found.")
+                    if bucket:
+                        time.sleep(interval_seconds)  # taxa fixa: nova tentativa após `interval`
+                scheduler.wait_next()
+                continue
+
             devices = get_devices()
             if not devices:
                 print("⚠️ No devices found.")
-                time.sleep(interval_seconds)
+                if bucket:
+                    time.sleep(interval_seconds)  # taxa fixa: nova tentativa após `interval`
+                scheduler.wait_next()
                 continue
 
             # Timestamp único por rodada (como no backend Java)
-            now = datetime.now()
-
-            for device in devices:
-                if not device_status_loop_running:
-                    break
-
-                device_id = device.get("id")
-                if not device_id:
-                    continue
-
-                # 1) (Novo) chance de alternar status ON/OFF e persistir via PUT — retorna o device (atualizado ou não)
-                device = maybe_update_device_power_state(device)
-
-                # 2) Só envia status histórico se o device estiver ON (status=True)
-                if bool(device.get("status", True)):
-                    status = generate_device_status(device_id, now)
-                    send_device_status_to_api(status)
-                else:
-                    # opcional: debug curto
-                    # print(f"⏸️ Skipping status for OFF device {device_id}")
-                    pass
+            run_device_status_tick(devices, datetime.now(), pace, batcher=batcher, bucket=bucket)
 
-            time.sleep(interval_seconds)
+            scheduler.wait_next()
 
     except Exception as e:
         print(f"❌ Error during device status loop: {e}")
+    finally:
+        close_bucket(bucket)
+        if batcher:
+            batcher.close()  # envia o que ficou no buffer
 
 
 def stop_device_status_loop():
@@ -176,7 +259,7 @@ def stop_device_status_loop():
 def get_device_statuses():
     """Retrieve list of device statuses from the API."""
     try:
-        response = requests.get(DEVICE_STATUS_API_URL, timeout=10)
+        response = upstream.get(DEVICE_STATUS_API_URL)
         response.raise_for_status()
 
         statuses = response.json()
@@ -0,0 +1,401 @@
+# app/services/status_spool.py
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+from app.config import (
+    GATEWAY_STATUS_API_URL,
+    DEVICE_STATUS_API_URL,
+    STATUS_SPOOL_DIR,
+    STATUS_SPOOL_SEGMENT_BYTES,
+    STATUS_SPOOL_MAX_BYTES,
+    STATUS_SPOOL_FSYNC,
+    STATUS_SPOOL_FSYNC_INTERVAL,
+    STATUS_SPOOL_REPLAY_RATE,
+)
+from app.services import upstream
+from app.services.payload_template import JSON_HEADERS
+from app.services.rate_limiter import TokenBucket
+from app.services.resilience import backoff_delay
+
+FSYNC_POLICIES = ("always", "interval", "never")
+SEGMENT_SUFFIX = ".seg"
+CURSOR_FILE = "cursor"
+
+# O cursor de replay vai para o disco a cada N registros reenviados (e ao trocar de segmento):
+# depois de uma queda, no máximo N registros são reenviados de novo (entrega at-least-once)
+CURSOR_EVERY = 100
+
+# Espera entre tentativas de replay com o endpoint fora (backoff com jitter)
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+
+# Espera mínima do replay sem nada a reenviar (um append acorda antes)
+IDLE_WAIT_SECONDS = 0.1
+
+
+def is_outage(error: Exception) -> bool:
+    """True for errors worth spooling: no response (timeout, network, open circuit), 5xx or 429."""
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    return status_code is None or status_code >= 500 or status_code == 429
+
+
+class _Segment:
+    __slots__ = ("seq", "path", "size", "records")
+
+    def __init__(self, seq: int, path: str, size: int = 0, records: int = 0):
+        self.seq = seq
+        self.path = path
+        self.size = size
+        self.records = records
+
+
+def _count_lines(path: str) -> int:
+    count = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            count += chunk.count(b"\n")
+    return count
+
+
+class StatusSpool:
+    """
+    Append-only on-disk spool (write-ahead log) of status events that could not be sent
+    to one history endpoint.
+
+    `append(body)` writes the JSON as one line of the newest segment file (rotated at
+    `segment_bytes`) and fsyncs per `fsync`: "always" (every record), "interval" (at
+    most every `fsync_interval` seconds) or "never" (left to the OS). Past `max_bytes`
+    the oldest segments are deleted, unsent records included (counted as evicted).
+    A replay thread POSTs the records back in order, at most `replay_rate` per second
+    (TokenBucket), so the backlog never starves the live loop; while the endpoint is
+    still down it backs off and retries the same record. The replay position survives
+    restarts through a cursor file; delivery is at-least-once.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        directory: str,
+        segment_bytes: int = STATUS_SPOOL_SEGMENT_BYTES,
+        max_bytes: int = STATUS_SPOOL_MAX_BYTES,
+        fsync: str = STATUS_SPOOL_FSYNC,
+        fsync_interval: float = STATUS_SPOOL_FSYNC_INTERVAL,
+        replay_rate: float = STATUS_SPOOL_REPLAY_RATE,
+        label: str = "status-spool",
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.url = url
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # pelo menos 4 segmentos cabem no limite: o despejo nunca precisa apagar o segmento ativo
+        self.segment_bytes = max(1, min(segment_bytes, max_bytes // 4))
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.label = label
+        self._cond = threading.Condition()
+        self._closed = False
+        self._writer = None
+        self._active: Optional[_Segment] = None
+        self._dirty = False
+        self._synced_at = time.monotonic()
+        self._reader = None
+        self._read_offset = 0
+        self._read_records = 0
+        self._since_cursor = 0
+        self._bucket = TokenBucket(replay_rate, label=f"{label}-replay")
+        self.counters = {"appended": 0, "replayed": 0, "rejected": 0, "evicted": 0, "evicted_bytes": 0, "replay_failures": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments = self._scan()
+        # números de segmento só crescem (inclusive além do cursor): nada novo parece já reenviado
+        self._last_seq = self._segments[-1].seq if self._segments else 0
+        self._bytes = sum(s.size for s in self._segments)
+        self._pending = sum(s.records for s in self._segments)
+        self._load_cursor()
+        if self._pending:
+            print(f"💾 {label}: {self._pending} unsent status(es) on disk; replaying at {replay_rate:g}/s.")
+
+        self._thread = threading.Thread(target=self._replay, name=f"{label}-replay", daemon=True)
+        self._thread.start()
+
+    # ---------------------------
+    #  Recuperação
+    # ---------------------------
+
+    def _scan(self) -> List[_Segment]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit():
+                path = os.path.join(self.directory, name)
+                segments.append(_Segment(int(name[:-len(SEGMENT_SUFFIX)]), path, os.path.getsize(path), _count_lines(path)))
+        return sorted(segments, key=lambda s: s.seq)
+
+    def _load_cursor(self) -> None:
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                seq, offset = (int(v) for v in f.read().split())
+        except (OSError, ValueError):
+            return
+        self._last_seq = max(self._last_seq, seq)
+        # segmentos anteriores ao cursor já foram reenviados (a remoção não chegou ao disco)
+        while self._segments and self._segments[0].seq < seq:
+            self._remove_first_locked()
+        if self._segments and self._segments[0].seq == seq:
+            with open(self._segments[0].path, "rb") as f:
+                consumed = f.read(offset)
+            self._read_offset = len(consumed)
+            self._read_records = consumed.count(b"\n")
+            self._pending -= self._read_records
+
+    def _save_cursor_locked(self) -> None:
+        if not self._segments:
+            return
+        path = os.path.join(self.directory, CURSOR_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(f"{self._segments[0].seq} {self._read_offset}\n")
+            if self.fsync != "never":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._since_cursor = 0
+
+    # ---------------------------
+    #  Escrita
+    # ---------------------------
+
+    def _rotate_locked(self) -> None:
+        if self._writer is not None:
+            self._sync_locked(force=self.fsync != "never")
+            self._writer.close()
+        self._last_seq += 1
+        self._active = _Segment(self._last_seq, os.path.join(self.directory, f"{self._last_seq:012d}{SEGMENT_SUFFIX}"))
+        self._writer = open(self._active.path, "ab")
+        self._segments.append(self._active)
+
+    def _sync_locked(self, force: bool) -> None:
+        if self._writer is None or not self._dirty:
+            return
+        if force or (self.fsync == "interval" and time.monotonic() - self._synced_at >= self.fsync_interval):
+            os.fsync(self._writer.fileno())
+            self._dirty = False
+            self._synced_at = time.monotonic()
+
+    def append(self, body: bytes) -> None:
+        """Persist one unsent status (a JSON document without newlines)."""
+        line = body + b"\n"
+        with self._cond:
+            # Um processo novo nunca escreve em segmentos antigos (a última linha pode estar truncada)
+            if self._active is None or (self._active.size and self._active.size + len(line) > self.segment_bytes):
+                self._rotate_locked()
+            self._writer.write(line)
+            self._writer.flush()
+            self._active.size += len(line)
+            self._active.records += 1
+            self._bytes += len(line)
+            self._dirty = True
+            if not self._pending:
+                print(f"💾 {self.label}: endpoint unavailable, spooling statuses to {self.directory}.")
+            self._pending += 1
+            self.counters["appended"] += 1
+            self._sync_locked(force=self.fsync == "always")
+            self._evict_locked()
+            self._cond.notify_all()
+
+    def _evict_locked(self) -> None:
+        while self._bytes > self.max_bytes and len(self._segments) > 1:
+            oldest = self._segments[0]
+            unsent = oldest.records - self._read_records
+            self.counters["evicted"] += unsent
+            self.counters["evicted_bytes"] += oldest.size - self._read_offset
+            self._pending -= unsent
+            print(f"⚠️ {self.label}: spool over {self.max_bytes} bytes, dropped {unsent} oldest status(es).")
+            self._remove_first_locked()
+
+    def _remove_first_locked(self) -> None:
+        oldest = self._segments.pop(0)
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._read_offset = 0
+        self._read_records = 0
+        self._bytes -= oldest.size
+        try:
+            os.remove(oldest.path)
+        except OSError as e:
+            print(f"❌ {self.label}: could not remove {oldest.path}: {e}")
+
+    # ---------------------------
+    #  Replay
+    # ---------------------------
+
+    def _next_locked(self) -> Optional[bytes]:
+        """Next record to replay (not consumed until _advance_locked), or None when drained."""
+        while self._segments:
+            first = self._segments[0]
+            if self._reader is None:
+                self._reader = open(first.path, "rb")
+            self._reader.seek(self._read_offset)
+            line = self._reader.readline()
+            if line.endswith(b"\n"):
+                return line
+            if first is self._active:
+                return None  # alcançou o escritor
+            # segmento todo reenviado (ou terminado numa linha truncada por queda do processo)
+            self._remove_first_locked()
+            self._save_cursor_locked()
+        return None
+
+    def _advance_locked(self, seq: int, offset: int, line: bytes) -> None:
+        if not self._segments or self._segments[0].seq != seq or self._read_offset != offset:
+            return  # o segmento foi despejado enquanto o registro era enviado
+        self._read_offset += len(line)
+        self._read_records += 1
+        self._pending -= 1
+        self._since_cursor += 1
+        if self._since_cursor >= CURSOR_EVERY:
+            self._save_cursor_locked()
+
+    def _send(self, body: bytes) -> Optional[bool]:
+        """True sent, False endpoint still unavailable, None rejected by the upstream (dropped)."""
+        try:
+            response = upstream.post(self.url, data=body, headers=JSON_HEADERS)
+        except requests.exceptions.RequestException:
+            return False
+        if response.status_code >= 500 or response.status_code == 429:
+            return False
+        if response.status_code >= 400:
+            print(f"⚠️ {self.label}: upstream rejected a spooled status ({response.status_code}); dropped.")
+            return None
+        return True
+
+    def _replay(self) -> None:
+        failures = 0
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    line = self._next_locked()
+                    if line is not None:
+                        break
+                    self._sync_locked(force=False)  # política "interval" também com o spool parado
+                    self._cond.wait(max(IDLE_WAIT_SECONDS, self.fsync_interval))
+                seq, offset = self._segments[0].seq, self._read_offset
+
+            self._bucket.acquire()
+            result = self._send(line[:-1])
+
+            with self._cond:
+                if result is False:
+                    self.counters["replay_failures"] += 1
+                else:
+                    self.counters["replayed" if result else "rejected"] += 1
+                    self._advance_locked(seq, offset, line)
+                    if not self._pending:
+                        self._save_cursor_locked()
+                        print(f"♻️ {self.label}: spool drained ({self.counters['replayed']} status(es) replayed so far).")
+                if result is False:
+                    failures += 1
+                    # o mesmo registro volta a ser tentado; close() interrompe a espera
+                    self._cond.wait(backoff_delay(failures, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS))
+                else:
+                    failures = 0
+
+    # ---------------------------
+    #  Controle
+    # ---------------------------
+
+    def close(self) -> None:
+        """Stop the replay and make what is spooled durable; the rest is replayed on the next start."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        with self._cond:
+            self._save_cursor_locked()
+            if self._writer is not None:
+                self._sync_locked(force=self.fsync != "never")
+                self._writer.close()
+                self._writer = None
+                self._active = None
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.counters,
+                "pending": self._pending,
+                "bytes": self._bytes,
+                "segments": len(self._segments),
+                "fsync": self.fsync,
+                "replay_rate": self._bucket.rate,
+            }
+
+
+# Um spool por endpoint de histórico (subdiretório de STATUS_SPOOL_DIR)
+_SPOOL_NAMES = {
+    url: name
+    for url, name in ((GATEWAY_STATUS_API_URL, "gateway-status"), (DEVICE_STATUS_API_URL, "device-status"))
+    if url
+}
+_spools: Dict[str, StatusSpool] = {}
+_spools_lock = threading.Lock()
+
+
+def spool_for(url: str) -> Optional[StatusSpool]:
+    """The spool of a status endpoint, created on first use (None if STATUS_SPOOL_DIR is not set)."""
+    if not STATUS_SPOOL_DIR or url not in _SPOOL_NAMES:
+        return None
+    spool = _spools.get(url)
+    if spool is None:
+        with _spools_lock:
+            spool = _spools.get(url)
+            if spool is None:
+                name = _SPOOL_NAMES[url]
+                spool = _spools[url] = StatusSpool(url, os.path.join(STATUS_SPOOL_DIR, name), label=f"{name}-spool")
+    return spool
+
+
+def capture(url: str, bodies: Iterable[bytes], error: Exception) -> bool:
+    """Spool status bodies whose POST failed because the endpoint is unavailable; True if spooled."""
+    spool = spool_for(url) if is_outage(error) else None
+    if spool is None:
+        return False
+    for body in bodies:
+        spool.append(body)
+    return True
+
+
+async def acapture(url: str, bodies: Iterable[bytes], error: Exception) -> bool:
+    """Async variant of capture: the disk write (and fsync) runs in a thread, never on the event loop."""
+    if not is_outage(error) or spool_for(url) is None:
+        return False
+    return await asyncio.to_thread(capture, url, tuple(bodies), error)
+
+
+def open_spools() -> None:
+    """Open the spools at startup, so statuses left on disk by a previous run are replayed."""
+    for url in _SPOOL_NAMES:
+        spool_for(url)
+
+
+def close_spools() -> None:
+    with _spools_lock:
+        spools = list(_spools.values())
+        _spools.clear()
+    for spool in spools:
+        spool.close()
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {url: spool.stats() for url, spool in list(_spools.items())}
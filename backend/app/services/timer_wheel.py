@@ -0,0 +1,149 @@
+# app/services/timer_wheel.py
+
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel holding one next-fire time per entity.
+
+    Entities are integer slots 0..N-1 (the caller maps them to gateways/devices).
+    Level 0 has `slots` buckets of `resolution` seconds; each higher level is
+    `slots` times coarser, and its buckets are cascaded down when the level
+    below wraps around. Scheduling appends to a bucket (vectorized per batch), every entity is
+    cascaded at most once per level, and buckets are compact array('q') of slot
+    numbers, so a million entities cost a few tens of MB.
+    """
+
+    def __init__(self, resolution_seconds: float = 0.1, slots: int = 256, levels: int = 4, label: str = "wheel"):
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.resolution = resolution_seconds
+        self.label = label
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._levels = levels
+        self._wheels = [[array("q") for _ in range(slots)] for _ in range(levels)]
+        self._expiry = np.zeros(0, dtype=np.int64)
+        self._interval = np.zeros(0, dtype=np.int64)
+        self._started = time.monotonic()
+        self.current_tick = 0
+        self.scheduled = 0
+        self.fired = 0
+        self.last_due = 0
+        self.max_lag_seconds = 0.0
+
+    # ---------------------------
+    #  Agendamento
+    # ---------------------------
+
+    def _ensure_capacity(self, slot: int) -> None:
+        if slot >= len(self._expiry):
+            size = max(slot + 1, 2 * len(self._expiry), 1024)
+            self._expiry = np.resize(self._expiry, size)
+            self._interval = np.resize(self._interval, size)
+
+    def _place_many(self, slots: np.ndarray) -> None:
+        """Drop each slot into the bucket matching its expiry (vectorized; grouped appends)."""
+        if len(slots) == 0:
+            return
+        expiry = self._expiry[slots]
+        delta = np.maximum(expiry - self.current_tick, 0)
+        level = np.zeros(len(slots), dtype=np.int64)
+        for lv in range(1, self._levels):
+            level[delta >= (1 << (self._bits * lv))] = lv
+        bucket = (expiry >> (self._bits * level)) & self._mask
+        key = (level << self._bits) | bucket
+
+        order = np.argsort(key, kind="stable")
+        slots, key = slots[order], key[order]
+        bounds = np.flatnonzero(np.diff(key)) + 1
+        for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(key)]):
+            k = int(key[start])
+            self._wheels[k >> self._bits][k & self._mask].frombytes(slots[start:stop].tobytes())
+
+    def schedule_many(self, slots: np.ndarray, interval_seconds: np.ndarray, first_delays: np.ndarray) -> None:
+        """Vectorized schedule_every for many slots at once (initial load of a fleet)."""
+        slots = np.asarray(slots, dtype=np.int64)
+        if len(slots) == 0:
+            return
+        self._ensure_capacity(int(slots.max()))
+        self._interval[slots] = np.maximum(1, np.ceil(np.asarray(interval_seconds) / self.resolution)).astype(np.int64)
+        self._expiry[slots] = self.current_tick + np.maximum(
+            1, np.ceil(np.asarray(first_delays) / self.resolution)
+        ).astype(np.int64)
+        self._place_many(slots)
+        self.scheduled += len(slots)
+
+    def schedule_every(self, slot: int, interval_seconds: float, first_delay: Optional[float] = None) -> None:
+        """Fire `slot` every `interval_seconds`, first after `first_delay` (default: one interval)."""
+        delay = interval_seconds if first_delay is None else first_delay
+        self.schedule_many(np.array([slot]), np.array([interval_seconds]), np.array([delay]))
+
+    def _reschedule(self, slots: np.ndarray) -> None:
+        # Relativo ao vencimento anterior (não ao "agora"): a cadência não deriva.
+        # Quem ficou atrasado mais de um período pula os disparos perdidos.
+        interval = self._interval[slots]
+        expiry = self._expiry[slots] + interval
+        behind = self.current_tick - expiry
+        late = behind >= 0
+        expiry[late] += (behind[late] // interval[late] + 1) * interval[late]
+        self._expiry[slots] = expiry
+        self._place_many(slots)
+
+    # ---------------------------
+    #  Avanço
+    # ---------------------------
+
+    def _take(self, level: int, index: int) -> np.ndarray:
+        bucket = self._wheels[level][index]
+        self._wheels[level][index] = array("q")
+        return np.frombuffer(bucket, dtype=np.int64) if bucket else np.zeros(0, dtype=np.int64)
+
+    def _cascade(self) -> None:
+        for level in range(1, self._levels):
+            index = (self.current_tick >> (self._bits * level)) & self._mask
+            self._place_many(self._take(level, index))
+            if index != 0:
+                break
+
+    def advance(self, now: Optional[float] = None) -> List[int]:
+        """
+        Move the wheel up to `now` (monotonic) and return the slots that came due.
+        Due slots are immediately rescheduled for their next period.
+        """
+        now = time.monotonic() if now is None else now
+        target = int((now - self._started) / self.resolution)
+        due: List[np.ndarray] = []
+        while self.current_tick < target:
+            self.current_tick += 1
+            if self.current_tick & self._mask == 0:
+                self._cascade()
+            index = self.current_tick & self._mask
+            if self._wheels[0][index]:
+                due.append(self._take(0, index))
+
+        fired = np.concatenate(due) if due else np.zeros(0, dtype=np.int64)
+        if len(fired):
+            lag = now - self._started - self.current_tick * self.resolution
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+            self._reschedule(fired)
+        self.fired += len(fired)
+        self.last_due = len(fired)
+        return fired.tolist()
+
+    def seconds_until_next_tick(self) -> float:
+        return max(0.0, self._started + (self.current_tick + 1) * self.resolution - time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resolution_seconds": self.resolution,
+            "entities": self.scheduled,
+            "fired": self.fired,
+            "last_due": self.last_due,
+            "max_lag_seconds": round(self.max_lag_seconds, 3),
+        }
@@ -0,0 +1,372 @@
+# app/services/upstream.py
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.services.adaptive_limit import AdaptiveLimit
+from app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    AsyncCircuitOpenError,
+    RETRY_STATUSES,
+    backoff_delay,
+)
+from app.config import (
+    GATEWAY_API_URL,
+    DEVICE_API_URL,
+    GATEWAY_STATUS_API_URL,
+    DEVICE_STATUS_API_URL,
+    UPSTREAM_POOL_CONNECTIONS,
+    UPSTREAM_POOL_MAXSIZE,
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_READ_TIMEOUT,
+    UPSTREAM_ADAPTIVE_LIMIT,
+    UPSTREAM_LIMIT_INITIAL,
+    UPSTREAM_LIMIT_MIN,
+    UPSTREAM_LIMIT_MAX,
+    UPSTREAM_LATENCY_TOLERANCE,
+    UPSTREAM_LIMIT_ERROR_RATE,
+    UPSTREAM_RETRIES,
+    UPSTREAM_RETRY_BACKOFF,
+    UPSTREAM_RETRY_BACKOFF_MAX,
+    UPSTREAM_BREAKER_FAILURES,
+    UPSTREAM_BREAKER_RESET,
+)
+
+# Endpoints da plataforma FoT que recebem um pool próprio
+UPSTREAM_URLS = [
+    GATEWAY_API_URL,
+    DEVICE_API_URL,
+    GATEWAY_STATUS_API_URL,
+    DEVICE_STATUS_API_URL,
+]
+
+DEFAULT_TIMEOUT = (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+
+# Uma sessão keep-alive por endpoint: { url: Session }
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# Clientes assíncronos (httpx), também um por endpoint: { url: AsyncClient }
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+
+# Observadores de latência: fn(url, segundos, status_code ou None em erro de rede)
+LatencyObserver = Callable[[str, float, Optional[int]], None]
+_observers: List[LatencyObserver] = []
+
+
+def add_observer(observer: LatencyObserver) -> None:
+    _observers.append(observer)
+
+
+def remove_observer(observer: LatencyObserver) -> None:
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+# Limite adaptativo de requisições em voo por endpoint: { url: AdaptiveLimit }
+# (só escritas: os GETs de cadastro são poucos e o download em streaming seguraria a vaga)
+LIMITED_METHODS = {"POST", "PUT"}
+_limits: Dict[str, AdaptiveLimit] = {}
+
+
+def limit_for(method: str, url: str) -> Optional[AdaptiveLimit]:
+    """The endpoint's AdaptiveLimit for a write, created on first use (None if disabled or a read)."""
+    if not UPSTREAM_ADAPTIVE_LIMIT or method not in LIMITED_METHODS:
+        return None
+    limit = _limits.get(url)
+    if limit is None:
+        with _sessions_lock:
+            limit = _limits.setdefault(url, AdaptiveLimit(
+                url,
+                UPSTREAM_LIMIT_INITIAL,
+                min_limit=UPSTREAM_LIMIT_MIN,
+                max_limit=UPSTREAM_LIMIT_MAX,
+                tolerance=UPSTREAM_LATENCY_TOLERANCE,
+                error_rate=UPSTREAM_LIMIT_ERROR_RATE,
+            ))
+    return limit
+
+
+def limit_stats() -> Dict[str, Dict[str, object]]:
+    """Current adaptive limit and counters per endpoint."""
+    return {url: limit.stats() for url, limit in list(_limits.items())}
+
+
+# Circuit breaker por endpoint: { url: CircuitBreaker }; retries só para métodos idempotentes
+RETRY_METHODS = {"GET", "PUT"}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker_for(url: str) -> Optional[CircuitBreaker]:
+    """The endpoint's CircuitBreaker, created on first use (None if disabled)."""
+    if UPSTREAM_BREAKER_FAILURES <= 0:
+        return None
+    breaker = _breakers.get(url)
+    if breaker is None:
+        with _sessions_lock:
+            breaker = _breakers.setdefault(url, CircuitBreaker(url, UPSTREAM_BREAKER_FAILURES, UPSTREAM_BREAKER_RESET))
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, object]]:
+    """Circuit state, failures, fast-failed requests and retries per endpoint."""
+    return {url: breaker.stats() for url, breaker in list(_breakers.items())}
+
+
+def _verdict(breaker: Optional[CircuitBreaker], status_code: Optional[int]) -> None:
+    """Timeouts/network errors (None) and 5xx count as failures; anything else means the endpoint is up."""
+    if breaker is not None:
+        breaker.record(status_code is not None and status_code < 500)
+
+
+def _attempts(method: str) -> int:
+    return 1 + (UPSTREAM_RETRIES if method in RETRY_METHODS else 0)
+
+
+def _retry_delay(breaker: Optional[CircuitBreaker], attempt: int) -> float:
+    if breaker is not None:
+        breaker.retried()
+    return backoff_delay(attempt, UPSTREAM_RETRY_BACKOFF, UPSTREAM_RETRY_BACKOFF_MAX)
+
+
+def _notify(url: str, started: float, status_code: Optional[int], limit: Optional[AdaptiveLimit] = None) -> None:
+    elapsed = time.perf_counter() - started
+    if limit is not None:
+        limit.release(elapsed, status_code)
+    for observer in _observers:
+        observer(url, elapsed, status_code)
+
+
+def _new_session() -> requests.Session:
+    """Create a session whose connection pool is sized from app.config."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=UPSTREAM_POOL_CONNECTIONS,
+        pool_maxsize=UPSTREAM_POOL_MAXSIZE,
+        pool_block=False,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def open_sessions() -> None:
+    """Create the pooled sessions for every configured upstream endpoint."""
+    with _sessions_lock:
+        for url in UPSTREAM_URLS:
+            if url and url not in _sessions:
+                _sessions[url] = _new_session()
+    print(f"🔗 Upstream pools ready ({len(_sessions)} endpoint(s), maxsize={UPSTREAM_POOL_MAXSIZE}).")
+
+
+def close_sessions() -> None:
+    """Close every pooled session (called on application shutdown)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+    print("🔌 Upstream pools closed.")
+
+
+def session_for(url: str) -> requests.Session:
+    """
+    Return the pooled session for an endpoint.
+    Sessions are created lazily so the services also work outside the app lifespan.
+    """
+    session = _sessions.get(url)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(url)
+        if session is None:
+            session = _new_session()
+            _sessions[url] = session
+        return session
+
+
+def request(method: str, url: str, timeout: Optional[object] = None, **kwargs) -> requests.Response:
+    """
+    Issue a request through the endpoint pool, applying the configured default timeout.
+    Writes first wait for a slot of the endpoint's adaptive limit. While the endpoint's
+    circuit is open, raises CircuitOpenError at once; GET/PUT are retried on timeouts,
+    network errors, 5xx and 429 (UPSTREAM_RETRIES, exponential backoff with jitter).
+    """
+    breaker = breaker_for(url)
+    attempts = _attempts(method)
+    for attempt in range(1, attempts + 1):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {url}")
+        try:
+            response = _request_once(method, url, timeout, **kwargs)
+        except requests.RequestException:
+            _verdict(breaker, None)
+            if attempt == attempts:
+                raise
+        except BaseException:
+            if breaker is not None:
+                breaker.cancel()
+            raise
+        else:
+            _verdict(breaker, response.status_code)
+            if attempt == attempts or response.status_code not in RETRY_STATUSES:
+                return response
+            response.close()  # devolve a conexão ao pool antes da nova tentativa
+        time.sleep(_retry_delay(breaker, attempt))
+
+
+def _request_once(method: str, url: str, timeout: Optional[object] = None, **kwargs) -> requests.Response:
+    limit = limit_for(method, url)
+    if limit is None and not _observers:
+        return session_for(url).request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+
+    if limit is not None:
+        limit.acquire()
+    started = time.perf_counter()
+    try:
+        response = session_for(url).request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+    except requests.RequestException:
+        _notify(url, started, None, limit)
+        raise
+    except BaseException:
+        if limit is not None:
+            limit.release()
+        raise
+    _notify(url, started, response.status_code, limit)
+    return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+# ---------------------------
+#  Cliente assíncrono (httpx)
+# ---------------------------
+
+def async_client_for(url: str) -> httpx.AsyncClient:
+    """
+    Return the pooled AsyncClient for an endpoint, creating it on first use.
+    Must be called from the event loop that will use the client.
+    """
+    client = _async_clients.get(url)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_POOL_MAXSIZE,
+                max_keepalive_connections=UPSTREAM_POOL_MAXSIZE,
+            ),
+            timeout=httpx.Timeout(UPSTREAM_READ_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+        )
+        _async_clients[url] = client
+    return client
+
+
+async def close_async_clients() -> None:
+    """Close every AsyncClient (called on application shutdown)."""
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+async def arequest(method: str, url: str, **kwargs) -> httpx.Response:
+    """Async variant of request (raises AsyncCircuitOpenError while the circuit is open)."""
+    breaker = breaker_for(url)
+    attempts = _attempts(method)
+    for attempt in range(1, attempts + 1):
+        if breaker is not None and not breaker.allow():
+            raise AsyncCircuitOpenError(f"circuit open for {url}")
+        try:
+            response = await _arequest_once(method, url, **kwargs)
+        except httpx.HTTPError:
+            _verdict(breaker, None)
+            if attempt == attempts:
+                raise
+        except BaseException:
+            if breaker is not None:
+                breaker.cancel()
+            raise
+        else:
+            _verdict(breaker, response.status_code)
+            if attempt == attempts or response.status_code not in RETRY_STATUSES:
+                return response
+        await asyncio.sleep(_retry_delay(breaker, attempt))
+
+
+async def _arequest_once(method: str, url: str, **kwargs) -> httpx.Response:
+    limit = limit_for(method, url)
+    if limit is None and not _observers:
+        return await async_client_for(url).request(method, url, **kwargs)
+
+    if limit is not None:
+        await limit.aacquire()
+    started = time.perf_counter()
+    try:
+        response = await async_client_for(url).request(method, url, **kwargs)
+    except httpx.HTTPError:
+        _notify(url, started, None, limit)
+        raise
+    except BaseException:  # cancelamento: libera a vaga sem contar amostra
+        if limit is not None:
+            limit.release()
+        raise
+    _notify(url, started, response.status_code, limit)
+    return response
+
+
+async def aget(url: str, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> httpx.Response:
+    return await arequest("POST", url, **kwargs)
+
+
+async def aput(url: str, **kwargs) -> httpx.Response:
+    return await arequest("PUT", url, **kwargs)
+
+
+@asynccontextmanager
+async def astream(method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+    """
+    Streamed request: the body is read by the caller (aiter_bytes) while it downloads.
+    Goes through the endpoint's circuit breaker (judged on the headers), without retries.
+    """
+    breaker = breaker_for(url)
+    if breaker is not None and not breaker.allow():
+        raise AsyncCircuitOpenError(f"circuit open for {url}")
+    started = time.perf_counter()
+    notified = False
+    try:
+        async with async_client_for(url).stream(method, url, **kwargs) as response:
+            if _observers:
+                _notify(url, started, response.status_code)  # tempo até os cabeçalhos
+            _verdict(breaker, response.status_code)
+            notified = True
+            yield response
+    except httpx.HTTPError:
+        if not notified:
+            if _observers:
+                _notify(url, started, None)
+            _verdict(breaker, None)
+        raise
+    except BaseException:
+        if not notified and breaker is not None:
+            breaker.cancel()
+        raise
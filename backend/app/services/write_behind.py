@@ -0,0 +1,111 @@
+# app/services/write_behind.py
+
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+
+class WriteBehindQueue:
+    """
+    Keyed last-write-wins PUT queue.
+
+    `submit(key, payload)` stores the desired record for `key` and returns at once;
+    a newer payload for a key still waiting replaces it (counted as superseded), so
+    only the latest state is sent. `workers` threads drain the keys in FIFO order,
+    never with two PUTs for the same key in flight: a payload arriving while its key
+    is being sent waits for that PUT and goes out right after.
+    `on_done(key, payload, ok)` runs on the worker thread after each PUT.
+    """
+
+    def __init__(
+        self,
+        put: Callable[[Dict[str, Any]], bool],
+        workers: int,
+        on_done: Optional[Callable[[Hashable, Dict[str, Any], bool], None]] = None,
+        label: str = "put-queue",
+    ):
+        self._put = put
+        self._on_done = on_done
+        self.workers = max(1, workers)
+        self.label = label
+        self._cond = threading.Condition()
+        self._order: Deque[Hashable] = deque()
+        self._pending: Dict[Hashable, Dict[str, Any]] = {}
+        self._in_flight: set = set()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self.counters = {"submitted": 0, "superseded": 0, "sent": 0, "failed": 0}
+
+    def _start_locked(self) -> None:
+        if self._threads:
+            return
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._drain, name=f"{self.label}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, key: Hashable, payload: Dict[str, Any]) -> None:
+        with self._cond:
+            self._start_locked()
+            self.counters["submitted"] += 1
+            if key in self._pending:
+                self.counters["superseded"] += 1
+            elif key not in self._in_flight:
+                self._order.append(key)
+                self._cond.notify_all()
+            self._pending[key] = payload
+
+    def _drain(self) -> None:
+        while True:
+            with self._cond:
+                while not self._order and not self._stopping:
+                    self._cond.wait()
+                if not self._order:
+                    return
+                key = self._order.popleft()
+                payload = self._pending.pop(key)
+                self._in_flight.add(key)
+
+            ok = False
+            try:
+                try:
+                    ok = self._put(payload)
+                except Exception as e:  # um PUT ruim não derruba o worker
+                    print(f"❌ {self.label}: unexpected error sending {key}: {e!r}")
+                if self._on_done:
+                    try:
+                        self._on_done(key, payload, ok)
+                    except Exception as e:  # nem um callback ruim
+                        print(f"❌ {self.label}: unexpected error after sending {key}: {e!r}")
+            finally:
+                with self._cond:
+                    self._in_flight.discard(key)
+                    self.counters["sent" if ok else "failed"] += 1
+                    if key in self._pending:
+                        self._order.append(key)  # chegou estado novo durante o envio
+                    self._cond.notify_all()
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted payload has been sent (or failed)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._in_flight, timeout)
+
+    def shutdown(self) -> None:
+        """Send what is queued, then stop the workers (they restart on the next submit)."""
+        with self._cond:
+            self._stopping = True
+            threads, self._threads = self._threads, []
+            self._cond.notify_all()
+        for t in threads:
+            t.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {**self.counters, "depth": len(self._pending), "in_flight": len(self._in_flight)}
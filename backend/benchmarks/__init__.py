@@ -0,0 +1 @@
+# benchmarks: throughput/latency/memory measurements of the simulator hot paths
@@ -0,0 +1,59 @@
+# benchmarks/__main__.py
+#
+# Uso (a partir de backend/):
+#   python -m benchmarks                                   # todos os casos, N = 1k/10k/100k
+#   python -m benchmarks --cases generate_status,gateway_status_tick_async --sizes 1000,10000
+#   python -m benchmarks --latency-ms 5 --json bench.json
+
+import argparse
+import json
+
+from benchmarks.cases import CASES
+from benchmarks.harness import run_case
+
+COLUMNS = [
+    ("case", 32), ("size", 8), ("events_per_sec", 16), ("seconds", 10),
+    ("requests", 9), ("p50_ms", 9), ("p99_ms", 9), ("peak_rss_mb", 12),
+]
+
+
+def _print_row(result: dict) -> None:
+    if "error" in result:
+        print(f"{result['case']:<32}{result['size']:<8}❌ {result['error']}")
+        return
+    print("".join(f"{str(result.get(col)) if result.get(col) is not None else '-':<{width}}" for col, width in COLUMNS))
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(description="Simulator benchmarks against the in-process mock upstream")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated case names")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated entity counts")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mock upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Mock upstream jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock upstream error rate")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}. Available: {', '.join(CASES)}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    mock_settings = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate}
+
+    print("".join(f"{col:<{width}}" for col, width in COLUMNS))
+    results = []
+    for name in names:
+        for size in sizes:
+            result = run_case(name, size, mock_settings)
+            _print_row(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mock": mock_settings, "results": results}, f, indent=2)
+        print(f"\n📝 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,423 @@
+# benchmarks/cases.py
+#
+# Cada caso recebe o tamanho N, faz o preparo (fora da medição) e devolve uma função
+# que executa o trecho medido e retorna quantos eventos processou.
+# Os módulos do app são importados dentro dos casos: as URLs do mock precisam estar
+# no ambiente antes de app.config ser carregado.
+
+import asyncio
+import random
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+CENTER_LAT, CENTER_LON, RADIUS_KM = -13.005, -38.516, 5.0
+
+Run = Callable[[], int]
+
+
+def _load(**entities: list) -> None:
+    """Grava entidades direto no mock (POST /_mock/load), sem latência nem erros injetados."""
+    import os
+    import requests
+
+    base_url = os.environ["MOCK_BASE_URL"]
+    requests.post(f"{base_url}/_mock/load", json=entities, timeout=600).raise_for_status()
+
+
+def _seed_gateways(total: int) -> list:
+    from app.services.gateway_service import generate_gateway_batch
+
+    batch = list(generate_gateway_batch(total, CENTER_LAT, CENTER_LON, RADIUS_KM))
+    _load(gateways=batch)
+    return batch
+
+
+def _seed_devices(total: int) -> list:
+    from app.services.device_service import generate_device_batch
+
+    gateways = _seed_gateways(max(1, total // 10))
+    batch = list(generate_device_batch(total, gateways, 1.0))
+    _load(devices=batch)
+    return batch
+
+
+# ---------------------------
+#  Geração (sem rede)
+# ---------------------------
+
+def generate_gateway(size: int) -> Run:
+    from app.services.gateway_service import generate_gateway
+
+    def run() -> int:
+        for _ in range(size):
+            generate_gateway(CENTER_LAT, CENTER_LON, RADIUS_KM)
+        return size
+    return run
+
+
+def generate_gateway_batch(size: int) -> Run:
+    from app.services.gateway_service import generate_gateway_batch
+
+    def run() -> int:
+        return sum(1 for _ in generate_gateway_batch(size, CENTER_LAT, CENTER_LON, RADIUS_KM))
+    return run
+
+
+def generate_device(size: int) -> Run:
+    from app.services.gateway_service import generate_gateway
+    from app.services.device_service import generate_device
+
+    gateways = [generate_gateway(CENTER_LAT, CENTER_LON, RADIUS_KM) for _ in range(100)]
+
+    def run() -> int:
+        for _ in range(size):
+            generate_device(random.choice(gateways), 1.0)
+        return size
+    return run
+
+
+def generate_device_batch(size: int) -> Run:
+    from app.services.gateway_service import generate_gateway
+    from app.services.device_service import generate_device_batch
+
+    gateways = [generate_gateway(CENTER_LAT, CENTER_LON, RADIUS_KM) for _ in range(100)]
+
+    def run() -> int:
+        return sum(1 for _ in generate_device_batch(size, gateways, 1.0))
+    return run
+
+
+def _initial_states(macs: list) -> Dict[str, Dict[str, float]]:
+    return {
+        mac: {
+            "baterryLevel": round(random.uniform(0.7, 1.0), 2),
+            "usedMemory": round(random.uniform(0.2, 0.5), 2),
+            "usedProcessor": round(random.uniform(0.2, 0.5), 2)
+        }
+        for mac in macs
+    }
+
+
+def _generate_status(gateway_mac: str, timestamp: datetime, state: Dict[str, float]) -> Dict[str, Any]:
+    """Linha de base: o gerador de status por gateway (um dict por vez) que GatewayMetricState substituiu."""
+    from app.services.payload_template import date_dict
+
+    active = bool(random.getrandbits(1))  # True/False com 50% de probabilidade
+
+    battery = max(0.0, round(state["baterryLevel"] - random.uniform(0.001, 0.005), 2))
+    memory = min(1.0, max(0.0, round(state["usedMemory"] + random.uniform(-0.05, 0.05), 2)))
+    cpu = min(1.0, max(0.0, round(state["usedProcessor"] + random.uniform(-0.05, 0.05), 2)))
+
+    return {
+        "date": date_dict(timestamp),
+        "gateway": {
+            "mac": gateway_mac,
+            "status": active
+        },
+        "baterryLevel": battery,
+        "usedMemory": memory,
+        "usedProcessor": cpu
+    }
+
+
+def generate_status(size: int) -> Run:
+    macs = [f"bench-{i}" for i in range(size)]
+    states = _initial_states(macs)
+
+    def run() -> int:
+        now = datetime.now()
+        for mac in macs:
+            _generate_status(mac, now, states[mac])
+        return size
+    return run
+
+
+def generate_status_batch(size: int) -> Run:
+    from app.services.gateway_metrics import GatewayMetricState
+    from app.services.payload_template import date_dict
+
+    metrics = GatewayMetricState([f"bench-{i}" for i in range(size)])
+
+    def run() -> int:
+        metrics.step()
+        return sum(1 for _ in metrics.iter_statuses(date_dict(datetime.now())))
+    return run
+
+
+def encode_status(size: int) -> Run:
+    import json
+
+    macs = [f"bench-{i}" for i in range(size)]
+    states = _initial_states(macs)
+
+    def run() -> int:
+        now = datetime.now()
+        for mac in macs:
+            json.dumps(_generate_status(mac, now, states[mac])).encode()  # o que requests faz com json=
+        return size
+    return run
+
+
+def encode_status_template(size: int) -> Run:
+    from app.services.gateway_metrics import GatewayMetricState
+    from app.services.payload_template import date_fragment
+
+    metrics = GatewayMetricState([f"bench-{i}" for i in range(size)])
+
+    def run() -> int:
+        metrics.step()
+        return sum(1 for _ in metrics.iter_bodies(date_fragment(datetime.now())))
+    return run
+
+
+def encode_device_status(size: int) -> Run:
+    import json
+    from app.services.status_device_service import generate_device_status
+
+    ids = [f"bench-{i}" for i in range(size)]
+
+    def run() -> int:
+        now = datetime.now()
+        for device_id in ids:
+            json.dumps(generate_device_status(device_id, now)).encode()
+        return size
+    return run
+
+
+def encode_device_status_template(size: int) -> Run:
+    from app.services.payload_template import date_fragment
+    from app.services.status_device_service import device_status_body
+
+    ids = [f"bench-{i}" for i in range(size)]
+    for device_id in ids:
+        device_status_body(device_id, b"{}")  # fragmentos por device: codificados uma vez
+
+    def run() -> int:
+        date = date_fragment(datetime.now())
+        for device_id in ids:
+            device_status_body(device_id, date)
+        return size
+    return run
+
+
+def device_power_step(size: int) -> Run:
+    from app.services.device_power import DevicePowerState, power_steps
+
+    devices = [
+        {"id": f"bench-{i}", "status": True, "category": "sensor" if i % 2 else "actuator"} for i in range(size)
+    ]
+    state = DevicePowerState()
+
+    def run() -> int:
+        return sum(1 for _ in power_steps(devices, 0.12, 0.25, state))
+    return run
+
+
+def _parsed_devices(size: int) -> list:
+    """Devices como chegam de um GET (dicts recém-decodificados)."""
+    import json
+    from app.services.gateway_service import generate_gateway
+    from app.services.device_service import generate_device_batch
+
+    gateways = [generate_gateway(CENTER_LAT, CENTER_LON, RADIUS_KM) for _ in range(100)]
+    return json.loads(json.dumps(list(generate_device_batch(size, gateways, 1.0))))
+
+
+def put_payload_copy(size: int) -> Run:
+    import copy
+    import json
+    from app.services.payload_template import date_dict
+
+    devices = _parsed_devices(size)
+
+    def run() -> int:
+        now = datetime.now()
+        for device in devices:
+            payload = copy.deepcopy(device)
+            payload["status"] = not device.get("status", True)
+            payload["date"] = date_dict(now)
+            json.dumps(payload).encode()  # o que requests faz com json=
+        return size
+    return run
+
+
+def put_payload_template(size: int) -> Run:
+    """Cache quente: templates já construídos (PUTs seguintes de um registro já buscado)."""
+    from app.services.payload_template import PatchedRecord, TemplateCache
+
+    devices = _parsed_devices(size)
+    templates = TemplateCache("id")
+    for device in devices:
+        templates.template_for(device)  # 1 serialização por registro buscado
+
+    def run() -> int:
+        now = datetime.now()
+        for i, device in enumerate(devices):
+            payload = PatchedRecord(device, not device.get("status", True), now, templates)
+            payload.body()
+            devices[i] = payload.merged()  # write-back do PUT bem-sucedido (registry_cache)
+        return size
+    return run
+
+
+def put_payload_template_cold(size: int) -> Run:
+    """Cache frio: 1º PUT de cada registro após um GET, pagando a construção do template."""
+    from app.services.payload_template import PatchedRecord, TemplateCache
+
+    devices = _parsed_devices(size)
+
+    def run() -> int:
+        now = datetime.now()
+        templates = TemplateCache("id")  # como depois de um novo fetch do cadastro
+        for i, device in enumerate(devices):
+            payload = PatchedRecord(device, not device.get("status", True), now, templates)
+            payload.body()
+            devices[i] = payload.merged()
+        return size
+    return run
+
+
+def generate_device_status(size: int) -> Run:
+    from app.services.status_device_service import generate_device_status
+
+    ids = [f"bench-{i}" for i in range(size)]
+
+    def run() -> int:
+        now = datetime.now()
+        for device_id in ids:
+            generate_device_status(device_id, now)
+        return size
+    return run
+
+
+# ---------------------------
+#  Fluxos completos (contra o mock)
+# ---------------------------
+
+def create_gateways(size: int) -> Run:
+    from app.services.gateway_service import generate_simulated_gateways
+
+    def run() -> int:
+        return generate_simulated_gateways(size, CENTER_LAT, CENTER_LON, RADIUS_KM)["success_count"]
+    return run
+
+
+def create_devices(size: int) -> Run:
+    from app.services.device_service import generate_simulated_devices
+
+    _seed_gateways(max(1, size // 10))
+
+    def run() -> int:
+        return generate_simulated_devices(size, 1.0)["success_count"]
+    return run
+
+
+def gateway_status_tick(size: int) -> Run:
+    from app.services.gateway_service import get_macs
+    from app.services.gateway_metrics import GatewayMetricState
+    from app.services.gateway_status_service import (
+        run_gateway_status_tick, _fetch_gateways_by_mac, cascade_executor, gateway_put_queue,
+    )
+
+    _seed_gateways(size)
+    macs = get_macs()
+    metrics = GatewayMetricState(macs)
+    gateways_by_mac = _fetch_gateways_by_mac()
+
+    def run() -> int:
+        run_gateway_status_tick(metrics, gateways_by_mac, datetime.now())
+        gateway_put_queue.wait_idle()  # PUTs e cascatas fazem parte do custo do tick
+        cascade_executor.wait_idle()
+        return len(macs)
+    return run
+
+
+def gateway_status_tick_async(size: int) -> Run:
+    from app.services import upstream
+    from app.services.gateway_service import get_macs
+    from app.services.gateway_metrics import GatewayMetricState
+    from app.services.gateway_status_service import (
+        _fetch_gateways_by_mac, cascade_executor, gateway_put_queue,
+    )
+    from app.services.gateway_status_async_service import run_gateway_status_tick_async, DEFAULT_CONCURRENCY
+
+    _seed_gateways(size)
+    macs = get_macs()
+    metrics = GatewayMetricState(macs)
+    gateways_by_mac = _fetch_gateways_by_mac()
+
+    async def tick() -> None:
+        try:
+            sem = asyncio.Semaphore(DEFAULT_CONCURRENCY)
+            await run_gateway_status_tick_async(
+                metrics, gateways_by_mac, datetime.now(), sem, DEFAULT_CONCURRENCY
+            )
+        finally:
+            await upstream.close_async_clients()
+
+    def run() -> int:
+        asyncio.run(tick())
+        gateway_put_queue.wait_idle()
+        cascade_executor.wait_idle()
+        return len(macs)
+    return run
+
+
+def device_status_tick(size: int) -> Run:
+    from app.services.status_device_service import get_devices, run_device_status_tick, device_put_queue
+
+    _seed_devices(size)
+    devices = get_devices()
+
+    def run() -> int:
+        run_device_status_tick(devices, datetime.now())
+        device_put_queue.wait_idle()
+        return len(devices)
+    return run
+
+
+def device_status_tick_async(size: int) -> Run:
+    from app.services import upstream
+    from app.services.status_device_service import get_devices, device_put_queue
+    from app.services.status_device_async_service import run_device_status_tick_async, DEFAULT_CONCURRENCY
+
+    _seed_devices(size)
+    devices = get_devices()
+
+    async def tick() -> None:
+        try:
+            sem = asyncio.Semaphore(DEFAULT_CONCURRENCY)
+            await run_device_status_tick_async(devices, datetime.now(), sem, DEFAULT_CONCURRENCY)
+        finally:
+            await upstream.close_async_clients()
+
+    def run() -> int:
+        asyncio.run(tick())
+        device_put_queue.wait_idle()  # PUTs de energia fazem parte do custo do tick
+        return len(devices)
+    return run
+
+
+CASES: Dict[str, Callable[[int], Run]] = {
+    "generate_gateway": generate_gateway,
+    "generate_gateway_batch": generate_gateway_batch,
+    "generate_device": generate_device,
+    "generate_device_batch": generate_device_batch,
+    "generate_status": generate_status,
+    "generate_status_batch": generate_status_batch,
+    "generate_device_status": generate_device_status,
+    "encode_status": encode_status,
+    "encode_status_template": encode_status_template,
+    "encode_device_status": encode_device_status,
+    "encode_device_status_template": encode_device_status_template,
+    "device_power_step": device_power_step,
+    "put_payload_copy": put_payload_copy,
+    "put_payload_template": put_payload_template,
+    "put_payload_template_cold": put_payload_template_cold,
+    "create_gateways": create_gateways,
+    "create_devices": create_devices,
+    "gateway_status_tick": gateway_status_tick,
+    "gateway_status_tick_async": gateway_status_tick_async,
+    "device_status_tick": device_status_tick,
+    "device_status_tick_async": device_status_tick_async,
+}
@@ -0,0 +1,71 @@
+# benchmarks/harness.py
+
+import contextlib
+import multiprocessing
+import os
+import resource
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _latency_summary(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"requests": 0, "p50_ms": None, "p99_ms": None}
+    p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+    return {"requests": len(latencies), "p50_ms": round(float(p50), 3), "p99_ms": round(float(p99), 3)}
+
+
+def _child(name: str, size: int, mock_settings: Dict[str, float], results: "multiprocessing.Queue") -> None:
+    """Roda um caso num processo novo: pico de RSS e estado do mock não vazam entre casos."""
+    from mock_upstream.server import start_mock_process
+
+    # O mock roda em outro processo: não disputa o GIL com o simulador nem entra no RSS medido
+    server = start_mock_process(port=_free_port(), **mock_settings)
+    os.environ.update(server.env())
+    os.environ["MOCK_BASE_URL"] = server.base_url
+
+    from app.services import upstream
+    from benchmarks.cases import CASES
+
+    latencies: List[float] = []
+    try:
+        # Os serviços imprimem uma linha por envio; descartamos para não medir o terminal
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            run = CASES[name](size)
+            upstream.add_observer(lambda url, seconds, status: latencies.append(seconds))
+            started = time.perf_counter()
+            events = run()
+            elapsed = time.perf_counter() - started
+        results.put({
+            "case": name,
+            "size": size,
+            "events": events,
+            "seconds": round(elapsed, 4),
+            "events_per_sec": round(events / elapsed, 1) if elapsed > 0 else None,
+            **_latency_summary(latencies),
+            # ru_maxrss é em KiB no Linux (só o processo do simulador)
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        })
+    except Exception as e:
+        results.put({"case": name, "size": size, "error": repr(e)})
+    finally:
+        server.stop()
+
+
+def run_case(name: str, size: int, mock_settings: Dict[str, float]) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_child, args=(name, size, mock_settings, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
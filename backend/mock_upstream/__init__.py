@@ -0,0 +1 @@
+# mock_upstream: in-memory stand-in for the FoT/CXF APIs used by the simulator
@@ -0,0 +1,42 @@
+# mock_upstream/__main__.py
+#
+# Uso (a partir de backend/):
+#   python -m mock_upstream --port 8181 --latency-ms 20 --jitter-ms 5 --error-rate 0.01 --capacity 8
+
+import argparse
+
+import uvicorn
+
+from mock_upstream import main
+from mock_upstream.server import upstream_env
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(description="Local mock of the FoT upstream APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8181)
+    parser.add_argument("--latency-ms", type=float, default=main.settings["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=main.settings["jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=main.settings["error_rate"])
+    parser.add_argument(
+        "--capacity", type=float, default=main.settings["capacity"], help="Requests served at once (0 = unlimited)"
+    )
+    parser.add_argument(
+        "--no-bulk-history", action="store_true", help="Answer 400 to array bodies on the status history endpoints"
+    )
+    args = parser.parse_args()
+
+    main.settings.update(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, capacity=args.capacity
+    )
+    if args.no_bulk_history:
+        main.settings["bulk_history"] = 0
+
+    print("🧪 Mock FoT upstream. Point the simulator at it with:")
+    for name, url in upstream_env(f"http://{args.host}:{args.port}").items():
+        print(f"   {name}={url}")
+    uvicorn.run(main.app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    run()
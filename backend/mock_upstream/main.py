@@ -0,0 +1,215 @@
+# mock_upstream/main.py
+
+import asyncio
+import json
+import os
+import random
+from collections import deque
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+# Caminhos iguais aos da implantação FoT/CXF (ver backend/README.md)
+GATEWAY_PATH = "/cxf/m2fot/fot-gateway"
+DEVICE_PATH = "/cxf/m2fot-device/fot-device"
+GATEWAY_STATUS_PATH = "/cxf/m2fot-status/fot-gateway-status/"
+DEVICE_STATUS_PATH = "/cxf/m2fot-device-status/fot-device-status/"
+
+# Comportamento simulado da rede/servidor (ajustável em POST /_mock/config)
+settings: Dict[str, float] = {
+    "latency_ms": float(os.getenv("MOCK_LATENCY_MS", "0")),
+    "jitter_ms": float(os.getenv("MOCK_JITTER_MS", "0")),
+    "error_rate": float(os.getenv("MOCK_ERROR_RATE", "0")),
+    # POST de histórico aceita um array de registros (lote); 0 responde 400 a arrays
+    "bulk_history": float(os.getenv("MOCK_BULK_HISTORY", "1")),
+    # Requisições atendidas ao mesmo tempo (0 = sem limite): as demais esperam na fila,
+    # como num servidor com N workers — a vazão máxima fica em capacity / latência
+    "capacity": float(os.getenv("MOCK_CAPACITY", "0")),
+}
+
+# Vagas de atendimento (recriadas quando "capacity" muda)
+_workers: Dict[str, Any] = {"capacity": 0, "slots": None}
+
+# Armazenamento em memória
+gateways: Dict[str, Dict[str, Any]] = {}
+devices: Dict[str, Dict[str, Any]] = {}
+STATUS_HISTORY_LIMIT = int(os.getenv("MOCK_STATUS_HISTORY", "100000"))
+gateway_statuses: deque = deque(maxlen=STATUS_HISTORY_LIMIT)
+device_statuses: deque = deque(maxlen=STATUS_HISTORY_LIMIT)
+
+# Versão de cada cadastro (ETag do GET); muda a cada escrita
+versions: Dict[str, int] = {}
+
+# Contadores por "MÉTODO caminho" e de erros injetados
+stats: Dict[str, int] = {}
+
+app = FastAPI(
+    title="Mock FoT Upstream",
+    description="In-memory stand-in for the gateway, device and status APIs, with configurable latency and errors",
+    version="1.0.0",
+)
+
+
+def _json(data: Any, status_code: int = 200, headers: Dict[str, str] | None = None) -> Response:
+    # json.dumps direto: evita o jsonable_encoder em listas com centenas de milhares de itens
+    return Response(content=json.dumps(data), status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _bump(path: str) -> None:
+    versions[path] = versions.get(path, 0) + 1
+
+
+def _slots() -> asyncio.Semaphore | None:
+    capacity = int(settings["capacity"])
+    if capacity != _workers["capacity"]:
+        _workers.update(capacity=capacity, slots=asyncio.Semaphore(capacity) if capacity > 0 else None)
+    return _workers["slots"]
+
+
+async def _simulate(request: Request) -> Response | None:
+    """Aplica latência/jitter (na fila de `capacity` vagas) e, com probabilidade error_rate, devolve um 500."""
+    key = f"{request.method} {request.url.path}"
+    stats[key] = stats.get(key, 0) + 1
+
+    delay = settings["latency_ms"] + random.uniform(-settings["jitter_ms"], settings["jitter_ms"])
+    slots = _slots()
+    if slots is not None:
+        async with slots:
+            await asyncio.sleep(max(delay, 0) / 1000)
+    elif delay > 0:
+        await asyncio.sleep(delay / 1000)
+
+    if settings["error_rate"] > 0 and random.random() < settings["error_rate"]:
+        stats["injected_errors"] = stats.get("injected_errors", 0) + 1
+        return _json({"message": "injected failure"}, status_code=500)
+    return None
+
+
+def _register(path: str, store: Dict[str, Dict[str, Any]], key: str) -> None:
+    """
+    GET lista (com ETag; If-None-Match igual devolve 304), POST cria e PUT atualiza
+    (registro completo) um cadastro indexado por `key`.
+    """
+
+    @app.get(path)
+    async def list_entities(request: Request):
+        failure = await _simulate(request)
+        if failure:
+            return failure
+        etag = f'"{versions.get(path, 0)}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return _json(list(store.values()), headers={"ETag": etag})
+
+    @app.post(path)
+    async def create_entity(request: Request):
+        failure = await _simulate(request)
+        if failure:
+            return failure
+        body = await request.json()
+        if not body.get(key):
+            return _json({"message": f"missing '{key}'"}, status_code=400)
+        if body[key] in store:
+            return _json({"message": f"{key} {body[key]} already exists"}, status_code=409)
+        store[body[key]] = body
+        _bump(path)
+        return _json(body)
+
+    @app.put(path)
+    async def update_entity(request: Request):
+        failure = await _simulate(request)
+        if failure:
+            return failure
+        body = await request.json()
+        current = store.get(body.get(key))
+        if current is None:
+            return _json({"message": f"{key} {body.get(key)} not found"}, status_code=404)
+        current.update(body)
+        _bump(path)
+        return _json(current)
+
+
+def _register_history(path: str, history: deque) -> None:
+    """GET lista e POST acrescenta registros de histórico de status (um objeto ou um array)."""
+
+    @app.get(path)
+    async def list_history(request: Request):
+        return await _simulate(request) or _json(list(history))
+
+    @app.post(path)
+    async def append_history(request: Request):
+        failure = await _simulate(request)
+        if failure:
+            return failure
+        body = await request.json()
+        if isinstance(body, list):
+            if not settings["bulk_history"]:
+                return _json({"message": "array body not supported"}, status_code=400)
+            history.extend(body)
+        else:
+            history.append(body)
+        return Response(status_code=204)
+
+
+_register(GATEWAY_PATH, gateways, "mac")
+_register(DEVICE_PATH, devices, "id")
+_register_history(GATEWAY_STATUS_PATH, gateway_statuses)
+_register_history(DEVICE_STATUS_PATH, device_statuses)
+
+
+@app.get("/_mock/config")
+def get_config():
+    return settings
+
+
+@app.post("/_mock/config")
+def update_config(
+    latency_ms: float | None = None,
+    jitter_ms: float | None = None,
+    error_rate: float | None = None,
+    bulk_history: float | None = None,
+    capacity: float | None = None,
+):
+    """Change latency, jitter, error rate, bulk history support and capacity at runtime."""
+    for name, value in (
+        ("latency_ms", latency_ms), ("jitter_ms", jitter_ms), ("error_rate", error_rate),
+        ("bulk_history", bulk_history), ("capacity", capacity),
+    ):
+        if value is not None:
+            settings[name] = value
+    return settings
+
+
+@app.get("/_mock/stats")
+def get_stats():
+    return {
+        "requests": stats,
+        "gateways": len(gateways),
+        "devices": len(devices),
+        "gateway_statuses": len(gateway_statuses),
+        "device_statuses": len(device_statuses),
+    }
+
+
+@app.post("/_mock/load")
+async def load(request: Request):
+    """Bulk-load gateways/devices ({"gateways": [...], "devices": [...]}) without latency or errors."""
+    body = await request.json()
+    for gw in body.get("gateways", []):
+        gateways[gw["mac"]] = gw
+    for device in body.get("devices", []):
+        devices[device["id"]] = device
+    _bump(GATEWAY_PATH)
+    _bump(DEVICE_PATH)
+    return {"gateways": len(gateways), "devices": len(devices)}
+
+
+@app.post("/_mock/reset")
+def reset():
+    """Drop every stored entity, status and counter."""
+    for store in (gateways, devices, gateway_statuses, device_statuses, stats):
+        store.clear()
+    _bump(GATEWAY_PATH)
+    _bump(DEVICE_PATH)
+    return {"message": "mock upstream reset"}
@@ -0,0 +1,106 @@
+# mock_upstream/server.py
+
+import multiprocessing
+import socket
+import threading
+import time
+from typing import Dict
+
+import uvicorn
+
+from mock_upstream import main
+
+
+class MockServer:
+    """Mock upstream running in a background thread of the current process."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8181):
+        self.host = host
+        self.port = port
+        config = uvicorn.Config(main.app, host=host, port=port, log_level="warning", access_log=False)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def env(self) -> Dict[str, str]:
+        """The four upstream URLs (as read by app.config) pointing at this server."""
+        return upstream_env(self.base_url)
+
+    def start(self, timeout: float = 10.0) -> "MockServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"mock upstream failed to start on {self.base_url}")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+
+def upstream_env(base_url: str) -> Dict[str, str]:
+    return {
+        "GATEWAY_API_URL": base_url + main.GATEWAY_PATH,
+        "DEVICE_API_URL": base_url + main.DEVICE_PATH,
+        "GATEWAY_STATUS_API_URL": base_url + main.GATEWAY_STATUS_PATH,
+        "DEVICE_STATUS_API_URL": base_url + main.DEVICE_STATUS_PATH,
+    }
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 8181, **overrides: float) -> MockServer:
+    """
+    Start the mock in-process. `overrides` (latency_ms, jitter_ms, error_rate, bulk_history,
+    capacity) replace the values read from the MOCK_* environment variables.
+    """
+    main.settings.update(overrides)
+    return MockServer(host, port).start()
+
+
+def _serve(host: str, port: int, overrides: Dict[str, float]) -> None:
+    main.settings.update(overrides)
+    uvicorn.run(main.app, host=host, port=port, log_level="warning", access_log=False)
+
+
+class MockProcess:
+    """
+    Mock upstream in a separate process. Preferable for load measurements: the mock
+    does not compete with the simulator for the GIL nor add to its RSS.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8181, **overrides: float):
+        self.host = host
+        self.port = port
+        ctx = multiprocessing.get_context("spawn")
+        self._process = ctx.Process(target=_serve, args=(host, port, overrides), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def env(self) -> Dict[str, str]:
+        return upstream_env(self.base_url)
+
+    def start(self, timeout: float = 15.0) -> "MockProcess":
+        self._process.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with socket.create_connection((self.host, self.port), timeout=0.2):
+                    return self
+            except OSError:
+                if not self._process.is_alive() or time.monotonic() > deadline:
+                    raise RuntimeError(f"mock upstream process failed to start on {self.base_url}")
+                time.sleep(0.05)
+
+    def stop(self) -> None:
+        self._process.terminate()
+        self._process.join()
+
+
+def start_mock_process(host: str = "127.0.0.1", port: int = 8181, **overrides: float) -> MockProcess:
+    return MockProcess(host, port, **overrides).start()
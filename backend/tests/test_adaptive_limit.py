@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from typing import Callable, Optional
+
+from app.services.adaptive_limit import AdaptiveLimit
+
+
+def _run(limit: AdaptiveLimit, requests: int, latency: Callable[[int], float], status: Callable[[int], Optional[int]] = lambda i: 200):
+    """`requests` coroutines competing for slots; returns the max seen in flight at once."""
+    seen = {"in_flight": 0, "max": 0}
+
+    async def one(i):
+        await limit.aacquire()
+        seen["in_flight"] += 1
+        seen["max"] = max(seen["max"], seen["in_flight"])
+        await asyncio.sleep(0)
+        seen["in_flight"] -= 1
+        limit.release(latency(i), status(i))
+
+    async def main():
+        await asyncio.gather(*(one(i) for i in range(requests)))
+
+    asyncio.run(main())
+    return seen["max"]
+
+
+def test_slow_start_doubles_up_to_the_max_under_healthy_load():
+    limit = AdaptiveLimit("t", initial=2, max_limit=64)
+    _run(limit, 2000, lambda i: 0.010)
+    stats = limit.stats()
+    assert stats["limit"] == 64
+    assert stats["decreases"] == 0 and stats["slow_start"]
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_no_growth_without_saturation():
+    limit = AdaptiveLimit("t", initial=8)
+    for _ in range(100):  # uma requisição por vez: o limite nunca foi usado
+        limit.acquire()
+        limit.release(0.01, 200)
+    assert limit.stats()["limit"] == 8
+
+
+def test_server_errors_shrink_the_limit_to_the_min():
+    limit = AdaptiveLimit("t", initial=32, min_limit=2)
+    _run(limit, 2000, lambda i: 0.010, lambda i: 503)
+    stats = limit.stats()
+    assert stats["limit"] == 2 and not stats["slow_start"]
+    assert stats["overloaded"] == 2000
+
+
+def test_a_timeout_halves_the_limit_at_once():
+    limit = AdaptiveLimit("t", initial=8)
+    limit.acquire()
+    limit.release(10.0, None)
+    assert limit.stats()["limit"] == 4
+    assert limit.stats()["timeouts"] == 1
+
+
+def test_latency_above_tolerance_decreases():
+    limit = AdaptiveLimit("t", initial=8, max_limit=8, tolerance=2.0)
+    _run(limit, 200, lambda i: 0.010)
+    assert limit.stats()["decreases"] == 0
+    _run(limit, 200, lambda i: 0.050)
+    stats = limit.stats()
+    assert stats["decreases"] >= 1 and stats["limit"] < 8
+
+
+def test_never_more_in_flight_than_a_fixed_limit():
+    limit = AdaptiveLimit("t", initial=4, min_limit=4, max_limit=4)
+    assert _run(limit, 500, lambda i: 0.010) == 4
+
+
+def test_threads_block_until_a_slot_is_released():
+    limit = AdaptiveLimit("t", initial=1, min_limit=1, max_limit=1)
+    limit.acquire()
+    got = threading.Event()
+    waiter = threading.Thread(target=lambda: (limit.acquire(), got.set()))
+    waiter.start()
+    assert not got.wait(0.1)
+    limit.release()
+    assert got.wait(5)
+    waiter.join()
+    limit.release()
+    assert limit.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limit = AdaptiveLimit("t", initial=1, min_limit=1, max_limit=1)
+
+    async def main():
+        await limit.aacquire()
+        waiter = asyncio.ensure_future(limit.aacquire())
+        await asyncio.sleep(0)
+        limit.release()  # a vaga vai para o waiter...
+        waiter.cancel()  # ...que é cancelado antes de rodar
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        await asyncio.wait_for(limit.aacquire(), 1)
+        limit.release()
+
+    asyncio.run(main())
+    assert limit.stats()["in_flight"] == 0
@@ -0,0 +1,75 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.address_allocator import AddressAllocator
+
+
+def test_allocations_are_unique_across_calls():
+    allocator = AddressAllocator(10_007, rng=np.random.default_rng(1))
+    codes = np.concatenate([allocator.allocate(n) for n in (1, 500, 3000, 6506)])
+    assert len(codes) == 10_007
+    assert len(np.unique(codes)) == len(codes)
+    assert codes.min() >= 0 and codes.max() < 10_007
+
+
+def test_power_of_two_space_covers_every_code():
+    allocator = AddressAllocator(32 ** 3, rng=np.random.default_rng(2))
+    codes = allocator.allocate(32 ** 3)
+    assert sorted(codes.tolist()) == list(range(32 ** 3))
+
+
+def test_reserved_codes_are_skipped():
+    allocator = AddressAllocator(1000, rng=np.random.default_rng(3))
+    reserved = set(range(0, 1000, 7))
+    assert allocator.reserve(reserved) == len(reserved)
+    codes = allocator.allocate(allocator.remaining).tolist()
+    assert len(codes) == 1000 - len(reserved)
+    assert not reserved & set(codes)
+    assert len(set(codes)) == len(codes)
+
+
+def test_contains_reports_allocated_and_reserved():
+    allocator = AddressAllocator(1000, rng=np.random.default_rng(4))
+    allocator.reserve([5])
+    codes = allocator.allocate(10).tolist()
+    assert all(code in allocator for code in codes)
+    assert 5 in allocator
+    assert sum(code in allocator for code in range(1000)) == 11
+
+
+def test_reserving_an_allocated_code_is_a_no_op():
+    allocator = AddressAllocator(1000, rng=np.random.default_rng(5))
+    code = int(allocator.allocate(1)[0])
+    assert allocator.reserve([code]) == 0
+
+
+def test_exhaustion_raises():
+    allocator = AddressAllocator(10, rng=np.random.default_rng(6))
+    allocator.allocate(8)
+    with pytest.raises(RuntimeError):
+        allocator.allocate(3)
+
+
+def test_concurrent_allocations_never_repeat_a_code():
+    allocator = AddressAllocator(32 ** 4, rng=np.random.default_rng(7))
+    allocator.reserve(range(0, 32 ** 4, 11))
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        for _ in range(50):
+            results.append(allocator.allocate(100))
+            allocator.reserve(range(5, 32 ** 4, 997))  # reserve concorrente com allocate
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    codes = np.concatenate(results)
+    assert len(codes) == 8 * 50 * 100
+    assert len(np.unique(codes)) == len(codes)
+    assert not any(int(c) % 11 == 0 for c in codes)
@@ -0,0 +1,50 @@
+import threading
+
+from app.services import bulk_sender
+from app.services.bulk_sender import send_bulk
+
+
+def _items(n):
+    for i in range(n):
+        yield {"id": f"item-{i}"}
+
+
+def _send(item):
+    """item-N falha se N % 7 == 0 e levanta se N % 11 == 0 (77 cai no raise)."""
+    n = int(item["id"].split("-")[1])
+    if n % 11 == 0:
+        raise ValueError("boom")
+    return n % 7 != 0, item["id"]
+
+
+def test_send_bulk_counts_failures_and_exceptions(monkeypatch):
+    started = []
+
+    class RecordingThread(threading.Thread):
+        def start(self):
+            started.append(self)
+            super().start()
+
+    monkeypatch.setattr(bulk_sender.threading, "Thread", RecordingThread)
+    result = send_bulk(_items(100), _send, workers=4, key="id", queue_size=2)
+
+    expected_failed = {f"item-{n}" for n in range(100) if n % 7 == 0 or n % 11 == 0}
+    assert result["total"] == 100
+    assert result["failure_count"] == len(expected_failed)
+    assert result["success_count"] == 100 - len(expected_failed)
+    assert set(result["failed_ids"]) == expected_failed
+    assert result["elapsed_seconds"] >= 0
+    assert len(started) == 5 and not any(t.is_alive() for t in started)  # produtor e workers terminaram
+
+
+def test_send_bulk_reports_a_sample_of_failed_ids(monkeypatch):
+    monkeypatch.setattr(bulk_sender, "MAX_REPORTED_FAILURES", 5)
+    result = send_bulk(_items(20), lambda item: (False, item["id"]), workers=3, key="id")
+    assert (result["total"], result["failure_count"]) == (20, 20)
+    assert len(result["failed_ids"]) == 5
+
+
+def test_send_bulk_with_no_items():
+    result = send_bulk(iter(()), _send, workers=2, key="id")
+    assert (result["total"], result["success_count"], result["failure_count"]) == (0, 0, 0)
+    assert result["failed_ids"] == []
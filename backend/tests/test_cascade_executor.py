@@ -0,0 +1,94 @@
+import threading
+
+from app.services.cascade_executor import CascadeExecutor
+
+
+def _executor(put, plan=None, on_done=None, workers=4):
+    plan = plan or (lambda key, target: [{"id": f"{key}-{i}", "status": target} for i in range(3)])
+    return CascadeExecutor(plan, put, workers, on_done=on_done)
+
+
+def test_applies_every_planned_put():
+    applied = []
+    lock = threading.Lock()
+
+    def put(key, target, payload):
+        with lock:
+            applied.append((payload["id"], target))
+        return True
+
+    executor = _executor(put)
+    for key in ("gw1", "gw2"):
+        executor.submit(key, False)
+    assert executor.wait_idle(5)
+    assert sorted(applied) == sorted((f"{k}-{i}", False) for k in ("gw1", "gw2") for i in range(3))
+    assert executor.stats()["applied_puts"] == 6
+    executor.shutdown()
+
+
+def _blocked_executor():
+    """Executor with one worker whose first PUT waits for `release`."""
+    started, release = threading.Event(), threading.Event()
+    targets = []
+
+    def put(key, target, payload):
+        targets.append(target)
+        started.set()
+        release.wait(5)
+        return True
+
+    return _executor(put, workers=1), started, release, targets
+
+
+def test_target_submitted_while_running_supersedes_pending_puts():
+    executor, started, release, targets = _blocked_executor()
+    executor.submit("gw", False)
+    assert started.wait(5)
+    executor.submit("gw", True)  # a rodada em curso pula os PUTs que ainda não começaram
+    release.set()
+    assert executor.wait_idle(5)
+    assert executor.stats()["skipped_puts"] == 2
+    assert targets == [False, True, True, True]
+    executor.shutdown()
+
+
+def test_queued_targets_coalesce_to_the_latest():
+    executor, started, release, targets = _blocked_executor()
+    executor.submit("gw", False)
+    assert started.wait(5)
+    executor.submit("gw", True)
+    executor.submit("gw", False)  # substitui o True na fila: volta ao alvo em curso
+    release.set()
+    assert executor.wait_idle(5)
+    stats = executor.stats()
+    assert (stats["coalesced"], stats["skipped_puts"]) == (1, 0)
+    assert True not in targets
+    executor.shutdown()
+
+
+def test_failures_are_counted_and_bad_plans_do_not_stop_the_runner():
+    def plan(key, target):
+        if key == "bad":
+            raise RuntimeError("boom")
+        return [{"id": key}]
+
+    executor = _executor(lambda key, target, payload: key != "down", plan=plan)
+    for key in ("bad", "down", "ok"):
+        executor.submit(key, True)
+    assert executor.wait_idle(5)
+    stats = executor.stats()
+    assert (stats["applied_puts"], stats["failed_puts"], stats["active"]) == (1, 1, 0)
+    executor.shutdown()
+
+
+def test_on_done_exception_does_not_leave_the_key_active():
+    def on_done(key, target, applied):
+        raise IndexError("callback")
+
+    executor = _executor(lambda key, target, payload: True, on_done=on_done)
+    executor.submit("gw", True)
+    assert executor.wait_idle(5)
+    executor.submit("gw", False)
+    assert executor.wait_idle(5)
+    assert executor.stats()["applied_puts"] == 6
+    executor.shutdown()
@@ -0,0 +1,39 @@
+from app.services.device_index import GatewayDeviceIndex
+
+
+def _device(dev_id, mac, **extra):
+    return {"id": dev_id, "gateway": {"mac": mac} if mac else None, **extra}
+
+
+def _ids(index, mac):
+    return sorted(d["id"] for d in index.devices_for(mac))
+
+
+def test_load_groups_devices_by_gateway():
+    index = GatewayDeviceIndex()
+    index.load([_device("d1", "gw1"), _device("d2", "gw1"), _device("d3", "gw2"), _device("d4", None), {"gateway": {"mac": "gw1"}}])
+    assert _ids(index, "gw1") == ["d1", "d2"]
+    assert _ids(index, "gw2") == ["d3"]
+    assert index.stats() == {"loaded": True, "gateways": 2, "devices": 3}
+
+
+def test_upsert_replaces_and_moves_devices():
+    index = GatewayDeviceIndex()
+    index.load([_device("d1", "gw1"), _device("d2", "gw1")])
+    index.upsert(_device("d1", "gw1", status=False))
+    assert [d.get("status") for d in index.devices_for("gw1") if d["id"] == "d1"] == [False]
+    index.upsert(_device("d2", "gw2"))
+    assert (_ids(index, "gw1"), _ids(index, "gw2")) == (["d1"], ["d2"])
+    index.upsert(_device("d1", None))  # desvinculado do gateway
+    assert _ids(index, "gw1") == []
+    index.upsert(_device("d5", "gw1"))
+    assert _ids(index, "gw1") == ["d5"]
+
+
+def test_upsert_before_load_is_ignored():
+    index = GatewayDeviceIndex()
+    index.upsert(_device("d1", "gw1"))
+    assert index.devices_for("gw1") == []
+    index.load([])
+    index.clear()
+    assert index.stats() == {"loaded": False, "gateways": 0, "devices": 0}
@@ -0,0 +1,74 @@
+import numpy as np
+
+from app.services.device_power import DevicePowerState, power_steps
+
+
+def _devices(n, status=True, category="sensor"):
+    return [{"id": f"d{i}", "status": status, "category": category} for i in range(n)]
+
+
+def _state(seed=18, transitions=None):
+    return DevicePowerState(transitions or {}, rng=np.random.default_rng(seed))
+
+
+def test_load_reads_status_from_the_records():
+    state = _state()
+    state.load([{"id": "a", "status": True}, {"id": "b", "status": False}, {"id": "c"}])
+    assert state.active.tolist() == [True, False, True]
+
+
+def test_step_uses_per_category_probabilities():
+    state = _state(transitions={"actuator": {"prob_down": 0.0, "prob_up": 1.0}})
+    devices = _devices(100) + _devices(100, status=False, category="actuator")
+    state.load(devices)
+    flips = state.step(prob_down=1.0, prob_up=0.0)
+    assert flips.all()  # sensores ON→OFF com 1.0, atuadores OFF→ON com 1.0
+    assert state.active.tolist() == [False] * 100 + [True] * 100
+    assert state.stats()["transitions"] == 200
+
+
+def test_step_only_touches_the_given_slots():
+    state = _state()
+    state.load(_devices(10))
+    state.step(1.0, 0.0, slots=np.array([2, 7]))
+    assert np.flatnonzero(~state.active).tolist() == [2, 7]
+
+
+def test_revert_undoes_a_failed_flip():
+    state = _state()
+    state.load(_devices(3))
+    state.step(1.0, 0.0)
+    state.revert("d1", False)  # PUT para OFF falhou
+    assert state.active.tolist() == [False, True, False]
+    state.revert("d1", False)  # já revertido: nada muda
+    assert state.active.tolist() == [False, True, False]
+
+
+def test_revert_after_clear_is_a_no_op():
+    state = _state()
+    state.load(_devices(20))
+    state.clear()
+    state.revert("d12", True)
+    assert len(state) == 0
+
+
+def test_revert_ignores_ids_not_in_the_reloaded_list():
+    state = _state()
+    state.load(_devices(20))
+    state.load([{"id": "other", "status": True}])
+    state.revert("d12", True)
+    state.revert("d0", True)  # slot 0 existe, mas é de outro device
+    assert state.active.tolist() == [True]
+
+
+def test_list_steps_keep_state_between_rounds_and_streams_start_from_records():
+    state = _state()
+    devices = _devices(50)
+    first = list(power_steps(devices, 1.0, 0.0, state))
+    assert all(changed and not status for _, _, changed, status in first)
+    second = list(power_steps(devices, 0.0, 0.0, state))
+    assert not any(status for *_, status in second)  # a lista continua OFF
+
+    streamed = list(power_steps(iter(devices), 0.0, 0.0))
+    assert [i for i, *_ in streamed] == list(range(50))
+    assert all(status for *_, status in streamed)  # stream parte do status dos registros
@@ -0,0 +1,43 @@
+import math
+import uuid
+
+import numpy as np
+import pytest
+
+from app.services.device_service import generate_device_batch
+
+EARTH_RADIUS_KM = 6371.0
+GATEWAYS = [
+    {"mac": "1:2:3:4:5:6", "coordinates": {"latitude": -13.0, "longitude": -38.5}},
+    {"mac": "7:8:9:10:11:12", "coordinates": {"latitude": 60.0, "longitude": 10.0}},
+    {"mac": "0:0:0:0:0:1", "coordinates": {"latitude": 0.0, "longitude": 179.9}},
+]
+
+
+def test_devices_belong_to_the_given_gateways_and_stay_within_the_radius():
+    radius_km = 2.0
+    gateways = GATEWAYS + [{"mac": "no-coordinates"}]  # sem coordenadas: nunca recebe devices
+    devices = list(generate_device_batch(3000, gateways, radius_km, rng=np.random.default_rng(6)))
+    assert len(devices) == 3000
+
+    by_mac = {gw["mac"]: gw for gw in GATEWAYS}
+    assert {d["gateway"]["mac"] for d in devices} == set(by_mac)
+    for d in devices:
+        center = by_mac[d["gateway"]["mac"]]["coordinates"]
+        ns = abs(d["coordinates"]["latitude"] - center["latitude"]) * math.pi / 180 * EARTH_RADIUS_KM
+        ew = (abs(d["coordinates"]["longitude"] - center["longitude"]) * math.pi / 180 * EARTH_RADIUS_KM
+              * math.cos(math.radians(center["latitude"])))
+        assert ns <= radius_km + 1e-6 and ew <= radius_km + 1e-6
+
+
+def test_device_ids_are_unique_uuid4():
+    batch = generate_device_batch(1000, GATEWAYS, 1.0, rng=np.random.default_rng(7))
+    ids = [d["id"] for d in batch]
+    assert len(set(ids)) == 1000
+    assert all(uuid.UUID(i).version == 4 for i in ids)
+    assert batch.to_dict(3)["id"] == ids[3]
+
+
+def test_no_placeable_gateway_is_an_error():
+    with pytest.raises(ValueError):
+        generate_device_batch(10, [{"mac": "x"}], 1.0)
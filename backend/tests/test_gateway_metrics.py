@@ -0,0 +1,83 @@
+import json
+from datetime import datetime
+
+import numpy as np
+
+from app.services.gateway_metrics import GatewayMetricState
+from app.services.payload_template import date_dict, date_fragment
+
+NOW = datetime(2026, 3, 9, 14, 5, 7)
+MACS = [f"{i:02d}:1f:0a:0b:0c:{i % 32:02d}" for i in range(300)] + ['quoted "mac" ☂']
+
+
+def _compact(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def test_bodies_equal_json_dumps_of_the_status_dicts():
+    state = GatewayMetricState(MACS, rng=np.random.default_rng(20))
+    for _ in range(50):  # inclui bateria zerada e memória/CPU nos limites
+        state.step()
+    statuses = dict(state.iter_statuses(date_dict(NOW)))
+    bodies = list(state.iter_bodies(date_fragment(NOW)))
+    assert [slot for slot, *_ in bodies] == list(range(len(MACS)))
+    for slot, mac, active, body in bodies:
+        assert body == _compact(statuses[slot])
+        assert (mac, active) == (MACS[slot], statuses[slot]["gateway"]["status"])
+
+
+def test_bodies_for_selected_slots():
+    state = GatewayMetricState(MACS, rng=np.random.default_rng(21))
+    slots = np.array([5, 300, 0])
+    state.step(slots)
+    statuses = dict(state.iter_statuses(date_dict(NOW), slots))
+    bodies = list(state.iter_bodies(date_fragment(NOW), slots))
+    assert [slot for slot, *_ in bodies] == [5, 300, 0]
+    for slot, _, _, body in bodies:
+        assert body == _compact(statuses[slot])
+
+
+def test_metrics_stay_in_range():
+    state = GatewayMetricState(MACS, rng=np.random.default_rng(22))
+    for _ in range(400):
+        state.step()
+    for column in (state.battery, state.memory, state.cpu):
+        assert column.min() >= 0.0 and column.max() <= 1.0
+        assert np.array_equal(column, np.round(column, 2))
+
+
+def test_step_moves_each_metric_within_its_bounds():
+    state = GatewayMetricState(MACS, rng=np.random.default_rng(23))
+    battery, memory, cpu = state.battery.copy(), state.memory.copy(), state.cpu.copy()
+    state.step()
+    assert np.all(battery - state.battery >= 0.0) and np.all(battery - state.battery <= 0.01 + 1e-9)
+    assert np.all(np.abs(state.memory - memory) <= 0.06 + 1e-9)  # ±0.05 e o arredondamento
+    assert np.all(np.abs(state.cpu - cpu) <= 0.06 + 1e-9)
+    assert 0.35 < state.active.mean() < 0.65  # ON/OFF 50/50
+
+
+def test_step_only_touches_the_given_slots():
+    state = GatewayMetricState(MACS, rng=np.random.default_rng(24))
+    before = [c.copy() for c in (state.battery, state.memory, state.cpu, state.active)]
+    slots = np.array([3, 7])
+    for _ in range(5):
+        state.step(slots)
+    others = np.setdiff1d(np.arange(len(MACS)), slots)
+    for old, new in zip(before, (state.battery, state.memory, state.cpu, state.active)):
+        assert np.array_equal(old[others], new[others])
+    assert np.all(state.battery[slots] <= before[0][slots])
+
+
+def test_iter_statuses_mirrors_the_columns():
+    state = GatewayMetricState(MACS, rng=np.random.default_rng(25))
+    state.CHUNK = 64  # vários blocos
+    state.step()
+    date = date_dict(NOW)
+    statuses = list(state.iter_statuses(date))
+    assert [slot for slot, _ in statuses] == list(range(len(MACS)))
+    for slot, status in statuses:
+        assert status["date"] is date
+        assert status["gateway"] == {"mac": MACS[slot], "status": bool(state.active[slot])}
+        assert (status["baterryLevel"], status["usedMemory"], status["usedProcessor"]) == (
+            state.battery[slot], state.memory[slot], state.cpu[slot]
+        )
@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+
+from app.services.gateway_service import (
+    IP_OCTET_RANGE,
+    MAC_OCTET_RANGE,
+    generate_gateway_batch,
+    ip_from_code,
+    ip_to_code,
+    mac_from_code,
+    mac_to_code,
+)
+
+CENTER_LAT, CENTER_LON, RADIUS_KM = -13.005, -38.516, 5.0
+EARTH_RADIUS_KM = 6371.0
+
+
+def _offsets_km(lat, lon, center_lat, center_lon):
+    """Distâncias norte-sul e leste-oeste (km) de cada ponto até o centro."""
+    ns = np.abs(np.asarray(lat) - center_lat) * math.pi / 180 * EARTH_RADIUS_KM
+    ew = np.abs(np.asarray(lon) - center_lon) * math.pi / 180 * EARTH_RADIUS_KM * np.cos(np.radians(center_lat))
+    return ns, ew
+
+
+def test_mac_and_ip_codes_round_trip():
+    rng = np.random.default_rng(4)
+    edges = [0, 1, MAC_OCTET_RANGE ** 6 - 1]
+    for code in edges + rng.integers(0, MAC_OCTET_RANGE ** 6, 500).tolist():
+        assert mac_to_code(mac_from_code(code)) == code
+    edges = [0, 1, IP_OCTET_RANGE ** 4 - 1]
+    for code in edges + rng.integers(0, IP_OCTET_RANGE ** 4, 500).tolist():
+        assert ip_to_code(ip_from_code(code)) == code
+
+
+def test_codes_outside_the_address_space_are_rejected():
+    assert mac_to_code("32:0:0:0:0:0") is None
+    assert mac_to_code("aa:bb:cc:dd:ee:ff") is None
+    assert mac_to_code("1:2:3") is None
+    assert ip_to_code("192.0.0.1") is None
+    assert ip_to_code("10.0.0") is None
+
+
+def test_gateway_batch_stays_within_the_radius_and_never_repeats_addresses():
+    batch = generate_gateway_batch(2000, CENTER_LAT, CENTER_LON, RADIUS_KM, rng=np.random.default_rng(5))
+    gateways = list(batch)
+    assert len(gateways) == len(batch) == 2000
+
+    lat = [gw["coordinates"]["latitude"] for gw in gateways]
+    lon = [gw["coordinates"]["longitude"] for gw in gateways]
+    ns, ew = _offsets_km(lat, lon, CENTER_LAT, CENTER_LON)
+    assert ns.max() <= RADIUS_KM + 1e-6 and ew.max() <= RADIUS_KM + 1e-6
+
+    assert len({gw["mac"] for gw in gateways}) == 2000
+    assert len({gw["ip"] for gw in gateways}) == 2000
+    assert all(mac_to_code(gw["mac"]) is not None and ip_to_code(gw["ip"]) is not None for gw in gateways)
+    assert gateways[7] == batch.to_dict(7)
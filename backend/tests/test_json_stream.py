@@ -0,0 +1,82 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from app.services.json_stream import JsonArrayParser, aiter_json_array, iter_json_array
+
+RECORDS = [
+    {"id": "dev-1", "name": "câmera ☂ 🚦", "status": True, "coords": [-12.97, -38.51]},
+    {"id": "dev-2", "nested": {"list": [1, 2.5, -3e-7, None], "s": "a,]\"[b"}, "status": False},
+    12.5, 0, -7, "tail ] , [", None, True, [], {}, [[1, [2]], {"k": []}],
+]
+
+
+def _body(indent=None) -> bytes:
+    return json.dumps(RECORDS, ensure_ascii=False, indent=indent).encode()
+
+
+def _chunks(body: bytes, sizes):
+    pos = 0
+    for size in sizes:
+        yield body[pos:pos + size]
+        pos += size
+    yield body[pos:]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 16])
+def test_fixed_chunk_sizes(size):
+    body = _body(indent=2)
+    chunks = [body[i:i + size] for i in range(0, len(body), size)]
+    assert list(iter_json_array(chunks)) == RECORDS
+
+
+def test_every_single_split_point():
+    body = _body()
+    for cut in range(len(body) + 1):
+        assert list(iter_json_array([body[:cut], body[cut:]])) == RECORDS, cut
+
+
+def test_random_chunk_boundaries():
+    rng = random.Random(16)
+    for indent in (None, 1):
+        body = b" \n" + _body(indent) + b"\r\n"
+        for _ in range(300):
+            sizes = [rng.randint(0, 9) for _ in range(len(body))]
+            assert list(iter_json_array(_chunks(body, sizes))) == RECORDS
+
+
+def test_number_split_across_chunks_is_not_cut_short():
+    assert list(iter_json_array([b"[12", b".5, 3", b"4]"])) == [12.5, 34]
+
+
+def test_elements_are_returned_as_soon_as_they_complete():
+    parser = JsonArrayParser()
+    assert parser.feed(b'[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(b': 2}') == []  # sem separador ainda
+    assert parser.feed(b"]") == [{"b": 2}]
+    assert parser.close() == []
+
+
+def test_empty_array():
+    assert list(iter_json_array([b" [", b" ] "])) == []
+
+
+@pytest.mark.parametrize("body", [b'[{"a": 1}, {"b": 2}', b"[1, 2", b'{"a": 1}', b"[1 2]"])
+def test_malformed_or_truncated_bodies_raise(body):
+    with pytest.raises(ValueError):
+        list(iter_json_array([body]))
+
+
+def test_async_variant():
+    body = _body()
+
+    async def chunks():
+        for i in range(0, len(body), 5):
+            yield body[i:i + 5]
+
+    async def collect():
+        return [item async for item in aiter_json_array(chunks())]
+
+    assert asyncio.run(collect()) == RECORDS
@@ -0,0 +1,66 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app.services.payload_template import PatchedRecord, RecordTemplate, TemplateCache, date_dict, date_fragment
+
+NOW = datetime(2026, 3, 9, 14, 5, 7, 123456)
+
+RECORDS = [
+    {"id": "d1", "name": "Sensor", "status": True, "date": {"year": 2020}, "gateway": {"mac": "aa", "status": True}},
+    {"date": None, "id": "d2", "status": False, "tags": ["status", "date", '"status":']},
+    {"id": "d3", "name": "sem status nem date", "coords": [-12.9, -38.5]},
+    {"id": "d4", "name": "ação ☂ \u0000 \"aspas\"", "status": "desconhecido", "n": 1.5e-7},
+    {"status": True},
+]
+
+
+def _compact(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def test_date_fragment_matches_date_dict():
+    assert date_fragment(NOW) == _compact(date_dict(NOW))
+    assert date_fragment(NOW.replace(second=8)) == _compact(date_dict(NOW.replace(second=8)))
+
+
+@pytest.mark.parametrize("record", RECORDS, ids=lambda r: str(r.get("id")))
+@pytest.mark.parametrize("status", [True, False])
+def test_body_equals_json_dumps_of_the_merged_record(record, status):
+    payload = PatchedRecord(record, status, NOW, TemplateCache("id"))
+    assert payload.body() == _compact(payload.merged())
+    assert json.loads(payload.body()) == {**record, "status": status, "date": date_dict(NOW)}
+
+
+@pytest.mark.parametrize("record", RECORDS, ids=lambda r: str(r.get("id")))
+def test_patched_record_reads_like_the_merged_dict(record):
+    payload = PatchedRecord(record, False, NOW, TemplateCache("id"))
+    assert dict(payload) == payload.merged()
+    assert list(payload) == list(payload.merged())
+    assert len(payload) == len(payload.merged())
+
+
+def test_template_is_reused_for_our_own_write_back_and_rebuilt_after_a_fetch():
+    cache = TemplateCache("id")
+    record = dict(RECORDS[0])
+    first = PatchedRecord(record, False, NOW, cache)
+    first.body()
+    written_back = first.merged()  # mesmos objetos, só status/date novos
+    second = PatchedRecord(written_back, True, NOW, cache)
+    assert second.body() == _compact(second.merged())
+    assert cache.counters == {"built": 1, "reused": 1}
+
+    refetched = json.loads(json.dumps({**written_back, "name": "Renomeado"}))
+    third = PatchedRecord(refetched, False, NOW, cache)
+    assert third.body() == _compact(third.merged())
+    assert cache.counters["built"] == 2
+
+
+def test_matches_requires_the_same_other_fields():
+    record = {"id": "x", "a": [1], "status": True}
+    template = RecordTemplate(record)
+    assert template.matches({**record, "status": False, "date": {}})
+    assert not template.matches({**record, "a": [1]})  # lista nova (novo GET)
+    assert not template.matches({**record, "extra": 1})
+    assert not template.matches({"id": "x", "status": True})
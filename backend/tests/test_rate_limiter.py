@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services import rate_limiter
+from app.services.rate_limiter import TokenBucket, default_burst
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; time.sleep / asyncio.sleep advance it."""
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    async def asleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleep)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", asleep)
+    return now
+
+
+def test_default_burst_is_50ms_of_events():
+    assert [default_burst(r) for r in (1, 10, 100, 2000)] == [1, 1, 5, 100]
+
+
+def test_starts_empty_and_holds_the_rate(clock):
+    bucket = TokenBucket(100, burst=5)
+    start = clock[0]
+    for _ in range(1000):
+        bucket.acquire()
+    assert clock[0] - start == pytest.approx(10.0)
+    stats = bucket.stats()
+    assert stats["events"] == 1000
+    assert stats["achieved_rate"] == pytest.approx(100, rel=1e-3)
+    assert stats["recent_rate"] == pytest.approx(100, rel=0.05)
+
+
+def test_idle_time_saves_at_most_burst_tokens(clock):
+    bucket = TokenBucket(10, burst=3)
+    clock[0] += 60
+    start = clock[0]
+    for _ in range(3):
+        bucket.acquire()
+    assert clock[0] == start  # 3 tokens guardados
+    bucket.acquire()
+    assert clock[0] - start == pytest.approx(0.1)
+
+
+def test_async_acquire_shares_the_rate(clock):
+    bucket = TokenBucket(50, burst=1)
+
+    async def main():
+        await asyncio.gather(*(bucket.aacquire() for _ in range(100)))
+
+    start = clock[0]
+    asyncio.run(main())
+    assert clock[0] - start == pytest.approx(100 / 50, rel=0.01)
+    assert bucket.stats()["events"] == 100
+
+
+def test_stop_freezes_the_elapsed_time(clock):
+    bucket = TokenBucket(10)
+    for _ in range(10):
+        bucket.acquire()
+    bucket.stop()
+    clock[0] += 100
+    stats = bucket.stats()
+    assert stats["achieved_rate"] == pytest.approx(10)
+    assert not stats["running"]
+
+
+def test_threads_share_the_rate_in_real_time():
+    bucket = TokenBucket(1000, burst=1)
+    started = time.monotonic()
+    threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(50)]) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - started >= 0.19
+    assert bucket.stats()["events"] == 200
+
+
+def test_open_bucket_without_rate_returns_none_and_registers_otherwise():
+    url = "http://upstream.test/rate"
+    assert rate_limiter.open_bucket(url, None, None, label="x") is None
+    bucket = rate_limiter.open_bucket(url, 20, None, label="x")
+    assert bucket.burst == 1
+    assert rate_limiter.stats()[url]["requested_rate"] == 20
+    rate_limiter.close_bucket(bucket)
+    assert not rate_limiter.stats()[url]["running"]
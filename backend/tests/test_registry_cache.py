@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.services import registry_cache as registry_cache_module
+from app.services.registry_cache import RegistryCache
+
+URL = "http://upstream.test/devices"
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeUpstream:
+    """Serves `data` with an ETag; answers 304 when the client sends the current one."""
+
+    def __init__(self, data):
+        self.data = data
+        self.version = 1
+        self.requests = []
+
+    def get(self, url, headers):
+        self.requests.append(dict(headers))
+        etag = f'"v{self.version}"'
+        if headers.get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, list(self.data), {"ETag": etag})
+
+
+    async def aget(self, url, headers):
+        await asyncio.sleep(0.01)  # downloads concorrentes se sobrepõem
+        return self.get(url, headers)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeUpstream([{"id": "d1", "status": True}, {"id": "d2", "status": True}])
+    monkeypatch.setattr(registry_cache_module.upstream, "get", fake.get)
+    monkeypatch.setattr(registry_cache_module.upstream, "aget", fake.aget)
+    return fake
+
+
+def test_fresh_reads_are_served_from_memory(fake):
+    cache = RegistryCache(ttl_seconds=60)
+    first = cache.get(URL)
+    assert cache.get(URL) is first
+    assert len(fake.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_expired_list_is_revalidated_with_the_etag(fake):
+    cache = RegistryCache(ttl_seconds=0)
+    first = cache.get(URL)
+    assert cache.get(URL) is first  # 304: mesma lista
+    assert fake.requests[1] == {"If-None-Match": '"v1"'}
+    fake.version = 2
+    fake.data = fake.data + [{"id": "d3"}]
+    assert [d["id"] for d in cache.get(URL)] == ["d1", "d2", "d3"]
+    stats = cache.stats()
+    assert (stats["fetches"], stats["not_modified"]) == (2, 1)
+
+
+def test_put_record_merges_our_writes_in_place(fake):
+    cache = RegistryCache(ttl_seconds=60)
+    cache.get(URL)
+    cache.put_record(URL, {"id": "d2", "status": False}, key="id")
+    cache.put_record(URL, {"id": "d9", "status": True}, key="id")
+    assert cache.get(URL) == [{"id": "d1", "status": True}, {"id": "d2", "status": False}, {"id": "d9", "status": True}]
+    assert len(fake.requests) == 1
+
+
+def test_invalidate_forces_a_revalidation(fake):
+    cache = RegistryCache(ttl_seconds=60)
+    cache.get(URL)
+    cache.invalidate(URL)
+    cache.get(URL)
+    assert len(fake.requests) == 2
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_concurrent_agets_share_one_download(fake):
+    cache = RegistryCache(ttl_seconds=60)
+
+    async def readers():
+        return await asyncio.gather(*(cache.aget(URL) for _ in range(10)))
+
+    results = asyncio.run(readers())
+    assert len(fake.requests) == 1
+    assert all(r is results[0] for r in results)
+    assert asyncio.run(cache.aget(URL)) is results[0]  # outro event loop: servido da memória
+    assert cache.stats()["hits"] == 1
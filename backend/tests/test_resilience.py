@@ -0,0 +1,147 @@
+import io
+
+import pytest
+import requests
+
+from app.services import resilience, upstream
+from app.services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, backoff_delay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [50.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures_only(clock):
+    breaker = CircuitBreaker("t", failure_threshold=3, reset_seconds=5)
+    for success in (False, False, True, False, False):
+        assert breaker.allow()
+        breaker.record(success)
+    assert breaker.state == CLOSED
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.stats()["opened"] == 1
+
+
+def test_open_fails_fast_then_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_seconds=5)
+    breaker.record(False)
+    assert not breaker.allow()
+    clock[0] += 4.9
+    assert not breaker.allow()
+    assert breaker.stats()["open_for_seconds"] == pytest.approx(0.1)
+    clock[0] += 0.1
+    assert breaker.allow()  # a sonda
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # só uma por vez
+    assert breaker.stats()["rejected"] == 3
+
+
+def test_probe_success_closes(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_seconds=5)
+    breaker.record(False)
+    clock[0] += 5
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_failure_reopens_for_a_full_period(clock):
+    breaker = CircuitBreaker("t", failure_threshold=3, reset_seconds=5)
+    for _ in range(3):
+        breaker.record(False)
+    clock[0] += 5
+    assert breaker.allow()
+    breaker.record(False)  # uma falha basta em half-open
+    assert breaker.state == OPEN
+    clock[0] += 4
+    assert not breaker.allow()
+    assert breaker.stats()["opened"] == 2
+
+
+def test_cancelled_probe_frees_the_half_open_slot(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_seconds=5)
+    breaker.record(False)
+    clock[0] += 5
+    assert breaker.allow()
+    breaker.cancel()
+    assert breaker.allow()
+    assert breaker.stats()["probes"] == 2
+
+
+def test_backoff_delay_is_capped_full_jitter():
+    for attempt in range(1, 10):
+        delays = [backoff_delay(attempt, 0.2, 2.0) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= min(2.0, 0.2 * 2 ** (attempt - 1))
+
+
+class _Scripted:
+    """Stand-in for upstream._request_once answering from a script (int = status, exception = raised)."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+
+    def __call__(self, method, url, timeout=None, **kwargs):
+        self.calls += 1
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response.raw = io.BytesIO(b"")
+        return response
+
+
+@pytest.fixture
+def scripted(monkeypatch):
+    monkeypatch.setattr(upstream, "_breakers", {})
+    monkeypatch.setattr(upstream, "UPSTREAM_RETRIES", 2)
+    monkeypatch.setattr(upstream, "UPSTREAM_BREAKER_FAILURES", 5)
+    monkeypatch.setattr(upstream.time, "sleep", lambda seconds: None)
+
+    def install(script):
+        fake = _Scripted(script)
+        monkeypatch.setattr(upstream, "_request_once", fake)
+        return fake
+    return install
+
+
+def test_put_is_retried_on_5xx_and_network_errors(scripted):
+    fake = scripted([503, requests.exceptions.ConnectionError("down"), 200])
+    assert upstream.put("http://upstream.test/device", json={}).status_code == 200
+    assert fake.calls == 3
+    assert upstream.breaker_stats()["http://upstream.test/device"]["retries"] == 2
+
+
+def test_retries_stop_after_the_configured_attempts(scripted):
+    fake = scripted([500, 502, 504])
+    assert upstream.get("http://upstream.test/list").status_code == 504
+    assert fake.calls == 3
+
+
+def test_post_is_never_retried(scripted):
+    fake = scripted([503])
+    assert upstream.post("http://upstream.test/status", data=b"{}").status_code == 503
+    assert fake.calls == 1
+
+
+def test_client_errors_are_not_retried(scripted):
+    fake = scripted([404])
+    assert upstream.get("http://upstream.test/list").status_code == 404
+    assert fake.calls == 1
+
+
+def test_open_circuit_raises_without_calling_the_endpoint(scripted):
+    fake = scripted([requests.exceptions.ConnectTimeout("t")] * 5)
+    url = "http://upstream.test/status"
+    for _ in range(5):
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            upstream.post(url, data=b"{}")
+    with pytest.raises(CircuitOpenError):
+        upstream.post(url, data=b"{}")
+    assert fake.calls == 5
+    assert upstream.breaker_stats()[url]["state"] == OPEN
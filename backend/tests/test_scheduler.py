@@ -0,0 +1,49 @@
+import pytest
+
+from app.services import scheduler
+from app.services.scheduler import TickScheduler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(scheduler.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ticks_stay_on_their_deadlines(clock):
+    s = TickScheduler(1.0)
+    s.begin()
+    clock[0] += 0.3
+    assert s._advance() == pytest.approx(0.7)
+    clock[0] = 101.9
+    assert s._advance() == pytest.approx(0.1)  # ancorado em t0 + 2, não em "agora + 1"
+    assert s.overruns == 0
+
+
+def test_overrun_skips_missed_ticks(clock):
+    s = TickScheduler(1.0, label="test")
+    s.begin()
+    clock[0] += 3.5
+    assert s._advance() == 0.0  # atrasado: a próxima rodada começa já
+    assert s.tick_start == pytest.approx(103.5)  # reancorada em "agora"
+    assert (s.overruns, s.skipped_ticks) == (1, 2)
+    assert s.max_lateness_seconds == pytest.approx(2.5)
+    clock[0] += 0.4
+    assert s._advance() == pytest.approx(0.6)  # a nova grade conta a partir da reancoragem
+
+
+def test_phase_offsets_after_an_overrun_are_not_in_the_past(clock):
+    s = TickScheduler(2.0, label="test")
+    s.begin()
+    clock[0] += 5.0  # perdeu o prazo de 102 e o de 104
+    s._advance()
+    assert [s._phase_delay(i, 4) for i in range(4)] == pytest.approx([0.0, 0.5, 1.0, 1.5])
+
+
+def test_phase_delay_spreads_entities_over_the_period(clock):
+    s = TickScheduler(2.0)
+    s.begin()
+    assert [s._phase_delay(i, 4) for i in range(4)] == pytest.approx([0.0, 0.5, 1.0, 1.5])
+    clock[0] += 1.2
+    assert s._phase_delay(3, 4) == pytest.approx(0.3)
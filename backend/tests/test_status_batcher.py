@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from app.services import status_batcher
+from app.services.status_batcher import StatusBatcher
+
+URL = "http://upstream.test/status"
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code}", response=self)
+
+
+class FakeUpstream:
+    """Records the POSTs; `bulk_status` answers array bodies, single bodies get 201."""
+
+    def __init__(self, bulk_status=201):
+        self.bulk_status = bulk_status
+        self.posts = []
+        self.accepted = []
+        self._lock = threading.Lock()
+
+    def post(self, url, data, headers):
+        payload = json.loads(data)
+        status_code = self.bulk_status if isinstance(payload, list) else 201
+        with self._lock:
+            self.posts.append(payload)
+            if status_code < 400:
+                self.accepted.append(payload)
+        return FakeResponse(status_code)
+
+    def records(self):
+        """Sorted "n" of every record the upstream accepted."""
+        out = []
+        for payload in self.accepted:
+            out.extend(payload if isinstance(payload, list) else [payload])
+        return sorted(r["n"] for r in out)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(status_batcher.upstream, "post", fake.post)
+    return fake
+
+
+def _body(n):
+    return json.dumps({"n": n}).encode()
+
+
+def test_full_batches_go_out_as_one_array_post(fake):
+    batcher = StatusBatcher(URL, batch_size=10, linger_seconds=60, workers=2)
+    for n in range(30):
+        batcher.add(_body(n))
+    batcher.wait_idle()
+    assert sorted(len(p) for p in fake.posts) == [10, 10, 10]
+    assert fake.records() == list(range(30))
+    stats = batcher.stats()
+    assert (stats["bulk"], stats["bulk_posts"], stats["sent"], stats["failed"]) == (True, 3, 30, 0)
+    batcher.close()
+
+
+def test_linger_flushes_a_partial_batch(fake):
+    batcher = StatusBatcher(URL, batch_size=100, linger_seconds=0.05, workers=1)
+    batcher.add(_body(1))
+    batcher.add(_body(2))
+    deadline = time.monotonic() + 5
+    while batcher.stats()["sent"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert fake.posts == [[{"n": 1}, {"n": 2}]]
+    batcher.close()
+
+
+@pytest.mark.parametrize("status_code", [400, 405, 415, 422])
+def test_rejected_arrays_fall_back_to_single_posts(fake, status_code):
+    fake.bulk_status = status_code
+    batcher = StatusBatcher(URL, batch_size=5, linger_seconds=60, workers=3)
+    for n in range(20):
+        batcher.add(_body(n))
+    batcher.wait_idle()
+    assert sum(isinstance(p, list) for p in fake.posts) == 1  # só o lote de teste
+    assert fake.records() == list(range(20))
+    stats = batcher.stats()
+    assert (stats["bulk"], stats["single_posts"], stats["sent"]) == (False, 20, 20)
+    batcher.close()
+
+
+def test_server_errors_count_the_batch_as_failed(fake):
+    fake.bulk_status = 503
+    batcher = StatusBatcher(URL, batch_size=4, linger_seconds=60, workers=1)
+    for n in range(8):
+        batcher.add(_body(n))
+    batcher.wait_idle()
+    stats = batcher.stats()
+    assert (stats["bulk"], stats["failed"], stats["single_posts"]) == (None, 8, 0)
+    batcher.close()
+
+
+def test_close_sends_what_is_buffered(fake):
+    batcher = StatusBatcher(URL, batch_size=100, linger_seconds=60, workers=2)
+    for n in range(7):
+        batcher.add(_body(n))
+    batcher.close()
+    assert fake.records() == list(range(7))
+
+
+def test_batch_size_one_means_no_batcher():
+    assert status_batcher.open_status_batcher(URL, 1, 0.5, label="x") is None
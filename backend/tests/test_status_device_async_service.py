@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.services import status_device_service as sync_service
+from app.services.device_power import device_power
+from app.services.status_device_async_service import run_device_status_tick_async
+from app.services.write_behind import WriteBehindQueue
+
+
+@pytest.fixture
+def put_queue(monkeypatch):
+    sent = []
+
+    def fake_put(payload):
+        sent.append((payload.get("id"), payload.get("status")))
+        return payload.get("id") != "dev-1"  # o PUT de dev-1 falha
+
+    queue = WriteBehindQueue(fake_put, 2, on_done=sync_service._after_device_put, label="test-put")
+    monkeypatch.setattr(sync_service, "device_put_queue", queue)
+    monkeypatch.setattr(sync_service, "device_status_loop_running", True)
+    device_power.clear()
+    yield queue, sent
+    queue.shutdown()
+    device_power.clear()
+
+
+def test_async_tick_sends_power_puts_through_the_write_behind_queue(put_queue):
+    queue, sent = put_queue
+    devices = [{"id": f"dev-{i}", "status": True, "category": "sensor"} for i in range(4)]
+
+    async def tick():
+        # prob_down=1: todos desligam, então nenhum status histórico é enviado
+        return await run_device_status_tick_async(devices, datetime.now(), asyncio.Semaphore(4), 4, 1.0, 0.0)
+
+    counters = asyncio.run(tick())
+    assert queue.wait_idle(timeout=5)
+    assert counters == {"devices": 4, "puts": 4, "sent": 0, "errors": 0}
+    assert sorted(sent) == [(f"dev-{i}", False) for i in range(4)]
+    assert queue.stats()["sent"] == 3 and queue.stats()["failed"] == 1
+    # o PUT que falhou volta o device ao estado original
+    assert device_power.active.tolist() == [False, True, False, False]
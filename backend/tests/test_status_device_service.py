@@ -0,0 +1,21 @@
+import json
+from datetime import datetime
+
+from app.services.payload_template import date_fragment
+from app.services.status_device_service import OPERATION_MODES, device_status_body, generate_device_status
+
+NOW = datetime(2026, 3, 9, 14, 5, 7)
+
+
+def test_device_status_body_equals_json_dumps_of_generate_device_status():
+    for device_id in ("dev-1", 'ação "x" ☂', "dev-1"):
+        body = device_status_body(device_id, date_fragment(NOW))
+        situation = json.loads(body)["situation"]
+        assert situation in OPERATION_MODES
+        expected = {**generate_device_status(device_id, NOW), "situation": situation}
+        assert body == json.dumps(expected, separators=(",", ":")).encode()
+
+
+def test_device_status_body_draws_every_situation():
+    seen = {json.loads(device_status_body("dev", date_fragment(NOW)))["situation"] for _ in range(500)}
+    assert seen == set(OPERATION_MODES)
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from app.services import status_spool
+from app.services.status_spool import StatusSpool, is_outage
+
+URL = "http://upstream.test/status"
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeUpstream:
+    """Records replayed POSTs; answers `status_code` (None = connection error)."""
+
+    def __init__(self, status_code=None):
+        self.status_code = status_code
+        self.received = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, data, headers):
+        with self._lock:
+            self.calls += 1
+            if self.status_code is None:
+                raise requests.exceptions.ConnectionError("down")
+            if self.status_code < 300:
+                self.received.append(json.loads(data)["n"])
+        return FakeResponse(self.status_code)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(status_spool.upstream, "post", fake.post)
+    monkeypatch.setattr(status_spool, "RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(status_spool, "RETRY_MAX_SECONDS", 0.02)
+    return fake
+
+
+def _body(n):
+    return json.dumps({"n": n}).encode()
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert predicate()
+
+
+def _spool(directory, **kwargs):
+    kwargs.setdefault("replay_rate", 10_000)
+    return StatusSpool(URL, str(directory), **kwargs)
+
+
+def test_replays_in_order_across_segments_once_the_endpoint_is_back(tmp_path, fake):
+    spool = _spool(tmp_path, segment_bytes=50)
+    for n in range(100):
+        spool.append(_body(n))
+    _wait(lambda: spool.stats()["replay_failures"] >= 2)  # endpoint ainda fora: tenta de novo
+    assert spool.stats()["pending"] == 100 and spool.stats()["segments"] > 10
+
+    fake.status_code = 201
+    _wait(lambda: spool.stats()["pending"] == 0)
+    assert fake.received == list(range(100))
+    stats = spool.stats()
+    assert (stats["appended"], stats["replayed"], stats["segments"]) == (100, 100, 1)
+    spool.close()
+
+
+def test_client_errors_are_dropped_not_retried(tmp_path, fake):
+    fake.status_code = 422
+    spool = _spool(tmp_path)
+    for n in range(5):
+        spool.append(_body(n))
+    _wait(lambda: spool.stats()["pending"] == 0)
+    assert spool.stats()["rejected"] == 5 and fake.calls == 5
+    spool.close()
+
+
+def test_eviction_drops_the_oldest_records_first(tmp_path, fake):
+    spool = _spool(tmp_path, segment_bytes=100, max_bytes=400)
+    for n in range(200):
+        spool.append(_body(n))
+    stats = spool.stats()
+    assert stats["bytes"] <= 400
+    assert stats["evicted"] + stats["pending"] == 200
+
+    fake.status_code = 201
+    _wait(lambda: spool.stats()["pending"] == 0)
+    assert fake.received == list(range(200 - stats["pending"], 200))
+    spool.close()
+
+
+def test_restart_resumes_from_the_cursor(tmp_path, fake, monkeypatch):
+    monkeypatch.setattr(status_spool, "CURSOR_EVERY", 1)
+    spool = _spool(tmp_path, segment_bytes=60)
+    for n in range(30):
+        spool.append(_body(n))
+    spool.close()
+
+    fake.status_code = 201
+    spool = _spool(tmp_path, replay_rate=20)  # devagar: fecha no meio do replay
+    _wait(lambda: spool.stats()["replayed"] >= 5)
+    spool.close()
+    sent_before = list(fake.received)
+
+    fake.status_code = None  # fora do ar: o replay não avança antes da contagem
+    spool = _spool(tmp_path)
+    assert spool.stats()["pending"] == 30 - len(sent_before)
+    fake.status_code = 201
+    _wait(lambda: spool.stats()["pending"] == 0)
+    spool.append(_body(30))  # segmentos novos continuam depois do cursor
+    _wait(lambda: spool.stats()["pending"] == 0)
+    spool.close()
+    assert fake.received == list(range(31))
+
+    spool = _spool(tmp_path)
+    assert spool.stats()["pending"] == 0
+    spool.close()
+
+
+def test_truncated_last_line_is_skipped_on_restart(tmp_path, fake):
+    spool = _spool(tmp_path)
+    for n in range(3):
+        spool.append(_body(n))
+    spool.close()
+    segment = sorted(p for p in os.listdir(tmp_path) if p.endswith(".seg"))[-1]
+    with open(tmp_path / segment, "ab") as f:
+        f.write(b'{"n": 99')  # queda no meio de uma escrita
+
+    fake.status_code = 201
+    spool = _spool(tmp_path)
+    _wait(lambda: spool.stats()["pending"] == 0)
+    spool.close()
+    assert fake.received == [0, 1, 2]
+
+
+def test_replay_respects_the_rate(tmp_path, fake):
+    fake.status_code = 201
+    spool = _spool(tmp_path, replay_rate=100)
+    started = time.monotonic()
+    for n in range(30):
+        spool.append(_body(n))
+    _wait(lambda: spool.stats()["pending"] == 0)
+    assert time.monotonic() - started >= 0.25
+    spool.close()
+
+
+def test_fsync_policy_is_validated(tmp_path):
+    with pytest.raises(ValueError):
+        StatusSpool(URL, str(tmp_path), fsync="sometimes")
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_only_outages_are_spooled():
+    assert is_outage(requests.exceptions.ConnectionError("down"))
+    assert is_outage(requests.exceptions.ReadTimeout("slow"))
+    assert is_outage(_http_error(503)) and is_outage(_http_error(429))
+    assert not is_outage(_http_error(400)) and not is_outage(_http_error(404))
+
+
+def test_capture_and_acapture_use_the_endpoint_spool(tmp_path, fake, monkeypatch):
+    monkeypatch.setattr(status_spool, "STATUS_SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(status_spool, "_SPOOL_NAMES", {URL: "gateway-status"})
+    monkeypatch.setattr(status_spool, "_spools", {})
+    try:
+        assert status_spool.capture(URL, [_body(1), _body(2)], requests.exceptions.ConnectionError())
+        assert not status_spool.capture(URL, [_body(3)], _http_error(400))
+        assert not status_spool.capture("http://other.test/", [_body(4)], requests.exceptions.ConnectionError())
+        assert asyncio.run(status_spool.acapture(URL, [_body(5)], requests.exceptions.ConnectionError()))
+        assert status_spool.stats()[URL]["appended"] == 3
+        assert os.path.isdir(tmp_path / "gateway-status")
+    finally:
+        status_spool.close_spools()
+
+
+def test_capture_is_a_no_op_without_a_spool_dir(monkeypatch):
+    monkeypatch.setattr(status_spool, "STATUS_SPOOL_DIR", "")
+    assert not status_spool.capture(URL, [_body(1)], requests.exceptions.ConnectionError())
+    assert not asyncio.run(status_spool.acapture(URL, [_body(1)], requests.exceptions.ConnectionError()))
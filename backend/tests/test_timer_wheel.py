@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.services.timer_wheel import TimerWheel
+
+
+def _fire_times(wheel: TimerWheel, seconds: float):
+    """Advance tick by tick; {slot: [tick, ...]} of every firing."""
+    fired = {}
+    for tick in range(1, int(round(seconds / wheel.resolution)) + 1):
+        for slot in wheel.advance(wheel._started + tick * wheel.resolution + 1e-9):
+            fired.setdefault(slot, []).append(tick)
+    return fired
+
+
+def test_slots_must_be_power_of_two():
+    with pytest.raises(ValueError):
+        TimerWheel(slots=100)
+
+
+def test_fires_every_interval_without_drift():
+    wheel = TimerWheel(0.1, slots=8, levels=3)
+    wheel.schedule_every(0, 0.5)
+    wheel.schedule_every(1, 1.3, first_delay=0.2)
+    fired = _fire_times(wheel, 10)
+    assert fired[0] == list(range(5, 101, 5))
+    assert fired[1] == list(range(2, 101, 13))
+
+
+def test_long_intervals_cascade_from_higher_levels():
+    # 8 slots × 3 níveis: 0.8 s no nível 0, 6.4 s no nível 1, 51.2 s no nível 2
+    wheel = TimerWheel(0.1, slots=8, levels=3)
+    wheel.schedule_many(np.array([0, 1, 2]), np.array([3.0, 7.0, 20.0]), np.array([3.0, 7.0, 20.0]))
+    fired = _fire_times(wheel, 45)
+    assert fired[0] == list(range(30, 451, 30))
+    assert fired[1] == list(range(70, 451, 70))
+    assert fired[2] == [200, 400]
+    assert wheel.fired == 15 + 6 + 2
+
+
+def test_late_advance_skips_missed_periods():
+    wheel = TimerWheel(0.1, slots=8, levels=3)
+    wheel.schedule_every(0, 0.5)
+    assert wheel.advance(wheel._started + 2.05) == [0]  # 4 disparos perdidos viram um só
+    assert wheel.advance(wheel._started + 2.45) == []
+    assert wheel.advance(wheel._started + 2.55) == [0]
+
+
+def test_many_entities_each_fire_once_per_period():
+    wheel = TimerWheel(0.1, slots=16, levels=3)
+    n = 5000
+    rng = np.random.default_rng(7)
+    wheel.schedule_many(np.arange(n), np.full(n, 2.0), rng.uniform(0, 2.0, n))
+    fired = _fire_times(wheel, 2.0)
+    assert sorted(fired) == list(range(n))
+    assert all(len(ticks) == 1 for ticks in fired.values())
@@ -0,0 +1,88 @@
+import threading
+
+from app.services.write_behind import WriteBehindQueue
+
+
+def test_sends_only_the_latest_payload_per_key():
+    started, release = threading.Event(), threading.Event()
+    sent = []
+
+    def put(payload):
+        sent.append(dict(payload))
+        if payload["v"] == 0:
+            started.set()
+            release.wait(5)
+        return True
+
+    queue = WriteBehindQueue(put, workers=2)
+    queue.submit("a", {"v": 0})
+    assert started.wait(5)
+    for v in (1, 2, 3):  # "a" em voo: só o último espera e sai em seguida
+        queue.submit("a", {"v": v})
+    release.set()
+    assert queue.wait_idle(5)
+    assert sent == [{"v": 0}, {"v": 3}]
+    stats = queue.stats()
+    assert (stats["sent"], stats["superseded"], stats["depth"], stats["in_flight"]) == (2, 2, 0, 0)
+    queue.shutdown()
+
+
+def test_never_two_puts_in_flight_for_the_same_key():
+    lock = threading.Lock()
+    in_flight, overlaps = set(), []
+
+    def put(payload):
+        with lock:
+            if payload["key"] in in_flight:
+                overlaps.append(payload["key"])
+            in_flight.add(payload["key"])
+        with lock:
+            in_flight.discard(payload["key"])
+        return True
+
+    queue = WriteBehindQueue(put, workers=8)
+    for i in range(2000):
+        queue.submit(i % 10, {"key": i % 10})
+    assert queue.wait_idle(5)
+    assert not overlaps
+    queue.shutdown()
+
+
+def test_keeps_draining_after_put_and_on_done_exceptions():
+    done = []
+
+    def put(payload):
+        if payload["n"] % 3 == 0:
+            raise RuntimeError("put")
+        return payload["n"] % 2 == 0
+
+    def on_done(key, payload, ok):
+        done.append((key, ok))
+        if not ok:
+            raise IndexError("on_done")
+
+    queue = WriteBehindQueue(put, workers=2, on_done=on_done)
+    for n in range(30):
+        queue.submit(n, {"n": n})
+    assert queue.wait_idle(5)
+    stats = queue.stats()
+    assert (stats["sent"], stats["failed"], stats["in_flight"]) == (10, 20, 0)
+    assert len(done) == 30
+
+    queue.submit("later", {"n": 2})  # os workers continuam vivos
+    assert queue.wait_idle(5)
+    assert queue.stats()["sent"] == 11
+    queue.shutdown()
+
+
+def test_shutdown_sends_what_is_queued_and_submit_restarts_workers():
+    sent = []
+    queue = WriteBehindQueue(lambda payload: sent.append(payload) or True, workers=1)
+    for n in range(5):
+        queue.submit(n, {"n": n})
+    queue.shutdown()
+    assert len(sent) == 5
+    queue.submit("x", {"n": 5})
+    assert queue.wait_idle(5)
+    assert len(sent) == 6
+    queue.shutdown()